@@ -73,4 +73,15 @@ tail -f /var/log/my-batch-job.log
 podman run -it --rm -v ./data:/app/data my-batch-job /bin/bash
 
 # Image tartalmának ellenőrzése
-podman run -it --rm my-batch-job ls -la /app
\ No newline at end of file
+podman run -it --rm my-batch-job ls -la /app
+
+# 9. Alternatív: folyamatos futás (watch mód) a timer/cron helyett
+# A nyelvi modell és az adatbázis kapcsolat egyszer töltődik be, a feed WATCH_INTERVAL másodpercenként
+# kerül lekérdezésre. A podman stop SIGTERM-et küld: új letöltés nem indul, a már lefoglalt
+# (legfeljebb a PIPELINE_QUEUE_SIZE sorokban lévő) közlönyök elemzése befejeződik és mentésre kerül.
+# A --stop-timeout ennyi másodpercet ad erre a SIGKILL előtt; ha ez kevés, a félbemaradt
+# közlönyök bérlete lejár, és egy későbbi futás újra lefoglalja őket.
+podman run -d --name my-batch-job-watch --restart=on-failure --stop-timeout 120 \
+    -v ./data:/app/data my-batch-job python src/main.py watch
+podman logs -f my-batch-job-watch
+podman stop my-batch-job-watch
@@ -0,0 +1,3 @@
+from .suite import BASELINE_FILE, compare_backends, compare_to_baseline, load_results, run_benchmarks, save_results
+
+__all__ = ['BASELINE_FILE', 'compare_backends', 'compare_to_baseline', 'load_results', 'run_benchmarks', 'save_results']
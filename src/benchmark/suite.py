@@ -0,0 +1,245 @@
+import re
+import json
+import time
+import logging
+import platform
+import resource
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+from gdmonitor import extract_resolutions, summarize_contents
+from gdmonitor.pdf_processor import PDF_BACKEND_PDFPLUMBER, PDF_BACKENDS, extractor_version, get_pdf_backend, locate_decision_pages, normalize_pages
+from gdmonitor.resulation_analyzer import DEFAULT_RULESET, get_nlp
+from repository import GazetteRepository
+from pipeline import store_analysis
+
+logger = logging.getLogger(__name__)
+
+# A mérés szakaszai, a futás sorrendjében
+STAGES = ['text_extraction', 'resolution_extraction', 'keyword_scoring', 'summarization', 'repository_writes']
+# Az eredményfájl formátumának verziója (eltérő verziójú alapértékkel nem hasonlítunk)
+RESULT_FORMAT = 1
+# Alapértelmezett eltérés, ami felett egy szakasz lassulása regressziónak számít (0.2 = 20%)
+REGRESSION_THRESHOLD = 0.2
+# A szintetikus közlöny ennyiszer tartalmazza a minták összes határozatát
+SYNTHETIC_SCALE = 10
+
+SAMPLES_PATH = Path(__file__).resolve().parent.parent.parent / "samples"
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+
+_RESOLUTION_NUMBER = re.compile(r"\b(\d+)/(\d{4})\.")
+
+def peak_rss_mb() -> float:
+    """A folyamat eddigi legnagyobb memóriahasználata (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxon KB-ban, macOS-en bájtban
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def synthetic_gazette(texts: List[str], scale: int) -> str:
+    """
+    Nagy szintetikus közlöny szövege: a minták szövege scale-szer egymás után, a határozatszámok
+    példányonként eltolva, így minden határozat egyedi marad
+    """
+    copies = []
+    for copy in range(scale):
+        offset = copy * 100000
+        for text in texts:
+            copies.append(_RESOLUTION_NUMBER.sub(lambda m: f"{int(m.group(1)) + offset}/{m.group(2)}.", text))
+    return ' '.join(copies)
+
+def _stage(seconds: float, count: int, unit: str) -> Dict:
+    return {
+        'seconds': round(seconds, 4),
+        'count': count,
+        'unit': unit,
+        'per_second': round(count / seconds, 2) if seconds > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def _best_of(repeat: int, function):
+    """A függvény futtatása repeat-szer; a legrövidebb idő és az utolsó eredmény"""
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def _extract_text(pdf_path: Path, backend: str, decisions_only: bool):
+    pages = locate_decision_pages(str(pdf_path)) if decisions_only else None
+    raw_pages = list(get_pdf_backend(backend).iter_pages(str(pdf_path), pages))
+    return len(raw_pages), ''.join(normalize_pages(raw_pages))
+
+def run_benchmarks(samples: Optional[List[Path]] = None, backend: str = PDF_BACKEND_PDFPLUMBER,
+                   decisions_only: bool = False, scale: int = SYNTHETIC_SCALE, repeat: int = 1) -> Dict:
+    """
+    A feldolgozás szakaszainak mérése a mintákon és egy szintetikus nagy közlönyön.
+    A szövegkinyerés csak a PDF mintákon fut (oldal/s); a határozatok kinyerése, a pontozás,
+    az összefoglaló és az adatbázis írás a minták és a szintetikus közlöny szövegén (határozat/s).
+    Minden szakasz repeat-szer fut, a legjobb idő számít. A nyelvi modell betöltése külön mérés.
+
+    Args:
+        samples: A PDF minták (alapértelmezett: samples/MK_*.pdf)
+        backend: A szövegkinyerő backend
+        decisions_only: Csak a kormányhatározatokat tartalmazó oldalak kinyerése
+        scale: A szintetikus közlöny mérete (a minták határozatainak ismétlésszáma, 0: nincs)
+        repeat: Szakaszonkénti ismétlésszám
+
+    Returns:
+        Az eredmények JSON-ként menthető szótárban
+    """
+    samples = sorted(samples) if samples else sorted(SAMPLES_PATH.glob("MK_*.pdf"))
+    results = {
+        'format': RESULT_FORMAT,
+        'config': {'backend': backend, 'decisions_only': decisions_only, 'scale': scale, 'repeat': repeat,
+                   'samples': [sample.name for sample in samples]},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'extractor_version': extractor_version(decisions_only, backend)},
+        'samples': {},
+        'stages': {},
+    }
+
+    # 1. Szövegkinyerés
+    texts = []
+    total_seconds = total_pages = 0
+    for sample in samples:
+        seconds, (page_count, text) = _best_of(repeat, lambda: _extract_text(sample, backend, decisions_only))
+        texts.append(text)
+        total_seconds += seconds
+        total_pages += page_count
+        results['samples'][sample.stem] = {'pages': page_count, 'characters': len(text),
+                                           'extraction_seconds': round(seconds, 4)}
+        logger.info(f"Szövegkinyerés: {sample.name} {page_count} oldal, {seconds:.2f} s")
+    results['stages']['text_extraction'] = _stage(total_seconds, total_pages, 'pages')
+
+    # 2. Határozatok kinyerése (a minták és a szintetikus közlöny)
+    gazettes = list(zip([sample.stem for sample in samples], texts))
+    if scale > 0:
+        gazettes.append(('synthetic', synthetic_gazette(texts, scale)))
+    seconds, gdecisions = _best_of(repeat, lambda: [extract_resolutions(text) for _, text in gazettes])
+    resolution_count = sum(len(resolutions) for resolutions in gdecisions)
+    for (name, text), resolutions in zip(gazettes, gdecisions):
+        results['samples'].setdefault(name, {'characters': len(text)})['resolutions'] = len(resolutions)
+    results['stages']['resolution_extraction'] = _stage(seconds, resolution_count, 'resolutions')
+
+    # 3. Kulcsszavas pontozás
+    all_resolutions = [resolution for resolutions in gdecisions for resolution in resolutions]
+    seconds, scores = _best_of(repeat, lambda: [DEFAULT_RULESET.score(resolution) for resolution in all_resolutions])
+    results['stages']['keyword_scoring'] = _stage(seconds, len(all_resolutions), 'resolutions')
+
+    # 4. Összefoglaló (minden határozatra, hogy a mért mennyiség ne a kulcsszavaktól függjön)
+    start = time.perf_counter()
+    get_nlp()
+    results['environment']['model_load_seconds'] = round(time.perf_counter() - start, 4)
+    seconds, summaries = _best_of(repeat, lambda: summarize_contents([resolution['content'] for resolution in all_resolutions]))
+    results['stages']['summarization'] = _stage(seconds, len(all_resolutions), 'resolutions')
+
+    # 5. Adatbázis írás (közlönyönként egy tranzakció, a feldolgozási lánccal azonos módon)
+    analyzed = iter(zip(scores, summaries))
+    per_gazette = []
+    for resolutions in gdecisions:
+        relevant = []
+        for resolution, ((score, keywords), summary) in zip(resolutions, analyzed):
+            if score > 0:
+                relevant.append({'resolution': resolution, 'relevance_score': score,
+                                 'keyword_matches': ', '.join(keywords), 'summary': summary})
+        per_gazette.append((resolutions, {'relevant_resolutions': relevant, 'ruleset_version': DEFAULT_RULESET.version}))
+
+    def write_all():
+        # A határozatonkénti naplózás a mérést torzítaná
+        pipeline_logger = logging.getLogger('pipeline.gazette_pipeline')
+        level = pipeline_logger.level
+        pipeline_logger.setLevel(logging.WARNING)
+        try:
+            _write_gazettes(gazettes, per_gazette)
+        finally:
+            pipeline_logger.setLevel(level)
+
+    seconds, _ = _best_of(repeat, write_all)
+    results['stages']['repository_writes'] = _stage(seconds, resolution_count, 'resolutions')
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+def compare_backends(samples: Optional[List[Path]] = None, backends: Optional[List[str]] = None,
+                     decisions_only: bool = False, repeat: int = 1) -> Dict:
+    """
+    A szövegkinyerő backendek sebességének összehasonlítása ugyanazokon a mintákon (oldal/s)
+
+    Args:
+        samples: A PDF minták (alapértelmezett: samples/MK_*.pdf)
+        backends: Az összehasonlítandó backendek (alapértelmezett: mind)
+        decisions_only: Csak a kormányhatározatokat tartalmazó oldalak kinyerése
+        repeat: Mintánkénti ismétlésszám (a legjobb idő számít)
+
+    Returns:
+        Backendenként a szövegkinyerés mérése és a gyorsulás az első backendhez képest
+    """
+    samples = sorted(samples) if samples else sorted(SAMPLES_PATH.glob("MK_*.pdf"))
+    backends = backends or list(PDF_BACKENDS)
+    results = {}
+    for backend in backends:
+        total_seconds = total_pages = 0
+        for sample in samples:
+            seconds, (page_count, _) = _best_of(repeat, lambda: _extract_text(sample, backend, decisions_only))
+            total_seconds += seconds
+            total_pages += page_count
+        results[backend] = _stage(total_seconds, total_pages, 'pages')
+        logger.info(f"Szövegkinyerés ({backend}): {total_pages} oldal, {total_seconds:.2f} s")
+    reference = results[backends[0]]['seconds']
+    for measured in results.values():
+        measured['speedup'] = round(reference / measured['seconds'], 2) if measured['seconds'] > 0 else None
+    return results
+
+def _write_gazettes(gazettes: List, per_gazette: List):
+    """A közlönyök és elemzési eredményeik mentése egy ideiglenes adatbázisba"""
+    with tempfile.TemporaryDirectory() as directory:
+        with GazetteRepository(Path(directory) / "benchmark.db") as repository:
+            for i, ((name, _), (resolutions, analysis)) in enumerate(zip(gazettes, per_gazette)):
+                gazette_id = repository.save_gazette(name, "2025-01-01", f"benchmark://{name}/{i}", f"{name}.pdf")
+                store_analysis(repository, {'id': gazette_id, 'title': name}, resolutions, analysis)
+
+def save_results(results: Dict, path: Path):
+    """Az eredmények mentése JSON fájlba"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+def load_results(path: Path) -> Dict:
+    """Korábban mentett eredmények (pl. az alapérték) betöltése"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def compare_to_baseline(results: Dict, baseline: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """
+    Szakaszonkénti összehasonlítás az alapértékkel: a feldolgozási sebesség (egység/s) változása.
+    Csak azonos beállításokkal (backend, mód, méret) készült alapértékkel hasonlítható.
+
+    Args:
+        results: A run_benchmarks eredménye
+        baseline: Az alapérték (ugyanilyen szerkezetű eredmény)
+        threshold: A megengedett lassulás aránya (0.2 = 20%)
+
+    Returns:
+        Szakaszonként: név, alapérték és mostani sebesség, változás aránya és hogy regresszió-e
+
+    Raises:
+        ValueError: Ha az alapérték más formátumú vagy más beállításokkal készült
+    """
+    if baseline.get('format') != results.get('format'):
+        raise ValueError(f"Az alapérték formátuma eltér: {baseline.get('format')} != {results.get('format')}")
+    if baseline.get('config') != results.get('config'):
+        raise ValueError(f"Az alapérték más beállításokkal készült: {baseline.get('config')}")
+
+    comparison = []
+    for stage in STAGES:
+        before = baseline['stages'].get(stage, {}).get('per_second')
+        after = results['stages'].get(stage, {}).get('per_second')
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        comparison.append({'stage': stage, 'baseline': before, 'current': after, 'change': round(change, 4),
+                           'regression': change < -threshold})
+    return comparison
@@ -1,3 +1,4 @@
 from .fetch_gazette import GazetteFetcher
+from .backfill import GazetteBackfill
 
-__all__ = ['GazetteFetcher']
\ No newline at end of file
+__all__ = ['GazetteFetcher', 'GazetteBackfill']
\ No newline at end of file
@@ -0,0 +1,201 @@
+import time
+import logging
+import threading
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import format_datetime
+from typing import Callable, Dict, Iterator, List, Optional
+from metrics import metrics
+from .fetch_gazette import NotPdfError
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Legfeljebb `rate` kérés másodpercenként, az összes szálra együtt (egyenletes elosztással)"""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class GazetteBackfill:
+    """
+    Visszamenőleges letöltés a feed-ből már kikerült közlönyökhöz: a lapszámok évenként, sorszám
+    szerint (MK_YY_NNN) kerülnek lekérésre egy URL sablon alapján. A letöltés, a tárolás és a
+    másolatok kezelése a GazetteFetcher-é; itt csak a lapszámok felsorolása, a párhuzamosság
+    és kéréskorlát, valamint az ellenőrzőpont kezelése történik.
+    """
+
+    URL_TEMPLATE = "https://magyarkozlony.hu/dokumentumok/MK_{yy}_{number:03d}/letoltes"
+    # Ennyi egymást követő hiányzó lapszám után tekintjük befejezettnek az évet
+    MAX_MISSING = 5
+
+    def __init__(self, fetcher, url_template: Optional[str] = None, concurrency: Optional[int] = None,
+                 rate: Optional[float] = None, max_missing: Optional[int] = None):
+        """
+        Args:
+            fetcher: A GazetteFetcher (munkamenet, letöltési könyvtár, repository)
+            url_template: A lapszám URL sablonja ({year}, {yy} és {number} mezőkkel)
+            concurrency: Egyszerre futó letöltések száma (alapértelmezett: a fetcher beállítása)
+            rate: Legfeljebb ennyi kérés indul másodpercenként (None: nincs korlát)
+            max_missing: Felső határ nélkül ennyi egymást követő hiányzó lapszám jelzi az év végét
+        """
+        self.fetcher = fetcher
+        self.repository = fetcher.repository
+        self.url_template = url_template or self.URL_TEMPLATE
+        self.concurrency = max(1, concurrency or fetcher.max_concurrent_downloads)
+        self.rate_limiter = RateLimiter(rate)
+        self.max_missing = max_missing or self.MAX_MISSING
+        self._stop = threading.Event()
+        # A címlap olvasó (pypdfium2) csak itt kell, a letöltő modul betöltését nem lassítja; a letöltő
+        # szálak indulása előtt töltődik be, és a gdmonitor csomagot (a nyelvi modellt) nem importálja
+        from .cover_page import read_publication_date
+        self._read_publication_date = read_publication_date
+
+    def stop(self):
+        """Leállítás: a futó letöltések befejeződnek, újak nem indulnak"""
+        self._stop.set()
+
+    def issue(self, year: int, number: int) -> Dict:
+        """
+        Egy lapszám bejegyzése a fetcher számára (a feed bejegyzéseivel azonos szerkezetben).
+        A megjelenés dátuma a letöltés után a címlapról kerül kiolvasásra, addig az év első napja.
+        """
+        url = self.url_template.format(year=year, yy=f"{year % 100:02d}", number=number)
+        return {
+            'title': f"Magyar Közlöny {year}. évi {number}. szám",
+            'url': url,
+            # A feed pubDate mezőjével azonos (RFC 2822) formátum
+            'published': format_datetime(datetime(year, 1, 1)),
+            'number': number,
+        }
+
+    def _publication_date(self, entry: Dict, filename: str):
+        """A megjelenés dátuma a letöltött közlöny címlapjáról (ha nem olvasható, marad az év első napja)"""
+        try:
+            published = self._read_publication_date(str(self.fetcher.download_path / filename))
+        except Exception as e:
+            logger.debug(f"A címlap nem olvasható: {entry['title']} - {e}")
+            published = None
+        if published is None:
+            logger.warning(f"A megjelenés dátuma nem állapítható meg, az év első napja kerül mentésre: {entry['title']}")
+            return
+        entry['published'] = format_datetime(datetime(published.year, published.month, published.day))
+
+    def _fetch(self, entry: Dict):
+        """
+        Egy lapszám letöltése (munkaszálon); None, ha a lapszám nem létezik (404, vagy a webhely
+        PDF helyett hibaoldalt ad)
+        """
+        self.rate_limiter.wait()
+        try:
+            result = self.fetcher.download_entry(entry)
+        except NotPdfError as e:
+            logger.debug(f"{e}")
+            return None
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+        self._publication_date(entry, result[0])
+        return result
+
+    def _numbers(self, first: int, last: Optional[int]) -> Iterator[int]:
+        number = first
+        while last is None or number <= last:
+            yield number
+            number += 1
+
+    def run(self, year: int, first: int = 1, last: Optional[int] = None,
+            on_downloaded: Optional[Callable[[Dict], None]] = None,
+            stop_event: Optional[threading.Event] = None) -> List[str]:
+        """
+        Egy év lapszámainak letöltése first-től last-ig (ha nincs megadva, amíg max_missing
+        egymást követő lapszám hiányzik). A futás az ellenőrzőpont utáni lapszámnál folytatódik;
+        az ellenőrzőpont csak hézag nélkül sikeres lapszámokig lép előre, így egy hiba vagy
+        megszakítás utáni futás a hibás lapszámtól kezdi. A már letöltött URL-ek kimaradnak.
+
+        Args:
+            on_downloaded: Minden letöltött (nem másolat) közlönnyel meghívva, pl. az elemzéshez
+            stop_event: Beállítása után újabb letöltés nem indul (a stop() hívással azonos hatású)
+
+        Returns:
+            A sikeresen letöltött fájlok listája
+        """
+        checkpoint = self.repository.get_backfill_checkpoint(year)
+        start = max(first, checkpoint + 1)
+        if last is not None and start > last:
+            logger.info(f"A {year}. év {first}-{last}. lapszámai már feldolgozásra kerültek")
+            return []
+        logger.info(f"Visszamenőleges letöltés: {year}, {start}. lapszámtól "
+                    f"{f'{last}. lapszámig' if last is not None else 'az év végéig'}")
+
+        downloaded = []
+        missing = 0
+        failed = False
+        numbers = self._numbers(start, last)
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='backfill') as executor:
+            def fill():
+                while len(window) < self.concurrency * 2 and not self._stop.is_set() \
+                        and not (stop_event is not None and stop_event.is_set()):
+                    number = next(numbers, None)
+                    if number is None:
+                        return
+                    entry = self.issue(year, number)
+                    if not self.repository.filter_new_urls([entry['url']]):
+                        window.append((entry, None))
+                    else:
+                        window.append((entry, executor.submit(self._fetch, entry)))
+
+            fill()
+            # Az eredmények lapszám sorrendben kerülnek feldolgozásra (az adatbázisba csak ez a szál ír)
+            while window:
+                entry, future = window.popleft()
+                try:
+                    result = future.result() if future else None
+                    if future and result is None:
+                        # A hiányzó lapszám nem kerül az ellenőrzőpontba: a folyó év még megjelenhet
+                        missing += 1
+                        metrics.inc('backfill_missing_total')
+                        logger.debug(f"Nem létező lapszám: {entry['title']}")
+                    else:
+                        missing = 0
+                        if future:
+                            filename, sha256 = result
+                            gazette = self.fetcher.save_entry(entry, filename, sha256)
+                            logger.info(f"Sikeresen letöltve: {entry['title']} -> {filename}")
+                            downloaded.append(str(self.fetcher.download_path / filename))
+                            if gazette and on_downloaded:
+                                on_downloaded(gazette)
+                        if not failed:
+                            self.repository.save_backfill_checkpoint(year, entry['number'])
+                except Exception as e:
+                    logger.error(f"Hiba történt a letöltés közben: {entry['title']} - {e}")
+                    metrics.inc('download_errors_total')
+                    failed = True
+
+                if last is None and missing >= self.max_missing:
+                    logger.info(f"{missing} egymást követő hiányzó lapszám, a {year}. év vége")
+                    # A már elindított, az év vége utáni kérések eredménye nem érdekes
+                    for _, pending in window:
+                        if pending:
+                            pending.cancel()
+                    window.clear()
+                    break
+                fill()
+
+        logger.info(f"Visszamenőleges letöltés kész: {len(downloaded)} közlöny letöltve ({year})")
+        return downloaded
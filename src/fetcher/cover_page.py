@@ -0,0 +1,34 @@
+import re
+import pypdfium2 as pdfium
+from datetime import date
+from typing import Optional
+
+_MONTHS = ['január', 'február', 'március', 'április', 'május', 'június', 'július', 'augusztus',
+           'szeptember', 'október', 'november', 'december']
+# A címlap dátumsora: "2025. március 3., hétfő"
+_COVER_DATE = re.compile(r'^\s*(\d{4})\.\s*(' + '|'.join(_MONTHS) + r')\s+(\d{1,2})\.,', re.MULTILINE)
+
+def read_publication_date(pdf_path: str) -> Optional[date]:
+    """
+    A közlöny megjelenési dátuma a címlap dátumsorából; None, ha nem található.
+    Csak a pypdfium2-t használja, a gdmonitor csomagot (és vele a nyelvi modellt) nem tölti be.
+    """
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page = pdf[0]
+        textpage = page.get_textpage()
+        try:
+            cover = textpage.get_text_bounded()
+        finally:
+            textpage.close()
+            page.close()
+    finally:
+        pdf.close()
+    match = _COVER_DATE.search(cover)
+    if not match:
+        return None
+    year, month, day = match.groups()
+    try:
+        return date(int(year), _MONTHS.index(month) + 1, int(day))
+    except ValueError:
+        return None
@@ -1,14 +1,27 @@
+import io
+import os
+import hashlib
+import itertools
 import logging
+import threading
 import requests
 import certifi
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from metrics import metrics
 from repository import GazetteRepository
 
 logger = logging.getLogger(__name__)
 
+class NotPdfError(IOError):
+    """A letöltött tartalom nem PDF (pl. nem létező lapszámnál a webhely HTML hibaoldala)"""
+
 class GazetteFetcher:
     """Magyar Közlöny letöltő osztály"""
     
@@ -16,6 +29,9 @@ class GazetteFetcher:
     DB_FILE = "gazettes.db"
     DOWNLOAD_DIR = "downloads"
     CERTIFICATE_PATH = "certificates"
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024
+    # A letöltött PDF-ek tartalom (SHA-256) szerinti tárolási könyvtára a letöltési könyvtáron belül
+    BLOB_DIR = "blobs"
     
     def __init__(self, 
                  feed_url:str,
@@ -23,13 +39,17 @@ class GazetteFetcher:
                  download_path:str,
                  certificate_path: Optional[str] = None, 
                  base_dir: Optional[str] = None, 
-                 since_date: Optional[str] = None):
+                 since_date: Optional[str] = None,
+                 max_concurrent_downloads: int = 1,
+                 per_host_limit: int = 2):
         """
         Inicializálja a Magyar Közlöny letöltőt
         
         Args:
             base_dir: Alap könyvtár, ahol az adatbázist és letöltéseket tárolja
                      Ha nincs megadva, az aktuális munkakönyvtárat használja
+            max_concurrent_downloads: Egyszerre futó letöltések száma (1 = soros letöltés)
+            per_host_limit: Egy szerver felé egyszerre nyitott letöltések legnagyobb száma
         """
         
         self.FEED_URL = feed_url if feed_url else self.FEED_URL
@@ -63,7 +83,20 @@ class GazetteFetcher:
         # Repository inicializálása
         self.repository = GazetteRepository(self.db_path)
 
+        # Párhuzamos letöltés beállításai
+        self.max_concurrent_downloads = max(1, max_concurrent_downloads)
+        self.per_host_limit = max(1, per_host_limit)
+        self._host_slots: Dict[str, threading.Semaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        self._pending_feed_state = None
+        # Az utolsó fetch_new_gazettes() hívás hibája (None, ha hibátlan volt), pl. a folyamatos futás visszalépéséhez
+        self.last_error: Optional[str] = None
+
         self.session = requests.Session()
+        # A szálak közösen használják a keep-alive kapcsolatokat
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, self.max_concurrent_downloads))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
@@ -96,37 +129,73 @@ class GazetteFetcher:
             logger.warning(f"Nem sikerült feldolgozni a dátumot: {pub_date_str} - {e}")
             return None
 
+    def _conditional_headers(self, state: Optional[Dict]) -> Dict[str, str]:
+        """Feltételes kérés fejlécei az előző lekérés ETag / Last-Modified értékéből"""
+        headers = {}
+        if state:
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
+        return headers
+
+    @metrics.timed('feed_fetch_seconds')
     def fetch_feed(self) -> List[Dict]:
         """
         RSS feed letöltése és feldolgozása
         
+        Feltételes kérést küld (If-None-Match / If-Modified-Since); ha a feed nem változott (304),
+        azonnal üres listával tér vissza. Változás esetén csak az előző lekérés óta megjelent
+        bejegyzéseket dolgozza fel: a feed a legújabbal kezdődik, így az első már látott
+        bejegyzésnél megáll. Az új állapotot a save_feed_state() menti el.
+        
         Returns:
             A Magyar Közlöny bejegyzések listája
         """
+        # Más dátum szűrővel korábban kihagyott bejegyzések is érdekesek lehetnek, ilyenkor teljes lekérés
+        since = self.since_date.strftime("%Y-%m-%d") if self.since_date else None
+        state = self.repository.get_feed_state(self.FEED_URL)
+        if state and state.get('since_date') != since:
+            state = None
+        self._pending_feed_state = None
+        
         try:
-            response = self.session.get(self.FEED_URL, timeout=30, verify=False)
+            response = self.session.get(self.FEED_URL, timeout=30, verify=False, headers=self._conditional_headers(state))
+            if response.status_code == 304:
+                logger.info("A feed nem változott az előző lekérés óta")
+                metrics.inc('feed_requests_total', result='not_modified')
+                return []
             response.raise_for_status()
+            metrics.inc('feed_requests_total', result='ok')
             
-            # XML feldolgozása
-            root = ET.fromstring(response.content)
-
-            # Bejegyzések kinyerése (RSS formátum)
-            entries = []
-            items = root.findall('.//item')
-            logger.info(f"Bejegyzések száma a feed-ben: {len(items)}")
+            last_seen = datetime.fromisoformat(state['last_pub_date']) if state and state.get('last_pub_date') else None
+            newest = last_seen
             
-            for item in items:
+            # XML feldolgozása elemenként, hogy a már látott bejegyzéseknél abba lehessen hagyni
+            entries = []
+            item_count = 0
+            for _, item in ET.iterparse(io.BytesIO(response.content), events=('end',)):
+                if item.tag != 'item':
+                    continue
+                item_count += 1
+                
+                pubdate_elem = item.find('pubDate')
+                published_str = pubdate_elem.text if pubdate_elem is not None else ""
+                
+                # Dátum feldolgozása
+                published_date = self._parse_pub_date(published_str)
+                
+                if published_date and last_seen and published_date <= last_seen:
+                    logger.debug(f"Az előző lekérés óta nincs több új bejegyzés ({item_count}. bejegyzésnél)")
+                    break
+                if published_date and (newest is None or published_date > newest):
+                    newest = published_date
+                
                 title_elem = item.find('title')
                 title = title_elem.text if title_elem is not None else ""
                 
                 # Csak a Magyar Közlöny bejegyzéseket szűrjük
                 if "Magyar Közlöny" in title:
-                    pubdate_elem = item.find('pubDate')
-                    published_str = pubdate_elem.text if pubdate_elem is not None else ""
-                    
-                    # Dátum feldolgozása
-                    published_date = self._parse_pub_date(published_str)
-                    
                     # Dátum szűrés alkalmazása
                     if self.since_date and published_date:
                         if published_date.date() <= self.since_date.date():
@@ -146,14 +215,35 @@ class GazetteFetcher:
                     })
                     
                     logger.info(f"Magyar Közlöny találat: {title} - {published_date.date() if published_date else 'Ismeretlen dátum'}")
+                item.clear()
+            
+            logger.info(f"Feldolgozott bejegyzések száma a feed-ben: {item_count}")
+            logger.info(f"Összesen {len(entries)} új Magyar Közlöny bejegyzés található")
             
-            logger.info(f"Összesen {len(entries)} Magyar Közlöny bejegyzés található")
+            self._pending_feed_state = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'last_pub_date': newest.isoformat() if newest else None,
+                'since_date': since
+            }
             return entries
             
         except Exception as e:
             logger.error(f"Hiba történt az RSS feed lekérése közben: {e}")
+            metrics.inc('feed_requests_total', result='error')
+            self.last_error = f"RSS feed: {e}"
             return []
     
+    def save_feed_state(self) -> None:
+        """
+        Az utolsó fetch_feed() hívás állapotának (ETag, Last-Modified, legújabb pubDate) mentése.
+        Csak akkor szabad hívni, ha a visszaadott bejegyzések feldolgozása sikeres volt,
+        különben a következő lekérés nem látná újra őket.
+        """
+        if self._pending_feed_state:
+            self.repository.save_feed_state(self.FEED_URL, **self._pending_feed_state)
+            self._pending_feed_state = None
+    
     def is_already_downloaded(self, url: str) -> bool:
         return self.repository.is_already_downloaded(url)
     
@@ -171,76 +261,281 @@ class GazetteFetcher:
             logger.info(f"A közlöny már le volt töltve: {entry['title']}")
             return False, None
         
+        return self._download_and_save(entry)
+    
+    def _download_and_save(self, entry: Dict, on_downloaded: Optional[Callable[[Dict], None]] = None) -> Tuple[bool, Optional[str]]:
+        """Letöltés a korábbi letöltés ellenőrzése nélkül (ezt a hívó végzi)"""
         try:
-            # PDF URL kinyerése (ha az entry['url'] nem közvetlenül PDF-re mutat)
-            if entry['url'].endswith('.pdf'):
-                pdf_url = entry['url']
-            else:
-                # Ha szükséges, itt lehet kiegészítő logika a PDF URL kinyeréséhez
-                # a közlöny oldalából
-                pdf_url = entry['url']
-            
-            # Fájlnév generálás a címből
-            filename = self._generate_filename(entry['title'])
-            filepath = self.download_path / filename
-            
-            # PDF letöltése
-            response = self.session.get(pdf_url, stream=True, timeout=60, verify=False)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            filename, sha256 = self.download_entry(entry)
             
             # Mentés az adatbázisba
-            self._save_to_database(entry, filename)
+            gazette = self.save_entry(entry, filename, sha256)
             
             logger.info(f"Sikeresen letöltve: {entry['title']} -> {filename}")
-            return True, filename
-            
         except Exception as e:
             logger.error(f"Hiba történt a letöltés közben: {e}")
+            metrics.inc('download_errors_total')
             return False, None
+        
+        if gazette and on_downloaded:
+            on_downloaded(gazette)
+        return True, filename
+    
+    @contextmanager
+    def _host_slot(self, url: str):
+        """Udvariassági korlát: egy szerver felé legfeljebb per_host_limit egyidejű kérés"""
+        host = urlparse(url).netloc
+        with self._host_slots_lock:
+            slot = self._host_slots.setdefault(host, threading.BoundedSemaphore(self.per_host_limit))
+        with slot:
+            yield
+    
+    def _partial_path(self, url: str) -> Path:
+        """
+        A félbemaradt letöltés ideiglenes fájlja. A neve az URL-ből képzett, így egy
+        megszakadt letöltés a következő futáskor is megtalálható és folytatható.
+        """
+        return self.download_path / f".{hashlib.sha1(url.encode('utf-8')).hexdigest()}.part"
+    
+    @staticmethod
+    def _validator(response) -> Optional[str]:
+        """A válasz változatának azonosítója az If-Range fejléchez (erős ETag, vagy Last-Modified)"""
+        etag = response.headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return response.headers.get('Last-Modified')
     
-    def _generate_filename(self, title: str) -> str:
-        """Fájlnév generálása a címből"""
-        # Cím tisztítása fájlnévhez
-        clean_title = "".join(c if c.isalnum() or c in "._- " else "_" for c in title)
-        clean_title = clean_title.replace(" ", "_")
+    @staticmethod
+    def _range_start(response) -> Optional[int]:
+        """A 206-os válasz Content-Range fejlécének kezdő bájtja ("bytes N-M/összes")"""
+        content_range = response.headers.get('Content-Range', '')
+        unit, _, span = content_range.partition(' ')
+        start = span.split('-', 1)[0]
+        return int(start) if unit == 'bytes' and start.isdigit() else None
+    
+    @metrics.timed('download_seconds')
+    def download_entry(self, entry: Dict) -> Tuple[str, str]:
+        """
+        A közlöny PDF letöltése a letöltési könyvtárba (adatbázis írás nélkül).
+        A letöltés ideiglenes fájlba történik, amely csak a teljes tartalom megérkezése után
+        kapja meg a végleges nevét (atomi átnevezés). Egy korábban megszakadt letöltést
+        HTTP Range kéréssel folytat, ha a szerver ezt támogatja. A folytatás csak akkor fűződik
+        a meglévő részhez, ha a fájl azóta nem változott (If-Range az első válasz ETag/Last-Modified
+        értékével) és a szerver pontosan a kért bájttól küldi a tartalmat; különben elölről kezdi.
+        A mentést a hívó végzi a save_entry hívással (pl. a GazetteBackfill a saját sorrendjében).
+        
+        Returns:
+            Tuple (a mentett fájl neve, a tartalom SHA-256 hash-e)
+        
+        Raises:
+            NotPdfError: Ha a válasz nem PDF (pl. hibaoldal)
+            requests.HTTPError: Sikertelen HTTP válasz esetén (pl. 404)
+        """
+        # PDF URL kinyerése (ha az entry['url'] nem közvetlenül PDF-re mutat)
+        if entry['url'].endswith('.pdf'):
+            pdf_url = entry['url']
+        else:
+            # Ha szükséges, itt lehet kiegészítő logika a PDF URL kinyeréséhez
+            # a közlöny oldalából
+            pdf_url = entry['url']
+        
+        part_path = self._partial_path(entry['url'])
+        # A részhez tartozó változat azonosító (ETag vagy Last-Modified), a folytatás feltétele
+        validator_path = part_path.with_suffix('.validator')
+        validator = validator_path.read_text(encoding='utf-8') if validator_path.exists() else None
         
-        # Időbélyeg hozzáadása az egyediség érdekében
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        # A már meglévő rész hash-e, a folytatás ehhez fűződik
+        digest = hashlib.sha256()
+        offset = 0
+        if part_path.exists() and validator:
+            with open(part_path, 'rb') as f:
+                for block in iter(lambda: f.read(self.DOWNLOAD_CHUNK_SIZE), b''):
+                    digest.update(block)
+                    offset += len(block)
         
-        return f"{clean_title}_{timestamp}.pdf"
+        # PDF letöltése
+        with self._host_slot(pdf_url):
+            headers = {'Range': f'bytes={offset}-', 'If-Range': validator} if offset else {}
+            response = self.session.get(pdf_url, stream=True, timeout=60, verify=False, headers=headers)
+            if offset and response.status_code == 416 and response.headers.get('Content-Range') == f'bytes */{offset}':
+                # A rész már a teljes fájl
+                response.close()
+                response = None
+            elif offset and (response.status_code != 206 or self._range_start(response) != offset):
+                # A fájl azóta változott, vagy a szerver nem a kért helytől folytatja: elölről kezdjük
+                logger.info(f"A letöltés nem folytatható, újrakezdés: {entry['title']}")
+                digest = hashlib.sha256()
+                offset = 0
+                if response.status_code != 200:
+                    response.close()
+                    response = self.session.get(pdf_url, stream=True, timeout=60, verify=False)
+            elif offset:
+                logger.info(f"Letöltés folytatása {offset} bájttól: {entry['title']}")
+            
+            if response is not None:
+                response.raise_for_status()
+                expected_length = response.headers.get('Content-Length')
+                received = 0
+                chunks = response.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE)
+                if not offset:
+                    # Hibaoldal (pl. 200-as HTML válasz) nem kerülhet PDF-ként a tárolóba
+                    first = next(chunks, b'')
+                    content_type = response.headers.get('Content-Type', '')
+                    if 'html' in content_type.lower() or not first.startswith(b'%PDF-'):
+                        response.close()
+                        raise NotPdfError(f"A válasz nem PDF ({content_type or 'ismeretlen típus'}): {pdf_url}")
+                    chunks = itertools.chain([first], chunks)
+                    # Megszakadás esetén a folytatás csak ugyanehhez a változathoz fűzhető
+                    validator = self._validator(response)
+                    if validator:
+                        validator_path.write_text(validator, encoding='utf-8')
+                    else:
+                        validator_path.unlink(missing_ok=True)
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        received += len(chunk)
+                metrics.inc('download_bytes_total', received)
+                # Tömörített átvitelnél a Content-Length nem a kicsomagolt méret
+                if expected_length is not None and not response.headers.get('Content-Encoding') and received != int(expected_length):
+                    raise IOError(f"Hiányos letöltés: {received} / {expected_length} bájt")
+        
+        # Tartalom szerinti tárolás: azonos tartalom csak egyszer kerül a lemezre
+        sha256 = digest.hexdigest()
+        filename = self._blob_filename(sha256)
+        filepath = self.download_path / filename
+        if filepath.exists():
+            part_path.unlink()
+        else:
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part_path, filepath)
+        validator_path.unlink(missing_ok=True)
+        return filename, sha256
     
-    def _save_to_database(self, entry: Dict, filename: str) -> None:
-        self.repository.save_gazette(
-            entry['title'], 
-            entry['published'], 
-            entry['url'], 
-            filename
-        )
+    def _download_concurrently(self, entries: List[Dict], on_downloaded: Optional[Callable[[Dict], None]] = None,
+                               stop_event: Optional[threading.Event] = None) -> List[str]:
+        """
+        Közlönyök párhuzamos letöltése szálkészlettel.
+        A letöltések párhuzamosan futnak, az adatbázisba viszont csak a hívó szál ír
+        (egyetlen, sorosított író), a befejezés sorrendjében. Leállításkor a még el nem
+        indult letöltések elmaradnak, a már befejezettek mentésre kerülnek.
+        
+        Returns:
+            A sikeresen letöltött fájlok listája (a bejegyzések sorrendjében)
+        """
+        downloaded = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_downloads, thread_name_prefix='download') as executor:
+            futures = {executor.submit(self.download_entry, entry): index for index, entry in enumerate(entries)}
+            for future in as_completed(futures):
+                if stop_event is not None and stop_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                if future.cancelled():
+                    continue
+                entry = entries[futures[future]]
+                try:
+                    filename, sha256 = future.result()
+                    gazette = self.save_entry(entry, filename, sha256)
+                except Exception as e:
+                    logger.error(f"Hiba történt a letöltés közben: {entry['title']} - {e}")
+                    metrics.inc('download_errors_total')
+                    continue
+                logger.info(f"Sikeresen letöltve: {entry['title']} -> {filename}")
+                downloaded[futures[future]] = str(self.download_path / filename)
+                if gazette and on_downloaded:
+                    on_downloaded(gazette)
+        
+        return [downloaded[index] for index in sorted(downloaded)]
+    
+    def _blob_filename(self, sha256: str) -> str:
+        """A tartalom SHA-256 hash-éből képzett, a letöltési könyvtárhoz viszonyított fájlnév"""
+        return f"{self.BLOB_DIR}/{sha256[:2]}/{sha256}.pdf"
+    
+    def save_entry(self, entry: Dict, filename: str, sha256: Optional[str] = None) -> Optional[Dict]:
+        """
+        A letöltött közlöny mentése. Ha azonos tartalmú közlöny már van az adatbázisban
+        (pl. megváltozott URL miatt), az új sor annak másolataként, elemzettként kerül mentésre.
+        
+        Returns:
+            Az elemzendő közlöny adatai, vagy None, ha a közlöny egy már meglévő másolata
+        """
+        with self.repository.transaction():
+            original = self.repository.find_gazette_by_sha256(sha256) if sha256 else None
+            if original:
+                logger.info(f"Azonos tartalmú közlöny már letöltve: {entry['title']} = {original['title']}")
+            elif sha256:
+                self.repository.save_blob(sha256, filename, (self.download_path / filename).stat().st_size)
+            gazette_id = self.repository.save_gazette(
+                entry['title'], 
+                entry['published'], 
+                entry['url'], 
+                filename,
+                sha256,
+                duplicate_of=original['id'] if original else None
+            )
+        metrics.inc('downloads_total', duplicate=str(bool(original)).lower())
+        if original:
+            return None
+        return {
+            'id': gazette_id,
+            'title': entry['title'],
+            'publication_date': entry['published'],
+            'filename': filename,
+            'sha256': sha256
+        }
     
-    def fetch_new_gazettes(self) -> List[str]:
+    def fetch_new_gazettes(self, on_downloaded: Optional[Callable[[Dict], None]] = None,
+                           stop_event: Optional[threading.Event] = None) -> List[str]:
         """
         Új Magyar Közlönyök letöltése
         
+        Args:
+            on_downloaded: Minden sikeresen letöltött és mentett (nem másolat) közlöny
+                adataival azonnal meghívott függvény, pl. az elemzés elindításához
+            stop_event: Beállítása után újabb letöltés nem indul (a feed állapota nem lép tovább)
+        
         Returns:
             A sikeresen letöltött fájlok listája
         """
         downloaded_files = []
+        self.last_error = None
         
         # RSS feed letöltése
         entries = self.fetch_feed()
         
         if not entries:
-            logger.warning("Nem találhatók Magyar Közlöny bejegyzések a feed-ben")
+            logger.info("Nincs új Magyar Közlöny bejegyzés a feed-ben")
+            self.save_feed_state()
             return downloaded_files
         
-        # Közlönyök letöltése, amelyek még nem voltak letöltve
+        # Közlönyök letöltése, amelyek még nem voltak letöltve; a teljes feed egy lekérdezéssel szűrve
+        new_urls = set(self.repository.filter_new_urls([entry['url'] for entry in entries]))
+        pending = []
         for entry in entries:
-            success, filename = self.download_gazette(entry)
-            if success and filename:
-                downloaded_files.append(str(self.download_path / filename))
+            if entry['url'] not in new_urls:
+                logger.info(f"A közlöny már le volt töltve: {entry['title']}")
+                continue
+            new_urls.discard(entry['url'])
+            pending.append(entry)
+        
+        if self.max_concurrent_downloads > 1 and len(pending) > 1:
+            downloaded_files = self._download_concurrently(pending, on_downloaded, stop_event)
+        else:
+            for entry in pending:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                success, filename = self._download_and_save(entry, on_downloaded)
+                if success and filename:
+                    downloaded_files.append(str(self.download_path / filename))
+        
+        # A feed állapota csak hibátlan letöltés után léptethető tovább
+        if stop_event is not None and stop_event.is_set() and len(downloaded_files) < len(pending):
+            logger.info("Leállítás: a hátralévő közlönyök a következő futással töltődnek le")
+        elif len(downloaded_files) == len(pending):
+            self.save_feed_state()
+        else:
+            logger.warning("Nem minden közlöny töltődött le, a következő futás újra feldolgozza a feed-et")
+            self.last_error = f"{len(pending) - len(downloaded_files)} közlöny letöltése sikertelen"
                 
         return downloaded_files
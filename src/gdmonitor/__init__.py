@@ -1,9 +1,19 @@
-from .pdf_processor import extract_text_from_pdf
-from .resulation_analyzer import analyze_gdecision
-from .resulation_extractor import extract_resolutions
+from .pdf_processor import extract_text_from_pdf, iter_text_from_pdf, iter_text_cached
+from .resulation_analyzer import analyze_gdecision, analyze_resolutions, summarize_contents
+from .resulation_extractor import extract_resolutions, iter_resolutions
+from .keyword_ruleset import KeywordRuleset, load_ruleset
+from .instrumentation import set_metrics
 
 __all__ = [
     'extract_text_from_pdf',
+    'iter_text_from_pdf',
+    'iter_text_cached',
     'analyze_gdecision',
-    'extract_resolutions'
+    'analyze_resolutions',
+    'summarize_contents',
+    'extract_resolutions',
+    'iter_resolutions',
+    'KeywordRuleset',
+    'load_ruleset',
+    'set_metrics'
 ]
\ No newline at end of file
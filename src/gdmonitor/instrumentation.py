@@ -0,0 +1,58 @@
+import time
+from functools import wraps
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class Instrumentation:
+    """
+    A könyvtár mérési pontjai. Alapértelmezetten semmit nem mér; az alkalmazás a set_metrics()
+    hívással köti be a saját gyűjtőjét (inc, observe, timer és enabled tagokkal), így a gdmonitor
+    nem függ az alkalmazás csomagjaitól. A gyűjtő a hívás pillanatában kerül feloldásra, a már
+    dekorált függvények is a később bekötött gyűjtőbe mérnek.
+    """
+
+    def __init__(self):
+        self.registry = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.registry is not None and self.registry.enabled
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if self.registry is not None:
+            self.registry.inc(name, value, **labels)
+
+    def observe(self, name: str, seconds: float, **labels):
+        if self.registry is not None:
+            self.registry.observe(name, seconds, **labels)
+
+    def timer(self, name: str, **labels):
+        return self.registry.timer(name, **labels) if self.registry is not None else _NULL_TIMER
+
+    def timed(self, name: str, **labels):
+        """Dekorátor: a függvény futási idejének rögzítése (ha a bekötött gyűjtő be van kapcsolva)"""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.registry.observe(name, time.perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+
+metrics = Instrumentation()
+
+def set_metrics(registry):
+    """A mérések gyűjtőjének bekötése (pl. a metrics csomag MetricsRegistry példánya); None: kikapcsolás"""
+    metrics.registry = registry
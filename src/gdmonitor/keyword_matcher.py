@@ -0,0 +1,88 @@
+import re
+import logging
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# A regex speciális karakterei: a kulcsszó eddig tartó része szó szerinti előtag
+_REGEX_META = set('.^$*+?{}[]\\|()')
+
+def _literal_prefix(keyword: str) -> str:
+    """A kulcsszó elejének az a része, amely nem tartalmaz regex speciális karaktert"""
+    for i, ch in enumerate(keyword):
+        if ch in _REGEX_META:
+            return keyword[:i]
+    return keyword
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Szavak listájából prefix-fa alapú regex alternáció készítése.
+    A minta akkor illeszkedik, ha a szöveg az adott pozíción bármelyik szóval kezdődik.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        # Egy teljes szó már illeszkedett, a folytatás nem számít
+        if '' in node:
+            return ''
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return '(?:' + '|'.join(alternatives) + ')'
+
+    return build(trie)
+
+class KeywordMatcher:
+    """
+    Több kulcsszó előfordulásainak megszámolása egyetlen menetben.
+    A kulcsszavak (kisbetűs) regex töredékek, mindegyik a szó elején kezdődik és a
+    szó végéig tart (\\b kulcsszó \\w* \\b). A kulcsszónkénti darabszám megegyezik a
+    kulcsszavanként futtatott re.findall eredményével.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(keywords)
+        self._patterns = [re.compile(r'\b' + keyword + r'\w*\b') for keyword in self.keywords]
+
+        # Kulcsszavak csoportosítása a szó szerinti előtagjuk szerint
+        self._by_prefix: Dict[str, List[int]] = {}
+        for index, keyword in enumerate(self.keywords):
+            self._by_prefix.setdefault(_literal_prefix(keyword), []).append(index)
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._by_prefix})
+
+        # Előszűrés: csak azokon a szóhatárokon kell vizsgálódni, ahol valamelyik előtag kezdődik.
+        # Nulla szélességű előretekintés, így az egymást átfedő találatok sem vesznek el
+        prefixes = [prefix for prefix in self._by_prefix if prefix]
+        if '' in self._by_prefix:
+            self._candidates = re.compile(r'\b')
+        elif prefixes:
+            self._candidates = re.compile(r'\b(?=' + _trie_pattern(prefixes) + ')')
+        else:
+            self._candidates = None
+
+    def count(self, text: str) -> List[int]:
+        """
+        Kulcsszavankénti találatszám (a kulcsszavak sorrendjében) egy már kisbetűs szövegben
+        """
+        counts = [0] * len(self.keywords)
+        if self._candidates is None:
+            return counts
+
+        # Kulcsszavanként az utolsó találat vége: a re.findall sem ad átfedő találatokat
+        last_end = [0] * len(self.keywords)
+        for candidate in self._candidates.finditer(text):
+            pos = candidate.start()
+            for length in self._prefix_lengths:
+                for index in self._by_prefix.get(text[pos:pos + length], ()):
+                    if pos < last_end[index]:
+                        continue
+                    match = self._patterns[index].match(text, pos)
+                    if match:
+                        counts[index] += 1
+                        last_end[index] = match.end()
+        return counts
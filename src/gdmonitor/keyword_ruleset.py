@@ -0,0 +1,65 @@
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+class KeywordRuleset:
+    """
+    Kulcsszavas pontozási szabálykészlet. A verzió a kulcsszavakból és a súlyokból számolt hash,
+    így ugyanaz a szabálykészlet mindig ugyanazt a verziót kapja, bármelyik fájlból töltődik be.
+    """
+
+    def __init__(self, keywords: List[str], title_weight: int = 2, name: Optional[str] = None):
+        """
+        Args:
+            keywords: Kisbetűs kulcsszavak (regex töredékek)
+            title_weight: A címben való előfordulás súlya (a tartalomban 1)
+            name: Megjelenítési név, a verzióba nem számít bele
+        """
+        self.keywords = list(keywords)
+        self.title_weight = title_weight
+        self.name = name
+        self.version = hashlib.sha256(self.definition().encode('utf-8')).hexdigest()[:16]
+        self._matcher = KeywordMatcher(self.keywords)
+
+    def definition(self) -> str:
+        """A szabálykészlet kanonikus JSON alakja (ebből készül a verzió)"""
+        return json.dumps({'keywords': self.keywords, 'title_weight': self.title_weight},
+                          ensure_ascii=False, sort_keys=True)
+
+    def score(self, resolution: Dict) -> Tuple[int, List[str]]:
+        """
+        Relevancia pontszám és a talált kulcsszavak listája egy kormányhatározatra
+        """
+        relevance_score = 0
+        keyword_matches = []
+
+        # A címet és a tartalmat egyszer alakítjuk kisbetűssé, és egy-egy menetben számoljuk a kulcsszavakat
+        title_counts = self._matcher.count(resolution['title'].lower())
+        content_counts = self._matcher.count(resolution['content'].lower())
+
+        for keyword, title_matches, content_matches in zip(self.keywords, title_counts, content_counts):
+            if title_matches > 0 or content_matches > 0:
+                keyword_matches.append(keyword)
+                relevance_score += (title_matches * self.title_weight) + content_matches
+
+        return relevance_score, keyword_matches
+
+def load_ruleset(path: Path) -> KeywordRuleset:
+    """
+    Szabálykészlet betöltése JSON fájlból.
+    Formátum: {"name": "...", "title_weight": 2, "keywords": ["helyi önkormányzat", ...]}
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not config.get('keywords'):
+        raise ValueError(f"A szabálykészlet nem tartalmaz kulcsszavakat: {path}")
+    ruleset = KeywordRuleset([keyword.lower() for keyword in config['keywords']],
+                             title_weight=int(config.get('title_weight', 2)),
+                             name=config.get('name', Path(path).stem))
+    logger.debug(f"Szabálykészlet betöltve: {ruleset.name} ({ruleset.version}, {len(ruleset.keywords)} kulcsszó)")
+    return ruleset
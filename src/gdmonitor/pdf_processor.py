@@ -1,26 +1,282 @@
 import pdfplumber
+import pypdfium2 as pdfium
+import hashlib
 import logging
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version as package_version
+from typing import Dict, Iterable, Iterator, List, Optional
+from .instrumentation import metrics
+from .pdf_sections import find_decision_pages
 
 logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+EXTRACT_MODE_SERIAL = 'serial'
+EXTRACT_MODE_PARALLEL = 'parallel'
+
+PDF_BACKEND_PDFPLUMBER = 'pdfplumber'
+PDF_BACKEND_PDFIUM = 'pdfium'
+
+# Párhuzamos módban ennyi részre bontjuk folyamatonként az oldalakat,
+# hogy az első oldalak minél hamarabb továbbadhatók legyenek
+_CHUNKS_PER_WORKER = 4
+
+_WHITESPACE = re.compile(r'\s+')
+
+# A pdfium a sor végi elválasztójelet \x02 vezérlőkarakterként adja vissza
+_PDFIUM_HYPHEN = '\x02'
+# A pdfium a ritkított fejlécet betűnként adja vissza ("M A G Y A R K Ö Z L Ö N Y")
+_PDFIUM_SPACED_HEADER = re.compile(r'M A G Y A R K Ö Z L Ö N Y')
+
+class PdfplumberBackend:
+    """Szövegkinyerés a pdfplumber elrendezés-elemzésével (lassabb, ez a referencia)"""
+
+    name = PDF_BACKEND_PDFPLUMBER
+    version = f"pdfplumber-{pdfplumber.__version__}"
+
+    def page_count(self, pdf_path: str) -> int:
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+
+    def iter_pages(self, pdf_path: str, pages: Optional[range] = None) -> Iterator[str]:
+        with pdfplumber.open(pdf_path) as pdf:
+            pages = pages if pages is not None else range(len(pdf.pages))
+            for index in pages:
+                yield pdf.pages[index].extract_text() + '\n'
+
+class PdfiumBackend:
+    """
+    Szövegkinyerés a pypdfium2 (PDFium) karakterfolyamából, elrendezés-elemzés nélkül.
+    Veszteséges: a folyó szöveg a pdfplumber kimenetével azonos, de a táblázatok celláit a PDF
+    tartalomfolyamának sorrendjében adja, így a táblázatos határozatok tartalma eltér. Ezért
+    a pdfplumber az alapértelmezett.
+    """
+
+    name = PDF_BACKEND_PDFIUM
+    version = f"pdfium-{package_version('pypdfium2')}"
+
+    def page_count(self, pdf_path: str) -> int:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def iter_pages(self, pdf_path: str, pages: Optional[range] = None) -> Iterator[str]:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            pages = pages if pages is not None else range(len(pdf))
+            for index in pages:
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    text = textpage.get_text_bounded()
+                finally:
+                    textpage.close()
+                    page.close()
+                yield self.clean(text) + '\n'
+        finally:
+            pdf.close()
+
+    @staticmethod
+    def clean(text: str) -> str:
+        """A pdfium sajátosságainak igazítása a pdfplumber kimenetéhez"""
+        text = text.replace(_PDFIUM_HYPHEN, '-\n')
+        return _PDFIUM_SPACED_HEADER.sub('MAGYAR KÖZLÖNY', text)
+
+PDF_BACKENDS: Dict[str, object] = {
+    PDF_BACKEND_PDFPLUMBER: PdfplumberBackend(),
+    PDF_BACKEND_PDFIUM: PdfiumBackend(),
+}
+
+def get_pdf_backend(name: str):
+    """A név szerinti szövegkinyerő backend ('pdfplumber' vagy 'pdfium')"""
+    try:
+        return PDF_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Ismeretlen PDF backend: {name}") from None
+
+# A kinyert szöveg formátumának verziója: ha a kinyerés módja változik, a régi
+# gyorsítótárazott szövegek érvénytelenné válnak
+EXTRACTOR_VERSION = f"1-{PdfplumberBackend.version}"
+
+def extractor_version(decisions_only: bool = False, backend: str = PDF_BACKEND_PDFPLUMBER) -> str:
+    """
+    A gyorsítótár kulcsa: a backendenként eltérő szöveg, illetve a csak a kormányhatározatokat
+    kinyerő mód szövege nem keveredhet a teljes szöveggel
+    """
+    version = f"1-{get_pdf_backend(backend).version}"
+    return f"{version}-decisions" if decisions_only else version
+
+def _extract_page_range(pdf_path: str, start: int, stop: int, backend: str = PDF_BACKEND_PDFPLUMBER) -> List[str]:
+    """
+    Egy oldaltartomány szövegének kinyerése (a párhuzamos feldolgozás munkaegysége).
+    Args:
+        pdf_path (str): A PDF fájl elérési útja.
+        start (int): Az első oldal indexe (0-tól számozva).
+        stop (int): Az utolsó utáni oldal indexe.
+        backend (str): A szövegkinyerő backend neve.
+    """
+    return list(get_pdf_backend(backend).iter_pages(pdf_path, range(start, stop)))
+
+def _split_page_range(page_count: int, chunks: int) -> List[tuple]:
+    """Az oldalak felosztása közel egyenlő, folytonos tartományokra"""
+    chunks = max(1, min(chunks, page_count))
+    size, rest = divmod(page_count, chunks)
+    ranges = []
+    start = 0
+    for i in range(chunks):
+        stop = start + size + (1 if i < rest else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def _iter_pages_parallel(pdf_path: str, workers: Optional[int], pages: Optional[range] = None,
+                         backend: str = PDF_BACKEND_PDFPLUMBER) -> Iterator[str]:
+    """Oldaltartományok feldolgozása folyamatkészletben, oldalsorrendben továbbadva"""
+    if pages is None:
+        pages = range(get_pdf_backend(backend).page_count(pdf_path))
+    if not pages:
+        return
+    workers = workers or os.cpu_count() or 1
+    ranges = _split_page_range(len(pages), workers * _CHUNKS_PER_WORKER)
+    logger.debug(f" - {len(pages)} oldal, {len(ranges)} részben, {workers} folyamattal")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_extract_page_range, str(pdf_path), pages.start + start, pages.start + stop, backend)
+                   for start, stop in ranges]
+        # A sorrendet a beküldés sorrendje adja, nem a befejezésé
+        for future in futures:
+            start = time.perf_counter()
+            page_texts = future.result()
+            metrics.observe('pdf_extract_seconds', time.perf_counter() - start, backend=backend, mode=EXTRACT_MODE_PARALLEL)
+            metrics.inc('pdf_pages_total', len(page_texts), backend=backend)
+            yield from page_texts
+
+def _iter_pages_serial(pdf_path: str, pages: Optional[range] = None,
+                       backend: str = PDF_BACKEND_PDFPLUMBER) -> Iterator[str]:
+    count = length = 0
+    busy = 0.0
+    # Csak a kinyerés ideje számít, a fogyasztóé (a két yield között) nem
+    start = time.perf_counter()
+    for page_text in get_pdf_backend(backend).iter_pages(pdf_path, pages):
+        busy += time.perf_counter() - start
+        count += 1
+        length += len(page_text)
+        yield page_text
+        start = time.perf_counter()
+    busy += time.perf_counter() - start
+    metrics.observe('pdf_extract_seconds', busy, backend=backend, mode=EXTRACT_MODE_SERIAL)
+    metrics.inc('pdf_pages_total', count, backend=backend)
+    logger.debug(f" - {count} oldal: {length} karakter ({backend})")
+
+def locate_decision_pages(pdf_path: str) -> Optional[range]:
+    """
+    A kormányhatározatokat tartalmazó oldalak tartománya (a könyvjelzők vagy a tartalomjegyzék alapján).
+    Üres tartomány, ha nincs a közlönyben kormányhatározat; None, ha nem állapítható meg.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return find_decision_pages(pdf)
+
+def normalize_pages(pages: Iterable[str]) -> Iterator[str]:
+    """
+    Oldalankénti whitespace tisztítás.
+    Az összefűzött kimenet megegyezik azzal, mintha a teljes szövegen futtatnánk
+    a re.sub(r'\\s+', ' ', ...) cserét: az oldalhatáron átnyúló whitespace is egy szóközzé olvad.
+    """
+    trailing_space = False
+    for page in pages:
+        page = _WHITESPACE.sub(' ', page)
+        if trailing_space and page.startswith(' '):
+            page = page[1:]
+        if page:
+            trailing_space = page.endswith(' ')
+            yield page
+
+def iter_text_from_pdf(pdf_path: str, mode: str = EXTRACT_MODE_SERIAL, workers: Optional[int] = None,
+                       decisions_only: bool = False, backend: str = PDF_BACKEND_PDFPLUMBER) -> Iterator[str]:
+    """
+    Oldalanként, tisztított formában adja vissza egy PDF fájl szövegét.
+    A hibákat nem kezeli, azok a fogyasztóhoz jutnak el.
+    Args:
+        pdf_path (str): A PDF fájl elérési útja.
+        mode (str): 'serial' (alapértelmezett) vagy 'parallel' - párhuzamos módban
+            az oldalak tartományokra bontva, külön folyamatokban kerülnek feldolgozásra.
+        workers (int): Párhuzamos módban a folyamatok száma (alapértelmezett: CPU magok száma).
+        decisions_only (bool): Csak a kormányhatározatokat tartalmazó oldalak kinyerése; ha ezek
+            helye nem állapítható meg, a teljes dokumentum kerül feldolgozásra.
+        backend (str): A szövegkinyerő backend: 'pdfplumber' (alapértelmezett) vagy 'pdfium'.
+    """
+    if mode not in (EXTRACT_MODE_SERIAL, EXTRACT_MODE_PARALLEL):
+        raise ValueError(f"Ismeretlen feldolgozási mód: {mode}")
+    get_pdf_backend(backend)
+    page_range = None
+    if decisions_only:
+        page_range = locate_decision_pages(pdf_path)
+        if page_range is None:
+            logger.debug(f" - A kormányhatározatok helye nem állapítható meg, teljes feldolgozás: {pdf_path}")
+    if mode == EXTRACT_MODE_PARALLEL:
+        pages = _iter_pages_parallel(pdf_path, workers, page_range, backend)
+    else:
+        pages = _iter_pages_serial(pdf_path, page_range, backend)
+    return normalize_pages(pages)
+
+def extract_text_from_pdf(pdf_path: str, mode: str = EXTRACT_MODE_SERIAL, workers: Optional[int] = None,
+                          backend: str = PDF_BACKEND_PDFPLUMBER) -> str:
     """
     Kivonatolja a szöveget egy PDF fájlból.
     Args:
         pdf_path (str): A PDF fájl elérési útja.
+        mode (str): 'serial' (alapértelmezett) vagy 'parallel'.
+        workers (int): Párhuzamos módban a folyamatok száma.
+        backend (str): 'pdfplumber' (alapértelmezett) vagy 'pdfium'.
     """
-    
+
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            text = ''
-            for i, page in enumerate(pdf.pages):
-                text += page.extract_text() + '\n' or ''
-            logger.debug(f" - {i+1} oldal: {len(text) if text else 0} karakter")
-
-        # Némi tisztítás a szövegen, töröljük a túl sok whitespace-t
-        text = re.sub(r'\s+', ' ', text)
-        return text
+        return ''.join(iter_text_from_pdf(pdf_path, mode=mode, workers=workers, backend=backend))
     except Exception as e:
         print(f"Hiba a PDF feldolgozása során: {e}")
-        return ""
\ No newline at end of file
+        metrics.inc('pdf_errors_total', backend=backend)
+        return ""
+
+
+def file_sha256(path: str) -> str:
+    """Egy fájl tartalmának SHA-256 hash-e"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def iter_text_cached(pdf_path: str, cache, content_hash: Optional[str] = None,
+                     mode: str = EXTRACT_MODE_SERIAL, workers: Optional[int] = None,
+                     decisions_only: bool = False, backend: str = PDF_BACKEND_PDFPLUMBER) -> Iterator[str]:
+    """
+    Mint az iter_text_from_pdf, de a kinyert szöveget gyorsítótárazza.
+    Találat esetén a PDF feldolgozása teljesen kimarad.
+    Args:
+        pdf_path (str): A PDF fájl elérési útja.
+        cache: get(hash, verzió) / put(hash, verzió, szöveg) műveletekkel rendelkező gyorsítótár.
+        content_hash (str): A PDF tartalmának SHA-256 hash-e, ha már ismert.
+        decisions_only (bool): Csak a kormányhatározatokat tartalmazó oldalak (külön gyorsítótár kulccsal).
+        backend (str): A szövegkinyerő backend (backendenként külön gyorsítótár kulccsal).
+    """
+    content_hash = content_hash or file_sha256(pdf_path)
+    version = extractor_version(decisions_only, backend)
+    text = cache.get(content_hash, version)
+    metrics.inc('text_cache_requests_total', result='hit' if text is not None else 'miss')
+    if text is not None:
+        logger.debug(f" - Szöveg a gyorsítótárból: {pdf_path}")
+        if text:
+            yield text
+        return
+
+    pages = []
+    for page in iter_text_from_pdf(pdf_path, mode=mode, workers=workers, decisions_only=decisions_only,
+                                   backend=backend):
+        pages.append(page)
+        yield page
+    # Csak a teljesen végigolvasott dokumentum kerül a gyorsítótárba
+    cache.put(content_hash, version, ''.join(pages))
@@ -0,0 +1,118 @@
+import re
+import logging
+from typing import List, Optional, Tuple
+from pdfminer.pdftypes import resolve1
+
+logger = logging.getLogger(__name__)
+
+# A könyvjelzőkben (outline) a kormányhatározat címe: "A Kormány 1055/2025. (III. 13.) Korm. határozata"
+_OUTLINE_DECISION = re.compile(r"^A\s+Kormány\s+\d+/\d{4}\..*Korm\.\s*határozata\s*$", re.IGNORECASE)
+# A tartalomjegyzék egy bejegyzésének első sora: "1055/2025. (III. 13.) Korm. határozat ..."
+_TOC_ENTRY = re.compile(r"^\d+/\d{4}\.\s*\([IVXLCDM]+\.\s*\d+\.\)\s+(.*)$")
+_TOC_DECISION = re.compile(r"^Korm\.\s*határozat\b")
+# A bejegyzés utolsó sora az oldalszámmal végződik
+_TOC_PAGE_NUMBER = re.compile(r"\s(\d+)$")
+# Oldalfejléc: "1042 MAGYAR KÖZLÖNY • 2025. évi 26. szám" vagy "MAGYAR KÖZLÖNY • 2025. évi 26. szám 1043"
+_PAGE_HEADER = re.compile(r"^(?:(\d+)\s+MAGYAR KÖZLÖNY.*|MAGYAR KÖZLÖNY.*\s(\d+))$")
+# A tartalomjegyzék legfeljebb ennyi oldalas
+_TOC_MAX_PAGES = 4
+
+def _outline_entries(pdf) -> Optional[List[Tuple[bool, int]]]:
+    """(kormányhatározat-e, oldalindex) a könyvjelzők legfelső szintjéről, dokumentum sorrendben"""
+    page_indexes = {page.page_obj.pageid: i for i, page in enumerate(pdf.pages)}
+    try:
+        outlines = list(pdf.doc.get_outlines())
+    except Exception:
+        return None
+
+    entries = []
+    for level, title, dest, action, _ in outlines:
+        if level != 1:
+            continue
+        if dest is None and action is not None:
+            dest = resolve1(action).get('D')
+        dest = resolve1(dest)
+        if isinstance(dest, (bytes, str)):
+            dest = resolve1(pdf.doc.get_dest(dest))
+        if isinstance(dest, dict):
+            dest = resolve1(dest.get('D'))
+        page = page_indexes.get(getattr(dest[0], 'objid', None)) if dest else None
+        if page is None:
+            return None
+        entries.append((bool(_OUTLINE_DECISION.match(title.strip())), page))
+    return entries or None
+
+def _toc_entries(pdf) -> Optional[List[Tuple[bool, int]]]:
+    """
+    (kormányhatározat-e, oldalindex) a címlap tartalomjegyzékéből. A nyomtatott oldalszámokat
+    az első belső oldal fejlécéből számolt eltolással alakítjuk oldalindexszé.
+    """
+    entries = []
+    offset = None
+    for index in range(min(_TOC_MAX_PAGES, len(pdf.pages))):
+        lines = (pdf.pages[index].extract_text() or '').split('\n')
+        header = _PAGE_HEADER.match(lines[0]) if lines else None
+        if header and offset is None:
+            offset = int(header.group(1) or header.group(2)) - index
+        if index > 0 and not any(_TOC_ENTRY.match(line) for line in lines):
+            break
+
+        is_decision = None
+        for line in lines:
+            entry = _TOC_ENTRY.match(line)
+            if entry:
+                is_decision = bool(_TOC_DECISION.match(entry.group(1)))
+            page_number = _TOC_PAGE_NUMBER.search(line)
+            if page_number and (entry or is_decision is not None):
+                entries.append((bool(is_decision), int(page_number.group(1))))
+                is_decision = None
+    if not entries:
+        return None
+    if offset is None:
+        if len(pdf.pages) < 2:
+            return None
+        lines = (pdf.pages[1].extract_text() or '').split('\n')
+        header = _PAGE_HEADER.match(lines[0]) if lines else None
+        if not header:
+            return None
+        offset = int(header.group(1) or header.group(2)) - 1
+    return [(is_decision, page - offset) for is_decision, page in entries]
+
+def _decision_range(entries: List[Tuple[bool, int]], page_count: int) -> Optional[range]:
+    """
+    A kormányhatározatok oldaltartománya: az első határozat oldalától a határozatok utáni első
+    más bejegyzés oldaláig (azt is beleértve, mert az utolsó határozat azon az oldalon is folytatódhat)
+    """
+    decision_pages = [page for is_decision, page in entries if is_decision]
+    if not decision_pages:
+        return range(0)
+    last = max(i for i, (is_decision, _) in enumerate(entries) if is_decision)
+    following = [page for _, page in entries[last + 1:]]
+    start = min(decision_pages)
+    stop = following[0] + 1 if following else page_count
+    if not 0 <= start < stop <= page_count or any(page < start for page in following):
+        return None
+    return range(start, stop)
+
+def find_decision_pages(pdf) -> Optional[range]:
+    """
+    A kormányhatározatokat tartalmazó oldalak tartománya egy megnyitott (pdfplumber) közlönyben.
+    Először a könyvjelzőkből, ha azok nincsenek, a címlap tartalomjegyzékéből állapítja meg.
+
+    Returns:
+        Az oldalindexek tartománya (üres, ha a közlönyben nincs kormányhatározat),
+        None, ha nem állapítható meg (ekkor a teljes dokumentumot fel kell dolgozni)
+    """
+    page_count = len(pdf.pages)
+    for source, read_entries in (('könyvjelzők', _outline_entries), ('tartalomjegyzék', _toc_entries)):
+        try:
+            entries = read_entries(pdf)
+        except Exception as e:
+            logger.debug(f" - Kormányhatározatok helye nem olvasható ({source}): {e}")
+            continue
+        if entries:
+            pages = _decision_range(entries, page_count)
+            if pages is not None:
+                logger.debug(f" - Kormányhatározatok ({source}): {pages.start}-{pages.stop - 1}. oldal / {page_count}")
+                return pages
+    return None
@@ -1,118 +1,130 @@
-import re
 import huspacy
 import logging
+from typing import Optional
+from .instrumentation import metrics
+from .keyword_ruleset import KeywordRuleset
 
 logger = logging.getLogger(__name__)
 # Magyar Közlöny kormányhatározatok elemzése önkormányzati vonatkozású tartalom szempontjából
 # Huszár Péter által készített magyar nyelvi feldolgozó könyvtár
-# NLP modell betöltése
-try:
-    # nlp = spacy.load("hu_core_news_lg")    
-    nlp = huspacy.load()
-except:
-    import sys
-    print("Magyar nyelvi modell letöltése...")
-    huspacy.download("hu_core_news_lg")
-    # huspacy.cli.download("hu_core_news_lg")
-    nlp = huspacy.load("hu_core_news_lg")
-
-def analyze_gdecision(gdecision):
+# NLP modell betöltése: lustán, az első használatkor, hogy a csak letöltést végző
+# futásoknak ne kelljen a több száz MB-os modellt betölteniük
+NLP_MODEL = "hu_core_news_lg"
+# Az összefoglalóhoz csak a mondatokra bontás kell (tok2vec + senter/parser),
+# a többi komponenst be sem töltjük
+_UNUSED_COMPONENTS = [
+    "tagger",
+    "morphologizer",
+    "lookup_lemmatizer",
+    "trainable_lemmatizer",
+    "lemmatizer",
+    "ner",
+    "beam_ner",
+]
+
+_nlp = None
+
+def get_nlp():
+    """A magyar nyelvi modell betöltése az első hívásakor (szükség esetén letöltése)"""
+    global _nlp
+    if _nlp is None:
+        try:
+            _nlp = huspacy.load(NLP_MODEL, exclude=_UNUSED_COMPONENTS)
+        except:
+            print("Magyar nyelvi modell letöltése...")
+            huspacy.download(NLP_MODEL)
+            _nlp = huspacy.load(NLP_MODEL, exclude=_UNUSED_COMPONENTS)
+        logger.debug(f"Nyelvi modell betöltve: {NLP_MODEL} ({', '.join(_nlp.pipe_names)})")
+    return _nlp
+
+KEYWORDS = [
+    "ix. helyi önkormányzatok",
+    "települési önkormányzatok",
+    "önkormányzatok adósságot keletkeztető",
+    "gazdasági társaságok adósságot keletkeztető",
+    "helyi önkormányzat",
+    "önkormányzati adósság",
+    "önkormányzati hitelfelvétel",
+    "adósságot keletkeztető ügyletek",
+    "iparűzési adó"
+]
+
+# Az nlp.pipe kötegmérete a kötegelt összefoglaló készítéshez
+SUMMARY_BATCH_SIZE = 32
+
+# Beépített szabálykészlet, ha nincs megadva konfigurációs fájl (KEYWORDS_FILE)
+DEFAULT_RULESET = KeywordRuleset(KEYWORDS, name="alapértelmezett")
+
+def _score_gdecision(gdecision, ruleset: Optional[KeywordRuleset] = None):
+    """
+    Relevancia pontszám és a talált kulcsszavak listája.
+    A címben való előfordulás kétszeres súlyt kap
+    """
+    return (ruleset or DEFAULT_RULESET).score(gdecision)
+
+def _summarize(doc):
+    # Egyszerű összefoglaló készítése: az első pár mondat
+    return '. '.join([sent.text for sent in list(doc.sents)[:3]])
+
+@metrics.timed('summarize_seconds')
+def summarize_contents(contents, batch_size: int = SUMMARY_BATCH_SIZE):
+    """Összefoglalók kötegelt készítése (nlp.pipe) a határozatok tartalmából, a bemenet sorrendjében"""
+    return [_summarize(doc) for doc in get_nlp().pipe(contents, batch_size=batch_size)]
+
+@metrics.timed('analyze_seconds')
+def analyze_gdecision(gdecision, ruleset: Optional[KeywordRuleset] = None):
     """
     Kormányhatározatok elemzése önkormányzati vonatkozású tartalom szempontjából.
     A címben való előfordulás kétszeres súlyt kap
     """
-    keywords = [
-        "ix. helyi önkormányzatok",
-        "települési önkormányzatok",
-        "önkormányzatok adósságot keletkeztető",
-        "gazdasági társaságok adósságot keletkeztető",
-        "helyi önkormányzat",
-        "önkormányzati adósság",
-        "önkormányzati hitelfelvétel",
-        "adósságot keletkeztető ügyletek",
-        "iparűzési adó"
-    ]
-
-    relevance_score = 0
-    keyword_matches = []
-
-    # Ellenőrizzük a címben és a tartalomban a kulcsszavakat
-    for keyword in keywords:
-        title_matches = len(re.findall(r'\b' + keyword + r'\w*\b', gdecision['title'].lower()))
-        content_matches = len(re.findall(r'\b' + keyword + r'\w*\b', gdecision['content'].lower()))
-
-        if title_matches > 0 or content_matches > 0:
-            keyword_matches.append(keyword)
-            relevance_score += (title_matches * 2) + content_matches
+    relevance_score, keyword_matches = _score_gdecision(gdecision, ruleset)
+    metrics.inc('resolutions_scored_total')
 
     if relevance_score > 0:
-        doc = nlp(gdecision['content'])
-
-        # Egyszerű összefoglaló készítése: az első pár mondat
-        summary = '. '.join([sent.text for sent in list(doc.sents)[:3]])
+        metrics.inc('resolutions_relevant_total')
+        doc = get_nlp()(gdecision['content'])
 
         return {
             'gdecision': gdecision,
             'relevance_score': relevance_score,
             'keyword_matches': ', '.join(keyword_matches),
-            'summary': summary
+            'summary': _summarize(doc)
         }
     return None
 
-# def analyze_resolutions(resolutions):
-#     """
-#     Kormányhatározatok elemzése önkormányzati vonatkozású tartalom szempontjából.
-#     A címben való előfordulás kétszeres súlyt kap
-#     """
-
-#     keywords = [
-#         "ix. helyi önkormányzatok",
-#         "települési önkormányzatok", 
-#         "önkormányzatok adósságot keletkeztető",
-#         "gazdasági társaságok adósságot keletkeztető",
-#         "helyi önkormányzat",
-#         "önkormányzati adósság",
-#         "önkormányzati hitelfelvétel",
-#         "adósságot keletkeztető ügyletek",
-#         "iparűzési adó"
-#     ]
-    
-#     relevant_resolutions = []
-    
-#     for resolution in resolutions:
-#         relevance_score = 0
-#         keyword_matches = []
-        
-#         # Ellenőrizzük a címben és a tartalomban a kulcsszavakat
-#         for keyword in keywords:
-#             title_matches = len(re.findall(r'\b' + keyword + r'\w*\b', resolution['title'].lower()))
-#             content_matches = len(re.findall(r'\b' + keyword + r'\w*\b', resolution['content'].lower()))
-            
-#             if title_matches > 0 or content_matches > 0:
-#                 keyword_matches.append({
-#                     'keyword': keyword,
-#                     'title_count': title_matches,
-#                     'content_count': content_matches
-#                 })
-#                 relevance_score += (title_matches * 2) + content_matches
-                
-#         if relevance_score > 0:
-#             doc = nlp(resolution['content'])
-            
-#             # Egyszerű összefoglaló készítése: az első pár mondat
-#             summary = '. '.join([sent.text for sent in list(doc.sents)[:3]])
-            
-#             relevant_resolutions.append({
-#                 'resolution': resolution,
-#                 'relevance_score': relevance_score,
-#                 'keyword_matches': keyword_matches,
-#                 'summary': summary
-#             })
-    
-#     # Eredmények rendezése relevancia szerint
-#     relevant_resolutions.sort(key=lambda x: x['relevance_score'], reverse=True)
-    
-#     return {
-#         'total_resolutions': len(resolutions),
-#         'relevant_resolutions': relevant_resolutions
-#     }
\ No newline at end of file
+@metrics.timed('analyze_seconds')
+def analyze_resolutions(resolutions, batch_size: int = SUMMARY_BATCH_SIZE, ruleset: Optional[KeywordRuleset] = None):
+    """
+    Egy közlöny összes kormányhatározatának elemzése egy hívásban.
+    Először minden határozat pontszámát kiszámolja, majd csak a relevánsak
+    tartalmát küldi kötegelve (nlp.pipe) a nyelvi modellnek.
+    Határozatonként ugyanazt a pontszámot, kulcsszavakat és összefoglalót adja, mint az analyze_gdecision.
+    """
+    ruleset = ruleset or DEFAULT_RULESET
+    scored = []
+    for resolution in resolutions:
+        relevance_score, keyword_matches = _score_gdecision(resolution, ruleset)
+        if relevance_score > 0:
+            scored.append((resolution, relevance_score, keyword_matches))
+
+    metrics.inc('resolutions_scored_total', len(resolutions))
+    metrics.inc('resolutions_relevant_total', len(scored))
+    relevant_resolutions = []
+    if scored:
+        summaries = summarize_contents([resolution['content'] for resolution, _, _ in scored], batch_size)
+        for (resolution, relevance_score, keyword_matches), summary in zip(scored, summaries):
+            relevant_resolutions.append({
+                'resolution': resolution,
+                'relevance_score': relevance_score,
+                'keyword_matches': ', '.join(keyword_matches),
+                'summary': summary
+            })
+
+    # Eredmények rendezése relevancia szerint
+    relevant_resolutions.sort(key=lambda x: x['relevance_score'], reverse=True)
+
+    return {
+        'total_resolutions': len(resolutions),
+        'relevant_resolutions': relevant_resolutions,
+        'ruleset_version': ruleset.version
+    }
@@ -1,60 +1,111 @@
 import re
 import datetime
 import logging
+from typing import Dict, Iterable, Iterator
+from .instrumentation import metrics
 
 logger = logging.getLogger(__name__)
 
+# A kormányhatározat címsora, illetve a határozat tartalmát lezáró következő címsor eleje
+_HEADER_PATTERN = re.compile(r"A\s+Kormány\s+(\d+)[\/\s]+(\d{4})[\.|\s]+[\(]+((?:I|V|X|L|C|D|M)+)[\.|\s]+(\d+)[\.|\s]+[\)]+\s+Korm[\.|\s]+határozata", re.IGNORECASE)
+_BOUNDARY_PATTERN = re.compile(r"A\s+Kormány\s+\d+[\/\s]+\d{4}", re.IGNORECASE)
+# Ennyi karaktert tartunk meg a puffer végéből, hogy a darabhatáron átnyúló címsor se vesszen el
+_SCAN_OVERLAP = 256
+
+def _scan_resolutions(text: str) -> Iterator[tuple]:
+    """
+    Címsorok keresése egy menetben, a tartalom a címsor vége és az azt követő első
+    határolóig (egy újabb "A Kormány <szám>/<év>" kezdetig) vagy a szöveg végéig tart.
+    A következő címsor keresése a határolónál folytatódik, a szöveg minden részét legfeljebb
+    kétszer vizsgáljuk (egyszer címsorként, egyszer határolóként).
+    Az eredmény megegyezik a korábbi, lusta (.*?) tartalmú DOTALL minta finditer eredményével.
+    """
+    pos = 0
+    while True:
+        header = _HEADER_PATTERN.search(text, pos)
+        if not header:
+            return
+        boundary = _BOUNDARY_PATTERN.search(text, header.end())
+        end = boundary.start() if boundary else len(text)
+        yield (*header.groups(), text[header.end():end])
+        pos = end
+
+@metrics.timed('extract_resolutions_seconds')
 def extract_resolutions(text):
     """
     Kormányhatározatok kinyerése a szövegből és strukturált adattá alakítása.
     Rugalmasabb regex minta a kormányhatározatok azonosítására 
     Több whitespace-t és sortörést is engedélyez, rugalmasabb formátumot elfogad
     """
-    # Diagnosztika - ellenőrizzük, hogy található-e a 'A Kormány határozata' szövegrész    
-    resolution_pattern = r"A\s+Kormány\s+(\d+)[\/\s]+(\d{4})[\.|\s]+[\(]+((?:I|V|X|L|C|D|M)+)[\.|\s]+(\d+)[\.|\s]+[\)]+\s+Korm[\.|\s]+határozata(.*?)(?=A\s+Kormány\s+\d+[\/\s]+\d{4}|$)"
-    matches = list(re.finditer(resolution_pattern, text, re.DOTALL | re.IGNORECASE))
-    
-    # logger.debug(f"Találatok száma 'A Kormány határozata' mintával: {len(matches)}")
-    
-    # Ha nincs találat, próbáljunk egy egyszerűbb mintát
-    # if len(matches) == 0:
-        # Nagyon egyszerű minta csak a címsor alapszerkezetével
-        # simple_pattern = r"Korm[á|a]ny\s+(\d+)[\/|\s]+(\d{4})[\.|\s]+((?:I|V|X|L|C|D|M)+)[\.|\s]+(\d+)[\.|\s]+Korm[\.|\s]+hat[á|a]rozata"
-        # simple_matches = list(re.finditer(simple_pattern, text, re.DOTALL | re.IGNORECASE))
-        # logger.info(f"Egyszerűbb mintával találatok száma: {len(simple_matches)}")        
-        # Mutassunk egy mintát a szövegből, ahol esetleg kormányhatározat lehet
-        # sample_text = text.find("Kormány")
-        # if sample_text != -1:
-        #     print("Minta a szövegből, ahol a 'Kormány' szó található:")
-        #     print(text[sample_text:sample_text+150])
-    
     resolutions = []
-    for match in matches:
-        try:
-            number = match.group(1)
-            year = match.group(2)
-            month_roman = match.group(3)
-            day = match.group(4)
-            content = match.group(5).strip() if match.group(5) else ""
-            
-            # Római szám konvertálása decimálissá
-            month_mapping = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8, 'IX': 9, 'X': 10, 'XI': 11, 'XII': 12}
-            month = month_mapping.get(month_roman.upper(), 0)
-            
-            title = f"A Kormány {number}/{year}. ({month_roman}. {day}.) Korm. határozata"
-            
-            resolution = {
-                'number': number,
-                'year': year,
-                'month': month,
-                'day': int(day),
-                'date': datetime.date(int(year), month, int(day)),
-                'title': title,
-                'content': content
-            }
-            
+    for parts in _scan_resolutions(text):
+        resolution = _build_resolution(*parts)
+        if resolution:
             resolutions.append(resolution)
-        except Exception as e:
-            print(f"Hiba a feldolgozás közben: {e}")
     
-    return resolutions
\ No newline at end of file
+    metrics.inc('resolutions_extracted_total', len(resolutions))
+    return resolutions
+
+def _build_resolution(number, year, month_roman, day, content):
+    """Egy kormányhatározat strukturált adattá alakítása a címsor részeiből és a tartalomból"""
+    try:
+        content = content.strip() if content else ""
+        
+        # Római szám konvertálása decimálissá
+        month_mapping = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8, 'IX': 9, 'X': 10, 'XI': 11, 'XII': 12}
+        month = month_mapping.get(month_roman.upper(), 0)
+        
+        title = f"A Kormány {number}/{year}. ({month_roman}. {day}.) Korm. határozata"
+        
+        return {
+            'number': number,
+            'year': year,
+            'month': month,
+            'day': int(day),
+            'date': datetime.date(int(year), month, int(day)),
+            'title': title,
+            'content': content
+        }
+    except Exception as e:
+        print(f"Hiba a feldolgozás közben: {e}")
+        return None
+
+def iter_resolutions(chunks: Iterable[str]) -> Iterator[Dict]:
+    """
+    Kormányhatározatok inkrementális kinyerése szövegdarabok (pl. PDF oldalak) folyamából.
+    Egy határozatot azonnal visszaad, amint a tartalmát lezáró következő címsor megjelenik,
+    így a memóriaigény a leghosszabb határozattal arányos, nem a teljes közlönnyel.
+    Az eredmény megegyezik az extract_resolutions(''.join(chunks)) eredményével.
+    """
+    buffer = ''
+    header = None   # a feldolgozás alatt álló határozat címsorának részei
+    scan_from = 0   # innen kell folytatni a keresést a pufferben
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            if header is None:
+                match = _HEADER_PATTERN.search(buffer, scan_from)
+                if not match:
+                    # A puffer végén lehet egy félbemaradt címsor, csak azt tartjuk meg
+                    buffer = buffer[-_SCAN_OVERLAP:]
+                    scan_from = 0
+                    break
+                header = match.groups()
+                buffer = buffer[match.end():]
+                scan_from = 0
+            boundary = _BOUNDARY_PATTERN.search(buffer, scan_from)
+            if not boundary:
+                scan_from = max(0, len(buffer) - _SCAN_OVERLAP)
+                break
+            resolution = _build_resolution(*header, buffer[:boundary.start()])
+            if resolution:
+                metrics.inc('resolutions_extracted_total')
+                yield resolution
+            header = None
+            buffer = buffer[boundary.start():]
+            scan_from = 0
+    if header is not None:
+        resolution = _build_resolution(*header, buffer)
+        if resolution:
+            metrics.inc('resolutions_extracted_total')
+            yield resolution
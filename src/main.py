@@ -1,14 +1,21 @@
+import time
+_START_TIME = time.perf_counter()  # Az indulási idő méréséhez, minden más import előtt
+
 import os
+import sys
+import atexit
 import logging
 import argparse
 from pathlib import Path
 from dotenv import load_dotenv
 from fetcher import GazetteFetcher
-from repository import GazetteRepository
-from gdmonitor import extract_text_from_pdf, extract_resolutions, analyze_gdecision
+from repository import GazetteRepository, TextCacheRepository
 
 logger = logging.getLogger(__name__)
 
+# Soros elemzésnél egyszerre ennyi közlöny kerül lefoglalásra
+ANALYZE_BATCH_SIZE = 4
+
 def setup_logging():
     """Beállítja a naplózást"""
     logging.basicConfig(
@@ -28,22 +35,253 @@ def setup_fetcher():
     if not os.path.exists(download_path):
         os.makedirs(download_path)
     since_date = os.getenv('SINCE_DATE')  # YYYY-MM-DD formátum
-    return GazetteFetcher(feed_url=feed_url, db_file=db_file, download_path=download_path, since_date=since_date)
+    concurrency = int(os.getenv('DOWNLOAD_CONCURRENCY', '1'))
+    per_host_limit = int(os.getenv('DOWNLOAD_PER_HOST', '2'))
+    return GazetteFetcher(feed_url=feed_url, db_file=db_file, download_path=download_path, since_date=since_date,
+                          max_concurrent_downloads=concurrency, per_host_limit=per_host_limit)
+
+def setup_metrics():
+    """Futási metrikák gyűjtése, ha a METRICS_TEXTFILE (Prometheus) vagy a METRICS_REPORT (JSON) meg van adva"""
+    from metrics import metrics
+    metrics.configure(textfile=os.getenv('METRICS_TEXTFILE'), report=os.getenv('METRICS_REPORT'))
+    if metrics.enabled:
+        # Minden kilépési úton (hibánál is) kiírjuk, amit addig gyűjtöttünk
+        atexit.register(metrics.flush)
+
+def setup_text_cache(db_path: Path) -> TextCacheRepository:
+    """Beállítja a kinyert szövegek gyorsítótárát (alapértelmezetten az adatbázis mellett)"""
+    cache_file = os.getenv('TEXT_CACHE_FILE') or db_path.parent / 'text_cache.db'
+    max_mb = os.getenv('TEXT_CACHE_MAX_MB')
+    return TextCacheRepository(Path(cache_file), max_bytes=int(max_mb) * 1024 * 1024 if max_mb else None)
+
+def setup_ruleset(repository):
+    """A pontozás szabálykészlete a KEYWORDS_FILE fájlból (ha nincs megadva, a beépített kulcsszavak)"""
+    from gdmonitor import load_ruleset
+    from gdmonitor.resulation_analyzer import DEFAULT_RULESET
+    keywords_file = os.getenv('KEYWORDS_FILE')
+    ruleset = load_ruleset(Path(keywords_file)) if keywords_file else DEFAULT_RULESET
+    repository.save_ruleset(ruleset.version, ruleset.name, ruleset.definition())
+    logger.info(f"Szabálykészlet: {ruleset.name} ({ruleset.version})")
+    return ruleset
+
+def search(query: str, limit: int):
+    """Teljes szöveges keresés a kormányhatározatokban; a találatok a standard kimenetre kerülnek"""
+    db_file = os.getenv('DB_FILE')
+    if not db_file:
+        raise ValueError("A DB_PATH környezeti változó nincs beállítva.")
+    with GazetteRepository(Path(db_file)) as repository:
+        start = time.perf_counter()
+        results = repository.search_resolutions(query, limit=limit)
+        elapsed = time.perf_counter() - start
+    for result in results:
+        print(f"{result['title']} - {result['gazette_title']} ({result['resolution_date']})")
+        print(f"    {result['snippet']}")
+    logger.info(f"{len(results)} találat, {elapsed * 1000:.1f} ms")
+
+def benchmark(args) -> bool:
+    """
+    A feldolgozási szakaszok mérése a mintákon, összehasonlítás az alapértékkel
+
+    Returns:
+        True, ha valamelyik szakasz a küszöbnél jobban lassult
+    """
+    from benchmark import BASELINE_FILE, compare_backends, compare_to_baseline, load_results, run_benchmarks, save_results
+    if args.compare_backends:
+        for backend, measured in compare_backends(decisions_only=args.decisions_only, repeat=args.repeat).items():
+            print(f"{backend:<24}{measured['seconds']:>10.3f} s{measured['per_second']:>12.1f} {measured['unit']}/s"
+                  f"{measured['speedup']:>8.1f}x")
+        return False
+    results = run_benchmarks(backend=args.backend, decisions_only=args.decisions_only, scale=args.scale, repeat=args.repeat)
+    for stage, measured in results['stages'].items():
+        print(f"{stage:<24}{measured['seconds']:>10.3f} s{measured['per_second']:>12.1f} {measured['unit']}/s"
+              f"{measured['peak_rss_mb']:>10.1f} MB")
+    if args.output:
+        save_results(results, Path(args.output))
+    baseline_file = Path(args.baseline) if args.baseline else BASELINE_FILE
+    if args.update_baseline:
+        save_results(results, baseline_file)
+        logger.info(f"Alapérték frissítve: {baseline_file}")
+        return False
+    if not baseline_file.exists():
+        logger.warning(f"Nincs alapérték, összehasonlítás kihagyva: {baseline_file}")
+        return False
+
+    try:
+        comparison = compare_to_baseline(results, load_results(baseline_file), threshold=args.threshold)
+    except ValueError as e:
+        logger.warning(f"Az alapértékkel nem hasonlítható össze: {e}")
+        return False
+    for row in comparison:
+        flag = "REGRESSZIÓ" if row['regression'] else ""
+        print(f"{row['stage']:<24}{row['baseline']:>12.1f} -> {row['current']:>12.1f} ({row['change']:+.1%}) {flag}")
+    return any(row['regression'] for row in comparison)
+
+def send_email_digest(repository) -> int:
+    """
+    Az el nem küldött releváns közlönyök összesítőjének küldése (SMTP_HOST, EMAIL_FROM, EMAIL_TO)
+
+    Returns:
+        Az elküldöttként megjelölt közlönyök száma
+    """
+    from notifier import EmailDigest
+    host = os.getenv('SMTP_HOST')
+    if not host:
+        logger.warning("Az SMTP_HOST környezeti változó nincs beállítva, email nem került küldésre.")
+        return 0
+    recipients = [address.strip() for address in os.getenv('EMAIL_TO', '').split(',') if address.strip()]
+    digest = EmailDigest(repository, host, os.getenv('EMAIL_FROM') or f"gdmonitor@{host}", recipients,
+                         port=int(os.getenv('SMTP_PORT') or 25), username=os.getenv('SMTP_USER') or None,
+                         password=os.getenv('SMTP_PASSWORD') or None,
+                         starttls=os.getenv('SMTP_STARTTLS', '').lower() in ('1', 'true', 'yes'))
+    return digest.send()
+
+def decisions_only() -> bool:
+    """Csak a kormányhatározatokat tartalmazó oldalak kinyerése (PDF_DECISIONS_ONLY=1, alapértelmezetten kikapcsolva)"""
+    return os.getenv('PDF_DECISIONS_ONLY', '').lower() in ('1', 'true', 'yes')
+
+def pdf_backend() -> str:
+    """
+    A PDF szövegkinyerő backend (PDF_BACKEND): pdfplumber (alapértelmezett) vagy pdfium
+    (gyorsabb, de veszteséges: a táblázatok celláit más sorrendben adja)
+    """
+    return os.getenv('PDF_BACKEND') or 'pdfplumber'
+
+def backfill(fetcher, args, pdf_mode: str, pdf_workers):
+    """Visszamenőleges letöltés lapszám szerint, igény szerint a feldolgozási láncon átlapolt elemzéssel"""
+    from fetcher import GazetteBackfill
+    rate = os.getenv('BACKFILL_RATE')
+    concurrency = os.getenv('BACKFILL_CONCURRENCY')
+    crawler = GazetteBackfill(fetcher, url_template=os.getenv('BACKFILL_URL_TEMPLATE'),
+                              concurrency=int(concurrency) if concurrency else None,
+                              rate=float(rate) if rate else None)
+    try:
+        if not args.analyze:
+            downloaded = crawler.run(args.year, args.first, args.last)
+            logger.info(f"{len(downloaded)} közlöny letöltve, elemzésük: --analyze")
+            return
+        from pipeline import GazettePipeline
+        pipeline = GazettePipeline(fetcher, setup_text_cache(fetcher.db_path), pdf_mode=pdf_mode, pdf_workers=pdf_workers,
+                                   ruleset=setup_ruleset(fetcher.repository), decisions_only=decisions_only(),
+                                   pdf_backend=pdf_backend(),
+                                   fetch=lambda on_downloaded, stop_event: crawler.run(args.year, args.first, args.last,
+                                                                                       on_downloaded, stop_event))
+        pipeline.run()
+    finally:
+        # Megszakításkor (Ctrl+C) új letöltés nem indul; az ellenőrzőpont a következő futásnak megmarad
+        crawler.stop()
+
+def index_resolutions(fetcher):
+    """A keresési index feltöltése a korábban (határozatok mentése nélkül) elemzett közlönyökkel"""
+    from pipeline import extract_gdecisions
+    repository = fetcher.repository
+    text_cache = setup_text_cache(fetcher.db_path)
+    gazettes = repository.get_gazettes_without_resolutions()
+    for gazette in gazettes:
+        try:
+            gdecisions = extract_gdecisions(gazette, fetcher.download_path, text_cache, decisions_only=decisions_only(),
+                                            pdf_backend=pdf_backend())
+        except Exception as e:
+            logger.error(f"Nem sikerült a PDF szöveg kinyerése: {gazette['filename']} - {e}")
+            continue
+        repository.save_resolutions(gazette['id'], gdecisions)
+        logger.info(f"Indexelve: {gazette['title']} ({len(gdecisions)} határozat)")
+    logger.info(f"{len(gazettes)} közlöny indexelése befejeződött")
 
 def main():
     setup_logging()
     load_dotenv()
+    setup_metrics()
     parser = argparse.ArgumentParser(description='PDF kormányhatározat feldolgozó')
     parser.add_argument('--analyze', action='store_true', help='Önkormányzati tartalom elemzése')
     parser.add_argument('--email', action='store_true', help='Email küldése az eredményekről')
     parser.add_argument('--since', type=str, help='Csak ezen dátum után megjelent közlönyök (YYYY-MM-DD)')
+    parser.add_argument('--pipeline', action='store_true', help='Letöltés és elemzés átlapolva (az elemzést is elvégzi)')
+    parser.add_argument('--workers', type=int, help='Elemzés ennyi párhuzamos folyamattal (az --analyze kapcsolóval)')
+    subparsers = parser.add_subparsers(dest='command')
+    search_parser = subparsers.add_parser('search', help='Keresés a kormányhatározatok szövegében')
+    search_parser.add_argument('query', nargs='+', help='Keresőszavak (pl. Budapest hitelfelvétel) vagy FTS5 lekérdezés')
+    search_parser.add_argument('--limit', type=int, default=20, help='A találatok maximális száma')
+    subparsers.add_parser('index', help='A korábban elemzett közlönyök határozatainak indexelése a kereséshez')
+    subparsers.add_parser('rescore', help='A tárolt határozatok újrapontozása a jelenlegi szabálykészlettel (KEYWORDS_FILE)')
+    benchmark_parser = subparsers.add_parser('benchmark', help='A feldolgozás szakaszainak mérése a mintákon (samples/)')
+    benchmark_parser.add_argument('--output', help='Az eredmények mentése ebbe a JSON fájlba')
+    benchmark_parser.add_argument('--baseline', help='Az alapérték JSON fájl (alapértelmezett: src/benchmark/baseline.json)')
+    benchmark_parser.add_argument('--update-baseline', action='store_true', help='Az eredmény mentése új alapértékként')
+    benchmark_parser.add_argument('--threshold', type=float, default=0.2, help='Megengedett lassulás szakaszonként (0.2 = 20%%)')
+    benchmark_parser.add_argument('--repeat', type=int, default=1, help='Ismétlésszám szakaszonként (a legjobb idő számít)')
+    benchmark_parser.add_argument('--scale', type=int, default=10, help='A szintetikus közlöny mérete (0: nincs)')
+    benchmark_parser.add_argument('--backend', default='pdfplumber', help='PDF szövegkinyerő backend (pdfplumber, pdfium)')
+    benchmark_parser.add_argument('--decisions-only', action='store_true', help='Csak a kormányhatározatok oldalai')
+    benchmark_parser.add_argument('--compare-backends', action='store_true', help='A PDF backendek szövegkinyerési sebességének összehasonlítása')
+    backfill_parser = subparsers.add_parser('backfill', help='A feed-ből már kikerült közlönyök letöltése lapszám szerint')
+    backfill_parser.add_argument('--year', type=int, required=True, help='Az év (pl. 2024)')
+    backfill_parser.add_argument('--from', dest='first', type=int, default=1, help='Az első lapszám')
+    backfill_parser.add_argument('--to', dest='last', type=int, help='Az utolsó lapszám (alapértelmezett: az év végéig)')
+    backfill_parser.add_argument('--analyze', action='store_true', help='A letöltött közlönyök azonnali elemzése')
+    subparsers.add_parser('watch', help='Folyamatos futás: a feed időközönkénti lekérdezése és az új közlönyök azonnali elemzése')
     args = parser.parse_args()
 
+    if args.command == 'search':
+        search(' '.join(args.query), args.limit)
+        return
+
+    if args.command == 'benchmark':
+        if benchmark(args):
+            sys.exit(1)
+        return
+
     # Ha parancssori argumentumként megadták a dátumot, felülírja a környezeti változót
     if args.since:
         os.environ['SINCE_DATE'] = args.since
 
     fetcher = setup_fetcher()
+    logger.info(f"Indulási idő: {time.perf_counter() - _START_TIME:.3f} s")
+    pdf_mode = os.getenv('PDF_EXTRACT_MODE', 'serial')  # serial | parallel
+    pdf_workers = int(os.getenv('PDF_WORKERS')) if os.getenv('PDF_WORKERS') else None
+
+    if args.command == 'index':
+        index_resolutions(fetcher)
+        return
+
+    if args.command == 'rescore':
+        from pipeline import rescore_resolutions
+        rescore_resolutions(fetcher.repository, setup_ruleset(fetcher.repository))
+        return
+
+    if args.command == 'backfill':
+        backfill(fetcher, args, pdf_mode, pdf_workers)
+        if args.email:
+            send_email_digest(fetcher.repository)
+        return
+
+    if args.command == 'watch':
+        # A modell és az adatbázis kapcsolat a teljes futás alatt betöltve marad; SIGTERM-re szabályosan leáll
+        from pipeline import GazetteWatcher
+        queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE')) if os.getenv('PIPELINE_QUEUE_SIZE') else None
+        watcher = GazetteWatcher(fetcher, setup_text_cache(fetcher.db_path),
+                                 interval=float(os.getenv('WATCH_INTERVAL')) if os.getenv('WATCH_INTERVAL') else None,
+                                 jitter=float(os.getenv('WATCH_JITTER')) if os.getenv('WATCH_JITTER') else None,
+                                 max_backoff=float(os.getenv('WATCH_MAX_BACKOFF')) if os.getenv('WATCH_MAX_BACKOFF') else None,
+                                 queue_size=queue_size, pdf_mode=pdf_mode, pdf_workers=pdf_workers,
+                                 ruleset=setup_ruleset(fetcher.repository), decisions_only=decisions_only(),
+                                 pdf_backend=pdf_backend(),
+                                 after_cycle=(lambda: send_email_digest(fetcher.repository)) if args.email else None)
+        watcher.install_signal_handlers()
+        watcher.run()
+        return
+
+    if args.pipeline:
+        # Átlapolt letöltés és elemzés: minden közlöny azonnal elemzésre kerül, amint megérkezett
+        from pipeline import GazettePipeline
+        queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE')) if os.getenv('PIPELINE_QUEUE_SIZE') else None
+        pipeline = GazettePipeline(fetcher, setup_text_cache(fetcher.db_path), queue_size=queue_size,
+                                   pdf_mode=pdf_mode, pdf_workers=pdf_workers, ruleset=setup_ruleset(fetcher.repository),
+                                   decisions_only=decisions_only(), pdf_backend=pdf_backend())
+        pipeline.run()
+        if args.email:
+            send_email_digest(fetcher.repository)
+        return
+
     downloaded = fetcher.fetch_new_gazettes()
     if downloaded:
         logger.info(f"{len(downloaded)} új Magyar Közlöny került letöltésre:")
@@ -53,35 +291,49 @@ def main():
         logger.info("Nem került letöltésre új Magyar Közlöny.")
     
     if args.analyze:
-        repository = GazetteRepository(fetcher.db_path)
-        unanalyzed_gazettes = repository.get_unanalyzed_gazettes()
-        if unanalyzed_gazettes:
-            logger.info(f"{len(unanalyzed_gazettes)} közlöny még nem lett elemezve.")            
-            for gazette in unanalyzed_gazettes:
-                logger.info(f"Elemzés: {gazette['title']} ({gazette['publication_date']})")               
-                pdf_text = extract_text_from_pdf(fetcher.base_dir / fetcher.download_path / gazette['filename'])
-                if pdf_text:
-                    gdecisions = extract_resolutions(pdf_text)
-                    if not gdecisions:
-                        logger.info(f"Nincs kormányhatározat a közlönyben: {gazette['title']}")
-                        repository.mark_as_analyzed(gazette['id'], is_relevant=False)
-                        continue
-                    # logger.info(f"Kormányhatározatok száma: {len(gdecisions)}")
-                    for i, gdecision in enumerate(gdecisions, 1):
-                        result = analyze_gdecision(gdecision)
-                        if result:
-                            logger.info(f"Releváns: {gdecision['title']} pontszám: {result['relevance_score']}")                            
-                            repository.save_summary(gazette['id'], gdecision['title'], result['relevance_score'], result['keyword_matches'], result['summary'])
-                            repository.mark_as_analyzed(gazette['id'], is_relevant=True)
-                        else:
-                            logger.info(f"Nem releváns: {gdecision['title']}")
-                            repository.mark_as_analyzed(gazette['id'], is_relevant=False)                                                                       
-                else:
-                    logger.error(f"Nem sikerült a PDF szöveg kinyerése: {gazette['filename']}")
-                    repository.mark_as_analyzed(gazette['id'], is_relevant=False)
+        # A PDF és NLP függőségeket csak elemzéskor töltjük be, a letöltés így gyorsan indul
+        from gdmonitor import analyze_resolutions
+        from pipeline import extract_gdecisions, store_analysis, store_failure, worker_id
+        repository = fetcher.repository
+        text_cache = setup_text_cache(fetcher.db_path)
+        ruleset = setup_ruleset(repository)
+        if args.workers and args.workers > 1:
+            # Több folyamatos elemzés, az adatbázisba csak ez a folyamat ír
+            from pipeline import analyze_in_processes
+            analyzed = analyze_in_processes(repository, fetcher.download_path, text_cache, workers=args.workers,
+                                            ruleset=ruleset, decisions_only=decisions_only(),
+                                            pdf_backend=pdf_backend())
+        else:
+            # A közlönyök adagonként kerülnek lefoglalásra, így több gép/konténer is dolgozhat ugyanazon az adatbázison
+            owner = worker_id()
+            analyzed = 0
+            try:
+                while True:
+                    claimed = repository.claim_gazettes(owner, limit=ANALYZE_BATCH_SIZE)
+                    if not claimed:
+                        break
+                    for gazette in claimed:
+                        logger.info(f"Elemzés: {gazette['title']} ({gazette['publication_date']})")
+                        try:
+                            gdecisions = extract_gdecisions(gazette, fetcher.download_path, text_cache, pdf_mode, pdf_workers,
+                                                            decisions_only(), pdf_backend())
+                        except Exception as e:
+                            store_failure(repository, gazette, e)
+                            continue
+                        # A közlöny összes határozata egy hívásban, kötegelt összefoglaló készítéssel
+                        results = analyze_resolutions(gdecisions, ruleset=ruleset) if gdecisions else None
+                        store_analysis(repository, gazette, gdecisions, results)
+                        analyzed += 1
+            finally:
+                repository.release_gazettes(owner)
+        if analyzed:
+            logger.info(f"{analyzed} közlöny elemzése befejeződött.")
         else:
             logger.info("Minden közlöny elemezve van már.")
 
+    if args.email:
+        # Futásonként egy összesítő az összes még el nem küldött releváns közlönyről
+        send_email_digest(fetcher.repository)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
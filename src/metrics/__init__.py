@@ -0,0 +1,6 @@
+from .registry import MetricsRegistry
+
+# A folyamat közös gyűjtője; alapértelmezetten kikapcsolva (METRICS_TEXTFILE / METRICS_REPORT kapcsolja be)
+metrics = MetricsRegistry()
+
+__all__ = ['MetricsRegistry', 'metrics']
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A Prometheus metrikák közös előtagja
+PREFIX = 'gdmonitor_'
+
+class _NullTimer:
+    """Kikapcsolt mérésnél használt, semmit nem csináló időmérő"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    def __init__(self, registry, name: str, labels: Dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+class MetricsRegistry:
+    """
+    Számlálók és időtartamok gyűjtése egy futás alatt, Prometheus textfile és JSON riport exporttal.
+    Kikapcsolt állapotban (ez az alapértelmezett) minden hívás egyetlen feltétel vizsgálata után visszatér.
+    A metrikák nevei előtag nélküliek, az export teszi eléjük a PREFIX-et.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.textfile: Optional[Path] = None
+        self.report: Optional[Path] = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def configure(self, textfile: Optional[str] = None, report: Optional[str] = None):
+        """Export célok beállítása; ha bármelyik meg van adva, a gyűjtés bekapcsol"""
+        self.textfile = Path(textfile) if textfile else None
+        self.report = Path(report) if report else None
+        self.enabled = bool(self.textfile or self.report)
+
+    def reset(self):
+        """Az összegyűjtött adatok törlése (a futás kezdete is innen számít)"""
+        with self._lock:
+            self._counters: Dict[Tuple, float] = {}
+            self._timings: Dict[Tuple, list] = {}
+            self.started = time.time()
+
+    @staticmethod
+    def _key(name: str, labels: Dict) -> Tuple:
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Számláló növelése (pl. downloads_total, download_bytes_total)"""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Időtartam rögzítése: darabszám, összeg és maximum (pl. pdf_extract_seconds)"""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                self._timings[key] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                timing[2] = max(timing[2], seconds)
+
+    def timer(self, name: str, **labels):
+        """Időmérő kontextuskezelő: with metrics.timer('db_transaction_seconds'): ..."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def timed(self, name: str, **labels):
+        """Dekorátor: a függvény futási idejének rögzítése"""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+
+    def collect(self) -> Dict:
+        """
+        Az összegyűjtött adatok kivétele és törlése (pl. egy munkafolyamatból a szülőnek
+        való továbbításhoz); a merge() párja
+        """
+        with self._lock:
+            data = {'counters': self._counters, 'timings': self._timings}
+            self._counters = {}
+            self._timings = {}
+        return data
+
+    def merge(self, data: Dict):
+        """Egy másik folyamatban a collect()-tel kivett adatok hozzáadása"""
+        if not self.enabled or not data:
+            return
+        with self._lock:
+            for key, value in data['counters'].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, (count, total, maximum) in data['timings'].items():
+                timing = self._timings.get(key)
+                if timing is None:
+                    self._timings[key] = [count, total, maximum]
+                else:
+                    timing[0] += count
+                    timing[1] += total
+                    timing[2] = max(timing[2], maximum)
+
+    def snapshot(self) -> Dict:
+        """A futás riportja (JSON-ként menthető)"""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            timings = [{'name': name, 'labels': dict(labels), 'count': count, 'sum': round(total, 6), 'max': round(maximum, 6)}
+                       for (name, labels), (count, total, maximum) in sorted(self._timings.items())]
+            cache = {dict(labels).get('result'): value for (name, labels), value in self._counters.items()
+                     if name == 'text_cache_requests_total'}
+        now = time.time()
+        lookups = cache.get('hit', 0) + cache.get('miss', 0)
+        return {
+            'started': datetime.fromtimestamp(self.started).isoformat(),
+            'finished': datetime.fromtimestamp(now).isoformat(),
+            'duration_seconds': round(now - self.started, 3),
+            'counters': counters,
+            'timings': timings,
+            'text_cache_hit_rate': round(cache.get('hit', 0) / lookups, 4) if lookups else None,
+        }
+
+    def to_prometheus(self) -> str:
+        """A metrikák Prometheus szöveges formátumban (node_exporter textfile collector)"""
+        report = self.snapshot()
+        lines = []
+        typed = set()
+
+        def sample(name, labels, value, metric_type, family=None):
+            family = family or name
+            if family not in typed:
+                typed.add(family)
+                lines.append(f"# TYPE {PREFIX}{family} {metric_type}")
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+            lines.append(f"{PREFIX}{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}{name} {value}")
+
+        for counter in report['counters']:
+            sample(counter['name'], counter['labels'], counter['value'], 'counter')
+        for timing in report['timings']:
+            sample(f"{timing['name']}_count", timing['labels'], timing['count'], 'summary', timing['name'])
+            sample(f"{timing['name']}_sum", timing['labels'], timing['sum'], 'summary', timing['name'])
+        sample('run_duration_seconds', {}, report['duration_seconds'], 'gauge')
+        sample('run_timestamp_seconds', {}, round(time.time()), 'gauge')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """A beállított exportok kiírása (atomi cserével, hogy a gyűjtő ne lásson félkész fájlt)"""
+        if not self.enabled:
+            return
+        try:
+            if self.textfile:
+                _write_atomic(self.textfile, self.to_prometheus())
+            if self.report:
+                _write_atomic(self.report, json.dumps(self.snapshot(), ensure_ascii=False, indent=2) + '\n')
+        except OSError as e:
+            logger.error(f"A metrikák mentése sikertelen: {e}")
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _write_atomic(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.tmp")
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temporary, path)
@@ -0,0 +1,3 @@
+from .email_digest import EmailDigest
+
+__all__ = ['EmailDigest']
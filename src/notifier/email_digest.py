@@ -0,0 +1,124 @@
+import smtplib
+import logging
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from typing import Dict, List, Optional
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class EmailDigest:
+    """
+    Futásonként egy összesítő email a még el nem küldött releváns közlönyökről. Az összefoglalók
+    egyetlen lekérdezéssel kerülnek betöltésre, címzettenként egy üzenet készül, és mind egy SMTP
+    kapcsolaton megy ki. A küldés után a közlönyök egy tranzakcióban kapják meg a sent_email jelzést.
+    """
+
+    def __init__(self, repository, host: str, sender: str, recipients: List[str], port: int = 25,
+                 username: Optional[str] = None, password: Optional[str] = None, starttls: bool = False,
+                 timeout: float = 30):
+        """
+        Args:
+            repository: A GazetteRepository
+            host: Az SMTP szerver címe
+            sender: A feladó címe
+            recipients: A címzettek címei
+            port: Az SMTP szerver portja
+            username: Felhasználónév (ha a szerver azonosítást kér)
+            password: Jelszó
+            starttls: Titkosított kapcsolat STARTTLS-sel
+            timeout: Hálózati időkorlát másodpercben
+        """
+        self.repository = repository
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    @staticmethod
+    def _group(rows: List[Dict]) -> List[Dict]:
+        """Az összefoglalók közlönyönként csoportosítva (a lekérdezés sorrendjében)"""
+        gazettes = {}
+        for row in rows:
+            gazette = gazettes.setdefault(row['gazette_id'], {
+                'id': row['gazette_id'], 'title': row['gazette_title'],
+                'publication_date': row['publication_date'], 'url': row['url'], 'summaries': [],
+            })
+            gazette['summaries'].append(row)
+        return list(gazettes.values())
+
+    def render(self, gazettes: List[Dict], recipient: str) -> EmailMessage:
+        """Az összesítő üzenet egy címzettnek (egyszerű szöveg)"""
+        count = sum(len(gazette['summaries']) for gazette in gazettes)
+        lines = [f"{count} releváns kormányhatározat {len(gazettes)} közlönyben.", ""]
+        for gazette in gazettes:
+            lines.append(f"{gazette['title']} ({gazette['publication_date']})")
+            lines.append(gazette['url'])
+            for number, summary in enumerate(gazette['summaries'], start=1):
+                lines.append(f"  {number}. {summary['gdecision_title']}")
+                lines.append(f"     Pontszám: {summary['relevant_score']}, kulcsszavak: {summary['keyword_matches']}")
+                lines.append(f"     {summary['summary']}")
+            lines.append("")
+
+        message = EmailMessage()
+        message['Subject'] = f"Magyar Közlöny: {count} releváns kormányhatározat ({len(gazettes)} közlöny)"
+        message['From'] = self.sender
+        message['To'] = recipient
+        message['Date'] = formatdate(localtime=True)
+        message['Message-ID'] = make_msgid()
+        message.set_content('\n'.join(lines))
+        return message
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or '')
+        return smtp
+
+    def send(self) -> int:
+        """
+        Az összesítő elküldése minden címzettnek. A közlönyök csak akkor kapják meg a sent_email
+        jelzést, ha legalább egy címzett megkapta az üzenetet; így ami egyszer kiment, nem megy ki
+        újra, ami pedig senkihez nem jutott el, a következő futással megy ki. Csak a lekérdezéskor
+        betöltött közlönyök kerülnek megjelölésre, a küldés közben elemzettek a következő összesítőbe kerülnek.
+
+        Returns:
+            Az elküldöttként megjelölt közlönyök száma
+        """
+        gazettes = self._group(self.repository.get_unsent_summaries())
+        if not gazettes:
+            logger.info("Nincs új releváns közlöny, email nem került küldésre")
+            return 0
+        if not self.recipients:
+            logger.warning("Nincs megadva email címzett (EMAIL_TO), az összesítő nem került küldésre")
+            return 0
+
+        delivered = []
+        try:
+            with self._connect() as smtp:
+                for recipient in self.recipients:
+                    try:
+                        smtp.send_message(self.render(gazettes, recipient), from_addr=self.sender, to_addrs=[recipient])
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                        # Egy címzett elutasítása nem akadályozza a többiek kiszolgálását
+                        logger.error(f"Az összesítő nem került kézbesítésre: {recipient} - {e}")
+                        metrics.inc('emails_failed_total')
+                        continue
+                    delivered.append(recipient)
+                    metrics.inc('emails_sent_total')
+        except (smtplib.SMTPException, OSError) as e:
+            logger.error(f"Hiba történt az email küldése közben: {e}")
+            metrics.inc('emails_failed_total')
+
+        if not delivered:
+            logger.error("Az összesítő egyetlen címzetthez sem jutott el, a következő futás újraküldi")
+            return 0
+        marked = self.repository.mark_as_sent([gazette['id'] for gazette in gazettes])
+        logger.info(f"Összesítő elküldve {len(delivered)} címzettnek: {marked} közlöny")
+        return marked
@@ -0,0 +1,12 @@
+from gdmonitor import set_metrics
+from metrics import metrics
+from .gazette_pipeline import GazettePipeline, extract_gdecisions, store_analysis, store_failure, worker_id
+from .process_pool import analyze_in_processes
+from .rescoring import rescore_resolutions
+from .watcher import GazetteWatcher
+
+# A gdmonitor mérési pontjai az alkalmazás gyűjtőjébe mérnek (a folyamatkészlet workereiben is, mert azok ezt a csomagot importálják)
+set_metrics(metrics)
+
+__all__ = ['GazettePipeline', 'extract_gdecisions', 'store_analysis', 'store_failure', 'worker_id',
+           'analyze_in_processes', 'rescore_resolutions', 'GazetteWatcher']
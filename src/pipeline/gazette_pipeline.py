@@ -0,0 +1,267 @@
+import os
+import queue
+import socket
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+from gdmonitor import iter_text_cached, iter_resolutions, analyze_resolutions
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def worker_id() -> str:
+    """A feldolgozó egyedi azonosítója a feladatok lefoglalásához (gépnév:folyamatazonosító)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def extract_gdecisions(gazette: Dict, download_path: Path, text_cache, pdf_mode: str = 'serial',
+                       pdf_workers: Optional[int] = None, decisions_only: bool = False,
+                       pdf_backend: str = 'pdfplumber') -> List[Dict]:
+    """
+    Egy letöltött közlöny kormányhatározatainak kinyerése (szöveg kinyerés + határozatok szétválasztása)
+
+    Args:
+        gazette: A közlöny adatbázis sora (filename, és ha ismert, sha256)
+        download_path: A letöltési könyvtár
+        text_cache: A kinyert szövegek gyorsítótára
+        decisions_only: Csak a kormányhatározatokat tartalmazó oldalak kinyerése
+        pdf_backend: A szövegkinyerő backend ('pdfplumber' vagy 'pdfium')
+    """
+    pdf_path = download_path / gazette['filename']
+    # A letöltéskor rögzített hash alapján a fájlt nem kell újra beolvasni
+    pages = iter_text_cached(pdf_path, text_cache, content_hash=gazette.get('sha256'), mode=pdf_mode, workers=pdf_workers,
+                             decisions_only=decisions_only, backend=pdf_backend)
+    return list(iter_resolutions(pages))
+
+def store_analysis(repository, gazette: Dict, gdecisions: List[Dict], results: Optional[Dict]) -> bool:
+    """
+    Egy közlöny elemzési eredményének mentése: az összefoglalók, a határozatok szövege (a teljes
+    szöveges kereséshez) és az elemzett jelzés egyetlen commit-tal.
+    Lefoglalt közlöny (lease_owner) eredménye csak akkor kerül mentésre, ha a bérlet még érvényes.
+
+    Args:
+        gdecisions: A közlöny kormányhatározatai
+        results: Az analyze_resolutions eredménye (None, ha nem volt mit elemezni)
+
+    Returns:
+        False, ha a bérletet időközben más feldolgozó vette át, és az eredmény elvetésre került
+    """
+    owner = gazette.get('lease_owner')
+    if not gdecisions:
+        logger.info(f"Nincs kormányhatározat a közlönyben: {gazette['title']}")
+        return _complete(repository, gazette, False, owner)
+
+    # A határozatok a közlönyön belüli sorszámukkal azonosíthatók (a cím nem feltétlenül egyedi);
+    # az eredmények ugyanazokra a határozat objektumokra hivatkoznak
+    ordinal_of = {id(gdecision): ordinal for ordinal, gdecision in enumerate(gdecisions)}
+    summaries = []
+    ordinals = []
+    scores = {}
+    for result in results['relevant_resolutions']:
+        gdecision = result['resolution']
+        ordinal = ordinal_of[id(gdecision)]
+        scores[ordinal] = (result['relevance_score'], result['keyword_matches'])
+        logger.info(f"Releváns: {gdecision['title']} pontszám: {result['relevance_score']}")
+        summaries.append((gdecision['title'], result['relevance_score'], result['keyword_matches'], result['summary']))
+        ordinals.append(ordinal)
+    for ordinal, gdecision in enumerate(gdecisions):
+        if ordinal not in scores:
+            logger.info(f"Nem releváns: {gdecision['title']}")
+
+    with repository.transaction():
+        # Először a befejezés (ez ellenőrzi a bérletet), csak utána az összefoglalók
+        if not _complete(repository, gazette, bool(scores), owner):
+            return False
+        ruleset_version = results.get('ruleset_version')
+        repository.save_summaries(gazette['id'], summaries, ruleset_version=ruleset_version, ordinals=ordinals)
+        # Minden határozat teljes szövege (a kereséshez és az újrapontozáshoz), nem csak a relevánsak összefoglalója
+        repository.save_resolutions(gazette['id'], gdecisions, ruleset_version=ruleset_version, scores=scores)
+    return True
+
+def _complete(repository, gazette: Dict, is_relevant: bool, owner: Optional[str]) -> bool:
+    if repository.mark_as_analyzed(gazette['id'], is_relevant=is_relevant, owner=owner):
+        metrics.inc('gazettes_analyzed_total', relevant=str(is_relevant).lower())
+        return True
+    logger.warning(f"A bérlet lejárt, az eredmény elvetve: {gazette['title']}")
+    return False
+
+def store_failure(repository, gazette: Dict, error: Union[Exception, str]):
+    """Sikertelen feldolgozás rögzítése: a közlöny késleltetve újra elemzésre kerül"""
+    logger.error(f"Nem sikerült a PDF szöveg kinyerése: {gazette['filename']} - {error}")
+    metrics.inc('analysis_errors_total')
+    status = repository.fail_gazette(gazette['id'], str(error), owner=gazette.get('lease_owner'))
+    if status == 'failed':
+        logger.error(f"Az elemzés végleg sikertelen, több próbálkozás nem lesz: {gazette['title']}")
+
+# A feldolgozási lánc végét jelző elem
+_DONE = object()
+
+class GazettePipeline:
+    """
+    Átlapolt letöltés és elemzés: letöltés -> szöveg és határozat kinyerés -> pontozás és
+    összefoglaló -> adatbázis írás. A szakaszok külön szálakon futnak, korlátos sorokon
+    keresztül adják tovább a közlönyöket, így egy közlöny elemzése azonnal elkezdődik,
+    amint a PDF megérkezett, és egy lassú szakasz visszafogja az előtte lévőket.
+    """
+
+    QUEUE_SIZE = 4
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, fetcher, text_cache, queue_size: Optional[int] = None,
+                 pdf_mode: str = 'serial', pdf_workers: Optional[int] = None, owner: Optional[str] = None,
+                 ruleset=None, decisions_only: bool = False, pdf_backend: str = 'pdfplumber',
+                 fetch: Optional[Callable] = None):
+        """
+        Args:
+            fetcher: A GazetteFetcher példány (a repository-ját is ez adja)
+            text_cache: A kinyert szövegek gyorsítótára
+            queue_size: A szakaszok közötti sorok mérete
+            owner: A feldolgozó azonosítója a közlönyök lefoglalásához
+            ruleset: A pontozás szabálykészlete (alapértelmezett: a beépített kulcsszavak)
+            decisions_only: Csak a kormányhatározatokat tartalmazó oldalak kinyerése
+            pdf_backend: A szövegkinyerő backend ('pdfplumber' vagy 'pdfium')
+            fetch: A letöltést végző függvény on_downloaded és stop_event paraméterrel (alapértelmezett:
+                a feed új közlönyei, fetcher.fetch_new_gazettes; pl. visszamenőleges letöltéshez cserélhető)
+        """
+        self.fetcher = fetcher
+        self.fetch = fetch or fetcher.fetch_new_gazettes
+        self.owner = owner or worker_id()
+        self.ruleset = ruleset
+        self.repository = fetcher.repository
+        self.text_cache = text_cache
+        self.pdf_mode = pdf_mode
+        self.pdf_workers = pdf_workers
+        self.decisions_only = decisions_only
+        self.pdf_backend = pdf_backend
+        size = queue_size if queue_size else self.QUEUE_SIZE
+        self.extract_queue = queue.Queue(maxsize=size)
+        self.analyze_queue = queue.Queue(maxsize=size)
+        self.write_queue = queue.Queue(maxsize=size)
+        self._stop = threading.Event()
+        self._abort = threading.Event()
+        # A letöltés (feed lekérdezés) kivétele; a lánc ettől még elemzi a korábbról elemzetlen közlönyöket
+        self.error: Optional[str] = None
+
+    def stop(self):
+        """
+        Leállítás: újabb letöltés és lefoglalás nem indul, a láncban lévő (már lefoglalt)
+        közlönyök elemzése viszont befejeződik és mentésre kerül
+        """
+        self._stop.set()
+
+    def _put(self, target: queue.Queue, item) -> bool:
+        # Blokkoló írás (ez adja a visszatartást); csak akkor adja fel, ha az író szakasz leállt
+        while not self._abort.is_set():
+            try:
+                target.put(item, timeout=self.POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue):
+        while not self._abort.is_set():
+            try:
+                return source.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _source(self):
+        """
+        Az új letöltések, majd a korábbról elemzetlen közlönyök a lánc elejére.
+        Minden közlöny lefoglalásra kerül, mielőtt a sorba kerül, így más feldolgozó nem kapja meg.
+        """
+        def enqueue(gazette: Dict):
+            # Leállítás után a letöltött közlöny lefoglalatlanul marad, a következő futás elemzi
+            if self._stop.is_set():
+                return
+            for claimed in self.repository.claim_gazettes(self.owner, ids=[gazette['id']]):
+                self._put(self.extract_queue, claimed)
+
+        try:
+            if not self._stop.is_set():
+                self.fetch(on_downloaded=enqueue, stop_event=self._stop)
+            while not self._stop.is_set():
+                claimed = self.repository.claim_gazettes(self.owner)
+                if not claimed:
+                    break
+                self._put(self.extract_queue, claimed[0])
+        except Exception as e:
+            logger.error(f"Hiba történt a közlönyök letöltése közben: {e}")
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self._put(self.extract_queue, _DONE)
+
+    def _extract_stage(self):
+        while True:
+            gazette = self._get(self.extract_queue)
+            if gazette is _DONE:
+                self._put(self.analyze_queue, _DONE)
+                return
+            logger.info(f"Elemzés: {gazette['title']} ({gazette['publication_date']})")
+            try:
+                gdecisions = extract_gdecisions(gazette, self.fetcher.download_path, self.text_cache,
+                                                self.pdf_mode, self.pdf_workers, self.decisions_only,
+                                                self.pdf_backend)
+                item = (gazette, gdecisions, None)
+            except Exception as e:
+                item = (gazette, None, e)
+            self._put(self.analyze_queue, item)
+
+    def _analyze_stage(self):
+        while True:
+            item = self._get(self.analyze_queue)
+            if item is _DONE:
+                self._put(self.write_queue, _DONE)
+                return
+            gazette, gdecisions, error = item
+            results = None
+            if gdecisions:
+                try:
+                    results = analyze_resolutions(gdecisions, ruleset=self.ruleset)
+                except Exception as e:
+                    error = e
+            self._put(self.write_queue, (gazette, gdecisions, results, error))
+
+    def _write_stage(self) -> int:
+        # Egyetlen író: az összes elemzési eredmény ebben a szálban kerül az adatbázisba
+        count = 0
+        while True:
+            item = self._get(self.write_queue)
+            if item is _DONE:
+                return count
+            gazette, gdecisions, results, error = item
+            if error is not None:
+                store_failure(self.repository, gazette, error)
+            else:
+                store_analysis(self.repository, gazette, gdecisions, results)
+            count += 1
+
+    def run(self) -> int:
+        """
+        A teljes lánc futtatása; az adatbázis írás a hívó szálban történik.
+
+        Returns:
+            Az elemzett közlönyök száma
+        """
+        threads = [
+            threading.Thread(target=self._source, name='pipeline-download', daemon=True),
+            threading.Thread(target=self._extract_stage, name='pipeline-extract', daemon=True),
+            threading.Thread(target=self._analyze_stage, name='pipeline-analyze', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            count = self._write_stage()
+        finally:
+            # Hiba vagy megszakítás (pl. Ctrl+C) esetén az író nem fut tovább: a többi szakasz a sorban
+            # lévő elemeket elveti; a szálak a folyamatban lévő lépés után kilépnek
+            self.stop()
+            self._abort.set()
+            for thread in threads:
+                thread.join()
+            # A lefoglalt, de fel nem dolgozott közlönyök azonnal visszakerülnek a várakozók közé
+            self.repository.release_gazettes(self.owner)
+        logger.info(f"{count} közlöny elemzése befejeződött")
+        return count
@@ -0,0 +1,101 @@
+import os
+import logging
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Optional
+from repository import TextCacheRepository
+from gdmonitor import analyze_resolutions
+from gdmonitor.resulation_analyzer import get_nlp
+from metrics import metrics
+from .gazette_pipeline import extract_gdecisions, store_analysis, store_failure, worker_id
+
+logger = logging.getLogger(__name__)
+
+# A munkafolyamatok saját állapota (a folyamat indulásakor töltődik fel)
+_worker_state: Dict = {}
+
+def _init_worker(download_path: str, cache_path: str, cache_max_bytes: Optional[int], ruleset, decisions_only: bool,
+                 pdf_backend: str, metrics_enabled: bool):
+    """Munkafolyamat előkészítése: a nyelvi modell és a gyorsítótár folyamatonként egyszer töltődik be"""
+    # A szülőtől (fork) örökölt mérések nem számíthatnak kétszer
+    metrics.reset()
+    metrics.enabled = metrics_enabled
+    _worker_state['download_path'] = Path(download_path)
+    _worker_state['ruleset'] = ruleset
+    _worker_state['decisions_only'] = decisions_only
+    _worker_state['pdf_backend'] = pdf_backend
+    _worker_state['text_cache'] = TextCacheRepository(Path(cache_path), max_bytes=cache_max_bytes)
+    get_nlp()
+
+def _analyze_gazette(gazette: Dict):
+    """
+    Egy közlöny kinyerése és elemzése egy munkafolyamatban (adatbázis írás nélkül)
+
+    Returns:
+        (gazette, gdecisions, results, error, measurements) - a hibát szövegként adjuk vissza,
+        mert nem minden kivétel szerializálható a folyamatok között; a méréseket a szülő összesíti
+    """
+    try:
+        gdecisions = extract_gdecisions(gazette, _worker_state['download_path'], _worker_state['text_cache'],
+                                        decisions_only=_worker_state['decisions_only'],
+                                        pdf_backend=_worker_state['pdf_backend'])
+        results = analyze_resolutions(gdecisions, ruleset=_worker_state['ruleset']) if gdecisions else None
+    except Exception as e:
+        return gazette, None, None, f"{type(e).__name__}: {e}", metrics.collect()
+    return gazette, gdecisions, results, None, metrics.collect()
+
+def analyze_in_processes(repository, download_path: Path, text_cache: TextCacheRepository,
+                         workers: Optional[int] = None, owner: Optional[str] = None, ruleset=None,
+                         decisions_only: bool = False, pdf_backend: str = 'pdfplumber') -> int:
+    """
+    Közlönyök párhuzamos elemzése több folyamatban. A kinyerés és a pontozás a munkafolyamatokban
+    fut, az eredményeket egyetlen író (a hívó folyamat) menti az adatbázisba, a befejezés sorrendjében.
+    A munkafolyamatokon belül a PDF feldolgozás soros, a párhuzamosságot a közlönyök adják.
+    A közlönyök folyamatosan, kis adagokban kerülnek lefoglalásra, így a bérletek nem járnak le a sorban.
+
+    Args:
+        repository: Az eredményeket mentő GazetteRepository
+        download_path: A letöltési könyvtár
+        text_cache: A kinyert szövegek gyorsítótára (a munkafolyamatok ugyanezt a fájlt használják)
+        workers: A folyamatok száma (alapértelmezett: CPU magok száma)
+        owner: A feldolgozó azonosítója a közlönyök lefoglalásához
+        ruleset: A pontozás szabálykészlete (alapértelmezett: a beépített kulcsszavak)
+        decisions_only: Csak a kormányhatározatokat tartalmazó oldalak kinyerése
+        pdf_backend: A szövegkinyerő backend ('pdfplumber' vagy 'pdfium')
+
+    Returns:
+        Az elemzett közlönyök száma
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    owner = owner or worker_id()
+    in_flight = workers * 2
+    logger.info(f"Közlönyök elemzése {workers} folyamattal")
+
+    count = 0
+    pending = set()
+    exhausted = False
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(download_path), str(text_cache.db_path), text_cache.max_bytes, ruleset, decisions_only,
+                                           pdf_backend, metrics.enabled)) as executor:
+            while True:
+                if not exhausted and len(pending) < in_flight:
+                    claimed = repository.claim_gazettes(owner, limit=in_flight - len(pending))
+                    exhausted = not claimed
+                    pending.update(executor.submit(_analyze_gazette, gazette) for gazette in claimed)
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    gazette, gdecisions, results, error, measurements = future.result()
+                    metrics.merge(measurements)
+                    logger.info(f"Elemzés kész: {gazette['title']} ({gazette['publication_date']})")
+                    if error is not None:
+                        store_failure(repository, gazette, error)
+                    else:
+                        store_analysis(repository, gazette, gdecisions, results)
+                    count += 1
+    finally:
+        # Megszakításkor a már lefoglalt közlönyöket más feldolgozó azonnal átveheti
+        repository.release_gazettes(owner)
+    return count
@@ -0,0 +1,62 @@
+import logging
+from typing import Dict
+from gdmonitor import KeywordRuleset, summarize_contents
+
+logger = logging.getLogger(__name__)
+
+# Egyszerre ennyi határozat kerül beolvasásra és pontozásra
+RESCORE_BATCH_SIZE = 500
+
+def rescore_resolutions(repository, ruleset: KeywordRuleset, batch_size: int = RESCORE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    A tárolt kormányhatározatok újrapontozása egy új szabálykészlettel, PDF feldolgozás nélkül.
+    Csak a még nem ezzel a verzióval pontozott határozatok kerülnek sorra; összefoglaló csak
+    az újonnan relevánssá vált határozatokhoz készül, a többinél a meglévő összefoglaló
+    pontszáma frissül, illetve a már nem releváns határozat összefoglalója törlődik.
+
+    Args:
+        repository: A GazetteRepository
+        ruleset: Az új szabálykészlet
+        batch_size: Egy lépésben (egy tranzakcióban) feldolgozott határozatok száma
+
+    Returns:
+        Statisztika: újrapontozott, változott, új összefoglaló és törölt összefoglaló darabszám
+    """
+    repository.save_ruleset(ruleset.version, ruleset.name, ruleset.definition())
+    stats = {'rescored': 0, 'changed': 0, 'summarized': 0, 'removed': 0}
+
+    after_id = 0
+    while True:
+        rows = repository.get_resolutions_to_rescore(ruleset.version, after_id=after_id, limit=batch_size)
+        if not rows:
+            break
+        after_id = rows[-1]['id']
+
+        scores, updated, removed, to_summarize = [], [], [], []
+        for row in rows:
+            score, keywords = ruleset.score(row)
+            keyword_matches = ', '.join(keywords)
+            scores.append((row['id'], score, keyword_matches))
+            changed = (score, keyword_matches) != (row['relevant_score'], row['keyword_matches'])
+            stats['changed'] += changed
+            if score == 0:
+                if row['summary_id'] is not None:
+                    removed.append(row['summary_id'])
+            elif row['summary_id'] is not None:
+                # Az összefoglaló a tartalomból készül, a pontszámtól független: újra lehet használni
+                updated.append((row['summary_id'], score, keyword_matches))
+            else:
+                to_summarize.append((row, score, keyword_matches))
+
+        summaries = summarize_contents([row['content'] for row, _, _ in to_summarize]) if to_summarize else []
+        added = [(row['gazette_id'], row['title'], row['ordinal'], score, keyword_matches, summary)
+                 for (row, score, keyword_matches), summary in zip(to_summarize, summaries)]
+        repository.apply_rescoring(ruleset.version, scores, updated, removed, added)
+
+        stats['rescored'] += len(rows)
+        stats['summarized'] += len(added)
+        stats['removed'] += len(removed)
+
+    logger.info(f"Újrapontozás ({ruleset.name}, {ruleset.version}): {stats['rescored']} határozat, "
+                f"{stats['changed']} változott, {stats['summarized']} új összefoglaló, {stats['removed']} törölve")
+    return stats
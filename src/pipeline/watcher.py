@@ -0,0 +1,130 @@
+import random
+import signal
+import logging
+import threading
+from typing import Callable, Optional
+from gdmonitor.resulation_analyzer import get_nlp
+from metrics import metrics
+from .gazette_pipeline import GazettePipeline, worker_id
+
+logger = logging.getLogger(__name__)
+
+class GazetteWatcher:
+    """
+    Folyamatos futás (cron helyett): a nyelvi modell, a szabálykészlet és az adatbázis kapcsolat
+    egyszer töltődik be, a feed pedig időközönként kerül lekérdezésre. Az új közlönyök a
+    GazettePipeline-nal azonnal elemzésre kerülnek. Hiba után a várakozás exponenciálisan nő.
+    SIGTERM/SIGINT hatására új letöltés nem indul, a körben már lefoglalt közlönyök elemzése
+    befejeződik és mentésre kerül, majd a figyelés leáll.
+    """
+
+    INTERVAL = 900
+    JITTER = 0.1
+    RETRY_DELAY = 60
+    MAX_BACKOFF = 3600
+
+    def __init__(self, fetcher, text_cache, interval: Optional[float] = None, jitter: Optional[float] = None,
+                 max_backoff: Optional[float] = None, retry_delay: Optional[float] = None,
+                 after_cycle: Optional[Callable[[], None]] = None, **pipeline_options):
+        """
+        Args:
+            fetcher: A GazetteFetcher példány (a repository-ja a teljes futás alatt nyitva marad)
+            text_cache: A kinyert szövegek gyorsítótára
+            interval: Két lekérdezés közötti várakozás másodpercben
+            jitter: A várakozás véletlen eltérése (0.1 = ±10%), hogy több példány ne egyszerre kérdezzen
+            max_backoff: Hiba utáni várakozás felső korlátja másodpercben
+            retry_delay: Az első hiba utáni várakozás másodpercben (utána minden hibánál duplázódik)
+            after_cycle: Minden kör után meghívva (pl. az email összesítő küldése)
+            pipeline_options: A GazettePipeline további paraméterei (pdf_mode, ruleset, decisions_only, ...)
+        """
+        self.fetcher = fetcher
+        self.text_cache = text_cache
+        self.interval = interval if interval is not None else self.INTERVAL
+        self.jitter = jitter if jitter is not None else self.JITTER
+        self.max_backoff = max_backoff if max_backoff is not None else self.MAX_BACKOFF
+        self.retry_delay = retry_delay if retry_delay is not None else self.RETRY_DELAY
+        self.after_cycle = after_cycle
+        self.pipeline_options = pipeline_options
+        self.pipeline_options.setdefault('owner', worker_id())
+        self.failures = 0
+        self._pipeline: Optional[GazettePipeline] = None
+        self._stop = threading.Event()
+
+    def next_delay(self, failures: int) -> float:
+        """A következő lekérdezésig hátralévő idő: hiba nélkül az intervallum, hibák után exponenciális visszalépés"""
+        if failures:
+            delay = min(self.max_backoff, self.retry_delay * 2 ** (failures - 1))
+        else:
+            delay = self.interval
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def stop(self, *_):
+        """Leállítás (jelkezelőként is használható): a már lefoglalt közlönyök elemzése befejeződik"""
+        if not self._stop.is_set():
+            logger.info("Leállítás kérve, a folyamatban lévő elemzés befejezése...")
+        self._stop.set()
+        if self._pipeline is not None:
+            self._pipeline.stop()
+
+    def install_signal_handlers(self):
+        """SIGTERM (pl. podman stop) és SIGINT esetén szabályos leállás; csak a fő szálból hívható"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def run_once(self) -> int:
+        """
+        Egy kör: feed lekérdezés, letöltés és az elemzetlen közlönyök elemzése.
+        A hibák számát a fetcher utolsó hibája, a letöltés kivétele és az elemzés kivételei alapján vezeti.
+
+        Returns:
+            Az elemzett közlönyök száma
+        """
+        pipeline = self._pipeline = GazettePipeline(self.fetcher, self.text_cache, **self.pipeline_options)
+        if self._stop.is_set():
+            # A leállítás a lánc létrehozása előtt érkezett
+            pipeline.stop()
+        try:
+            count = pipeline.run()
+        except Exception as e:
+            logger.error(f"Hiba a figyelés során: {e}")
+            self.failures += 1
+            return 0
+        finally:
+            self._pipeline = None
+        error = pipeline.error or self.fetcher.last_error
+        if error:
+            logger.warning(f"Sikertelen lekérdezés ({self.failures + 1}. egymás után): {error}")
+            self.failures += 1
+        else:
+            self.failures = 0
+        return count
+
+    def run(self, max_cycles: Optional[int] = None) -> int:
+        """
+        Figyelés a leállításig (vagy max_cycles körig)
+
+        Returns:
+            Az összesen elemzett közlönyök száma
+        """
+        # A modell betöltése induláskor, hogy az első közlöny elemzését már ne lassítsa
+        get_nlp()
+        logger.info(f"Figyelés indul: {self.interval:.0f} s időközzel (±{self.jitter:.0%})")
+        total = 0
+        cycles = 0
+        while not self._stop.is_set():
+            total += self.run_once()
+            if self.after_cycle is not None:
+                try:
+                    self.after_cycle()
+                except Exception as e:
+                    logger.error(f"Hiba a kör utáni feladatban: {e}")
+            # A metrikák körönként frissülnek, így a gyűjtő a futás közben is látja őket
+            metrics.flush()
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+            delay = self.next_delay(self.failures)
+            logger.info(f"Következő lekérdezés {delay:.0f} s múlva")
+            self._stop.wait(delay)
+        logger.info(f"Figyelés leállt, {total} közlöny elemezve")
+        return total
@@ -1,3 +1,4 @@
 from .repo_gazette import GazetteRepository
+from .repo_text_cache import TextCacheRepository
 
-__all__ = ['GazetteRepository']
\ No newline at end of file
+__all__ = ['GazetteRepository', 'TextCacheRepository']
\ No newline at end of file
@@ -1,120 +1,681 @@
+import re
+import time
 import sqlite3
+import json
 import logging
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterator
+from metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# A sorszám nélküli (régi) összefoglalók hozzárendelése a határozatokhoz: cím szerint, azonos
+# című határozatoknál az összefoglalók és a határozatok sorrendjében párosítva
+_LINK_SUMMARIES = """
+    UPDATE summary SET resolution_ordinal = (
+        SELECT r.ordinal
+        FROM (SELECT ordinal, ROW_NUMBER() OVER (ORDER BY ordinal) AS n FROM resolutions
+              WHERE gazette_id = summary.gazette_id AND title = summary.gdecision_title) r
+        WHERE r.n = (SELECT COUNT(*) FROM summary s WHERE s.gazette_id = summary.gazette_id
+                     AND s.gdecision_title = summary.gdecision_title AND s.id <= summary.id))
+    WHERE resolution_ordinal IS NULL"""
+
+# Séma migrációk sorrendben; a PRAGMA user_version az utoljára alkalmazott lépés sorszáma.
+# Új lépést mindig a lista végére kell felvenni, a meglévőket nem szabad módosítani.
+MIGRATIONS: List[List[str]] = [
+    # 1: indexek a gyakori lekérdezésekhez
+    [
+        # Csak a még nem elemzett sorokat tartalmazó részleges index
+        "CREATE INDEX IF NOT EXISTS idx_gazettes_unanalyzed ON gazettes(id) WHERE analyzed = 0",
+        "CREATE INDEX IF NOT EXISTS idx_summary_gazette_id ON summary(gazette_id)",
+    ],
+    # 2: RSS feed lekérési állapota a feltételes kérésekhez
+    [
+        """CREATE TABLE IF NOT EXISTS feed_state (
+            feed_url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            last_pub_date TEXT,
+            since_date TEXT,
+            updated TEXT NOT NULL
+        )""",
+    ],
+    # 3: a letöltött PDF tartalmának ellenőrzőösszege
+    [
+        "ALTER TABLE gazettes ADD COLUMN sha256 TEXT",
+    ],
+    # 4: tartalom szerinti PDF tároló és az azonos tartalmú közlönyök összekapcsolása
+    [
+        """CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created TEXT NOT NULL
+        )""",
+        "ALTER TABLE gazettes ADD COLUMN duplicate_of INTEGER REFERENCES gazettes(id)",
+        "CREATE INDEX IF NOT EXISTS idx_gazettes_sha256 ON gazettes(sha256)",
+    ],
+    # 5: elemzési feladatsor - állapot, bérlet (lease) és újrapróbálkozás
+    [
+        "ALTER TABLE gazettes ADD COLUMN status TEXT NOT NULL DEFAULT 'pending'",
+        "ALTER TABLE gazettes ADD COLUMN lease_owner TEXT",
+        "ALTER TABLE gazettes ADD COLUMN lease_expires TEXT",
+        "ALTER TABLE gazettes ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE gazettes ADD COLUMN next_attempt TEXT",
+        "ALTER TABLE gazettes ADD COLUMN last_error TEXT",
+        "UPDATE gazettes SET status = 'done' WHERE analyzed = 1",
+        "CREATE INDEX IF NOT EXISTS idx_gazettes_status ON gazettes(status, id) WHERE status IN ('pending', 'running')",
+    ],
+    # 6: a kormányhatározatok teljes szövege és FTS5 teljes szöveges indexe
+    [
+        """CREATE TABLE IF NOT EXISTS resolutions (
+            id INTEGER PRIMARY KEY,
+            gazette_id INTEGER NOT NULL REFERENCES gazettes(id),
+            number TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            resolution_date TEXT,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_resolutions_gazette_id ON resolutions(gazette_id)",
+        # Külső tartalmú index: a szöveget csak a resolutions tábla tárolja, az indexet triggerek frissítik.
+        # Az ékezetek nélküli keresés is találjon (hitelfelvetel -> hitelfelvétel)
+        """CREATE VIRTUAL TABLE IF NOT EXISTS resolutions_fts USING fts5(
+            title, content, content='resolutions', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS resolutions_ai AFTER INSERT ON resolutions BEGIN
+            INSERT INTO resolutions_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS resolutions_ad AFTER DELETE ON resolutions BEGIN
+            INSERT INTO resolutions_fts(resolutions_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS resolutions_au AFTER UPDATE ON resolutions BEGIN
+            INSERT INTO resolutions_fts(resolutions_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO resolutions_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END""",
+    ],
+    # 7: verziózott kulcsszavas szabálykészletek; a határozatok pontszáma a szabálykészlet verziójával
+    [
+        """CREATE TABLE IF NOT EXISTS rulesets (
+            version TEXT PRIMARY KEY,
+            name TEXT,
+            definition TEXT NOT NULL,
+            created TEXT NOT NULL
+        )""",
+        "ALTER TABLE resolutions ADD COLUMN ruleset_version TEXT",
+        "ALTER TABLE resolutions ADD COLUMN score INTEGER",
+        "ALTER TABLE resolutions ADD COLUMN keyword_matches TEXT",
+        "ALTER TABLE summary ADD COLUMN ruleset_version TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_summary_gazette_title ON summary(gazette_id, gdecision_title)",
+    ],
+    # 8: a visszamenőleges letöltés (backfill) évenkénti ellenőrzőpontja
+    [
+        """CREATE TABLE IF NOT EXISTS backfill_state (
+            year INTEGER PRIMARY KEY,
+            last_number INTEGER NOT NULL,
+            updated TEXT NOT NULL
+        )""",
+    ],
+    # 9: az el nem küldött releváns közlönyök részleges indexe, hogy az email összesítő
+    # lekérdezése nagy (pl. visszamenőleg feltöltött) adatbázison se olvassa végig a táblát
+    [
+        "CREATE INDEX IF NOT EXISTS idx_gazettes_unsent ON gazettes(id) WHERE relevant = 1 AND sent_email = 0",
+    ],
+    # 10: a határozat és az összefoglalója a közlönyön belüli sorszámmal kapcsolódik (a cím nem egyedi);
+    # a meglévő összefoglalók a cím szerint, azonos címnél sorrendben kapják meg a sorszámot
+    [
+        "ALTER TABLE resolutions ADD COLUMN ordinal INTEGER",
+        """UPDATE resolutions SET ordinal = (
+            SELECT COUNT(*) FROM resolutions r WHERE r.gazette_id = resolutions.gazette_id AND r.id < resolutions.id)""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_resolutions_gazette_ordinal ON resolutions(gazette_id, ordinal)",
+        "ALTER TABLE summary ADD COLUMN resolution_ordinal INTEGER",
+        _LINK_SUMMARIES,
+        "CREATE INDEX IF NOT EXISTS idx_summary_gazette_ordinal ON summary(gazette_id, resolution_ordinal)",
+    ],
+]
+
+# Az elemzési feladatok állapotai
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Az FTS5 lekérdezési nyelv elemei; ha a keresés ilyet tartalmaz, változtatás nélkül kerül átadásra
+_FTS_SYNTAX = re.compile(r'["*()^:]|\b(?:AND|OR|NOT|NEAR)\b')
+
+def _fts_query(query: str) -> str:
+    """
+    Egyszerű keresőszavakból FTS5 lekérdezés: minden szó előtagként illeszkedik (a toldalékok
+    miatt: hitelfelvétel -> hitelfelvételről), és mindegyiknek szerepelnie kell
+    """
+    if _FTS_SYNTAX.search(query):
+        return query
+    return ' '.join('"' + word.replace('"', '""') + '"*' for word in query.split())
+
+def _utc_now() -> datetime:
+    # A bérletek lejárata több gépről is összevethető legyen: mindig UTC
+    return datetime.now(timezone.utc)
+
 class GazetteRepository:
     """Magyar Közlöny adatbázis műveletek kezelése"""
-    
+
+    # Alapértelmezett bérletidő és újrapróbálkozási szabályok az elemzési feladatokhoz
+    LEASE_SECONDS = 30 * 60
+    MAX_ATTEMPTS = 5
+    RETRY_BACKOFF_SECONDS = 60
+
     def __init__(self, db_path: Path):
         self.db_path = db_path
+        # Egyetlen, a példány élettartamáig nyitva tartott kapcsolat; a tranzakciókat
+        # kézzel kezeljük (isolation_level=None), a párhuzamos hozzáférést zár sorosítja
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._tx_depth = 0
+        self._configure_connection()
         self._init_database()
-    
+
+    def _configure_connection(self):
+        """SQLite beállítások: WAL napló, ritkább fsync, várakozás zárolt adatbázisnál"""
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+
     def _init_database(self):
         """Adatbázis inicializálása, ha még nem létezik"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.executescript('''
-        CREATE TABLE IF NOT EXISTS gazettes (
-            id INTEGER PRIMARY KEY,
-            title TEXT NOT NULL,
-            publication_date TEXT NOT NULL,
-            url TEXT NOT NULL UNIQUE,
-            filename TEXT NOT NULL,
-            download_date TEXT NOT NULL,
-            analyzed INTEGER DEFAULT 0,
-            relevant INTEGER DEFAULT 0,  
-            sent_email INTEGER DEFAULT 0       
-        );
-        CREATE TABLE IF NOT EXISTS summary (
-            id INTEGER PRIMARY KEY,
-            gazette_id INTEGER NOT NULL,
-            gdecision_title TEXT,
-            relevant_score INTEGER DEFAULT 0,
-            keyword_matches TEXT,
-            summary TEXT NOT NULL,
-            FOREIGN KEY (gazette_id) REFERENCES gazettes(id)
-        );           
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
+        with self.transaction() as cursor:
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS gazettes (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                publication_date TEXT NOT NULL,
+                url TEXT NOT NULL UNIQUE,
+                filename TEXT NOT NULL,
+                download_date TEXT NOT NULL,
+                analyzed INTEGER DEFAULT 0,
+                relevant INTEGER DEFAULT 0,
+                sent_email INTEGER DEFAULT 0
+            )''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS summary (
+                id INTEGER PRIMARY KEY,
+                gazette_id INTEGER NOT NULL,
+                gdecision_title TEXT,
+                relevant_score INTEGER DEFAULT 0,
+                keyword_matches TEXT,
+                summary TEXT NOT NULL,
+                FOREIGN KEY (gazette_id) REFERENCES gazettes(id)
+            )''')
+        self._migrate()
+
+    def _migrate(self):
+        """A még nem alkalmazott séma migrációk futtatása"""
+        with self.transaction() as cursor:
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.execute(f"PRAGMA user_version = {number}")
+                logger.info(f"Adatbázis séma frissítve: {number}. verzió")
+
+    @contextmanager
+    def transaction(self, immediate: bool = False) -> Iterator[sqlite3.Cursor]:
+        """
+        Munkaegység: a blokkon belüli összes írás egyetlen commit-tal kerül mentésre,
+        hiba esetén pedig egyik sem. Egymásba ágyazható, a külső blokk végén történik a commit.
+        Az immediate=True már az elején megszerzi az írási zárat (olvasás utáni írásnál
+        így egy másik folyamat nem módosíthatja közben az olvasott sorokat).
+
+        Példa:
+            with repository.transaction():
+                repository.save_summaries(gazette_id, results)
+                repository.mark_as_analyzed(gazette_id, is_relevant=True)
+        """
+        with self._lock:
+            cursor = self._conn.cursor()
+            if self._tx_depth == 0:
+                started = time.perf_counter() if metrics.enabled else None
+                cursor.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            self._tx_depth += 1
+            try:
+                yield cursor
+            except BaseException:
+                self._tx_depth -= 1
+                if self._tx_depth == 0:
+                    self._conn.rollback()
+                    metrics.inc('db_rollbacks_total')
+                raise
+            else:
+                self._tx_depth -= 1
+                if self._tx_depth == 0:
+                    self._conn.commit()
+                    if started is not None:
+                        metrics.observe('db_transaction_seconds', time.perf_counter() - started)
+            finally:
+                cursor.close()
+
+    def close(self):
+        """Az adatbázis kapcsolat lezárása"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def is_already_downloaded(self, url: str) -> bool:
         """Ellenőrzi, hogy egy URL már le van-e töltve"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT id FROM gazettes WHERE url = ?", (url,))
-        result = cursor.fetchone()
-        
-        conn.close()
+        with self.transaction() as cursor:
+            cursor.execute("SELECT id FROM gazettes WHERE url = ?", (url,))
+            result = cursor.fetchone()
+
         return result is not None
-    
-    def save_gazette(self, title: str, publication_date: str, url: str, filename: str) -> int:
-        """Új közlöny mentése az adatbázisba"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+
+    def filter_new_urls(self, urls: List[str]) -> List[str]:
+        """
+        A még le nem töltött URL-ek kiválogatása egyetlen lekérdezéssel (az eredeti sorrendben)
+        """
+        if not urls:
+            return []
+        with self.transaction() as cursor:
+            cursor.execute(
+                "SELECT value FROM json_each(?) WHERE value IN (SELECT url FROM gazettes)",
+                (json.dumps(urls),)
+            )
+            known = {row[0] for row in cursor.fetchall()}
+
+        return [url for url in urls if url not in known]
+
+    def get_feed_state(self, feed_url: str) -> Optional[Dict]:
+        """Egy feed utolsó sikeres lekérésének állapota"""
+        with self.transaction() as cursor:
+            cursor.execute("SELECT etag, last_modified, last_pub_date, since_date FROM feed_state WHERE feed_url = ?", (feed_url,))
+            row = cursor.fetchone()
+            columns = [col[0] for col in cursor.description]
+
+        return dict(zip(columns, row)) if row else None
+
+    def save_feed_state(self, feed_url: str, etag: Optional[str], last_modified: Optional[str],
+                        last_pub_date: Optional[str], since_date: Optional[str]):
+        """Egy feed lekérési állapotának mentése"""
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO feed_state (feed_url, etag, last_modified, last_pub_date, since_date, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (feed_url, etag, last_modified, last_pub_date, since_date, datetime.now().isoformat())
+            )
+
+    def get_backfill_checkpoint(self, year: int) -> int:
+        """Az adott év utolsó olyan lapszáma, ameddig (hézag nélkül) minden szám feldolgozásra került"""
+        with self.transaction() as cursor:
+            cursor.execute("SELECT last_number FROM backfill_state WHERE year = ?", (year,))
+            row = cursor.fetchone()
+
+        return row[0] if row else 0
+
+    def save_backfill_checkpoint(self, year: int, last_number: int):
+        """A visszamenőleges letöltés ellenőrzőpontjának mentése"""
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO backfill_state (year, last_number, updated) VALUES (?, ?, ?)",
+                (year, last_number, datetime.now().isoformat())
+            )
+
+    def find_gazette_by_sha256(self, sha256: str) -> Optional[Dict]:
+        """Az adott tartalmú, elsőként letöltött (nem másolat) közlöny"""
+        with self.transaction() as cursor:
+            cursor.execute(
+                "SELECT * FROM gazettes WHERE sha256 = ? AND duplicate_of IS NULL ORDER BY id LIMIT 1",
+                (sha256,)
+            )
+            row = cursor.fetchone()
+            columns = [col[0] for col in cursor.description]
+
+        return dict(zip(columns, row)) if row else None
+
+    def save_blob(self, sha256: str, path: str, size: int):
+        """Tartalom szerint tárolt PDF nyilvántartásba vétele"""
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, path, size, created) VALUES (?, ?, ?, ?)",
+                (sha256, path, size, datetime.now().isoformat())
+            )
+
+    def save_gazette(self, title: str, publication_date: str, url: str, filename: str, sha256: Optional[str] = None,
+                     duplicate_of: Optional[int] = None) -> int:
+        """
+        Új közlöny mentése az adatbázisba (a fájl tartalmának SHA-256 hash-ével).
+        Egy már meglévő közlöny másolata (duplicate_of) elemzettként kerül mentésre, így nem elemződik újra.
+        """
         now = datetime.now().isoformat()
-        
-        cursor.execute(
-            "INSERT INTO gazettes (title, publication_date, url, filename, download_date) VALUES (?, ?, ?, ?, ?)",
-            (title, publication_date, url, filename, now)
-        )
-        
-        gazette_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
+
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO gazettes (title, publication_date, url, filename, download_date, sha256, duplicate_of, analyzed, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (title, publication_date, url, filename, now, sha256, duplicate_of, 1 if duplicate_of else 0,
+                 STATUS_DONE if duplicate_of else STATUS_PENDING)
+            )
+            gazette_id = cursor.lastrowid
+
         return gazette_id
-    
+
+    def save_resolutions(self, gazette_id: int, resolutions: List[Dict], ruleset_version: Optional[str] = None,
+                         scores: Optional[Dict[int, Tuple[int, str]]] = None):
+        """
+        Egy közlöny kormányhatározatainak mentése (a korábban mentettek helyére) a közlönyön belüli
+        sorszámukkal (0-tól, a lista sorrendjében); a teljes szöveges indexet a triggerek frissítik.
+        A sorszám nélküli (régebben mentett) összefoglalók ekkor kapcsolódnak a határozatokhoz.
+
+        Args:
+            gazette_id: A közlöny azonosítója
+            resolutions: Az extract_resolutions / iter_resolutions által adott határozatok
+            ruleset_version: A pontozáshoz használt szabálykészlet verziója (None: még nincs pontozva)
+            scores: Sorszám -> (pontszám, kulcsszavak); a hiányzó határozatok pontszáma 0
+        """
+        scores = scores or {}
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM resolutions WHERE gazette_id = ?", (gazette_id,))
+            cursor.executemany(
+                "INSERT INTO resolutions (gazette_id, ordinal, number, year, resolution_date, title, content, ruleset_version, score, keyword_matches) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(gazette_id, ordinal, str(resolution['number']), int(resolution['year']),
+                  resolution['date'].isoformat() if resolution.get('date') else None,
+                  resolution['title'], resolution['content'], ruleset_version,
+                  *(scores.get(ordinal, (0, '')) if ruleset_version else (None, None)))
+                 for ordinal, resolution in enumerate(resolutions)]
+            )
+            cursor.execute(f"{_LINK_SUMMARIES} AND gazette_id = ?", (gazette_id,))
+
+    def get_gazettes_without_resolutions(self) -> List[Dict]:
+        """Elemzett közlönyök, amelyeknek a határozatai még nincsenek a teljes szöveges indexben"""
+        with self.transaction() as cursor:
+            cursor.execute(f"""
+                SELECT * FROM gazettes g
+                WHERE g.status = '{STATUS_DONE}' AND g.duplicate_of IS NULL
+                  AND NOT EXISTS (SELECT 1 FROM resolutions r WHERE r.gazette_id = g.id)
+                ORDER BY g.id""")
+            rows = cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    def search_resolutions(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Teljes szöveges keresés a kormányhatározatokban, relevancia (bm25) szerint rendezve
+
+        Args:
+            query: Keresőszavak (mindegyiknek szerepelnie kell) vagy FTS5 lekérdezés
+            limit: A találatok maximális száma
+
+        Returns:
+            Találatok: határozat címe, dátuma, közlöny, kiemelt szövegrészlet és pontszám
+        """
+        with self.transaction() as cursor:
+            cursor.execute("""
+                SELECT r.id, r.title, r.resolution_date, g.title AS gazette_title, g.publication_date, g.url,
+                       snippet(resolutions_fts, 1, '[', ']', '…', 16) AS snippet,
+                       bm25(resolutions_fts, 5.0, 1.0) AS rank
+                FROM resolutions_fts
+                JOIN resolutions r ON r.id = resolutions_fts.rowid
+                JOIN gazettes g ON g.id = r.gazette_id
+                WHERE resolutions_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?""", (_fts_query(query), limit))
+            rows = cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+
+        return [dict(zip(columns, row)) for row in rows]
+
     def get_unanalyzed_gazettes(self) -> List[Dict]:
         """Még nem elemzett közlönyök lekérése"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM gazettes WHERE analyzed = 0")
-        rows = cursor.fetchall()
-        
-        conn.close()
-        
-        return [dict(zip([col[0] for col in cursor.description], row)) for row in rows]
-    
-    def mark_as_analyzed(self, gazette_id: int, is_relevant: bool = False):
-        """Közlöny megjelölése elemzettként"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if is_relevant:
-            # Ha releváns, akkor frissítjük mindkét mezőt
+        with self.transaction() as cursor:
+            cursor.execute(f"SELECT * FROM gazettes WHERE analyzed = 0 AND status != '{STATUS_FAILED}'")
+            rows = cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    def claim_gazettes(self, owner: str, limit: int = 1, lease_seconds: Optional[int] = None,
+                       ids: Optional[List[int]] = None, max_attempts: Optional[int] = None) -> List[Dict]:
+        """
+        Elemzendő közlönyök atomi lefoglalása egy feldolgozó számára. Lefoglalható a várakozó
+        (és az újrapróbálkozás idejét elért), illetve a lejárt bérletű futó feladat.
+        Egy tranzakció végzi, így több folyamat vagy gép sem kaphatja meg ugyanazt a közlönyt.
+        A lejárt bérletű feladat (pl. a feldolgozó összeomlott) a próbálkozások elfogyása után
+        nem foglalható le újra, hanem 'failed' állapotba kerül.
+
+        Args:
+            owner: A feldolgozó egyedi azonosítója (pl. gépnév:pid)
+            limit: Legfeljebb ennyi közlöny
+            lease_seconds: A bérlet hossza, ennyi idő alatt be kell fejezni az elemzést
+            ids: Csak ezek közül a közlönyök közül (pl. a frissen letöltöttek)
+            max_attempts: A próbálkozások felső határa (alapértelmezetten MAX_ATTEMPTS)
+
+        Returns:
+            A lefoglalt közlönyök adatbázis sorai
+        """
+        max_attempts = max_attempts or self.MAX_ATTEMPTS
+        now = _utc_now()
+        expires = now + timedelta(seconds=lease_seconds or self.LEASE_SECONDS)
+        id_filter = "AND id IN (SELECT value FROM json_each(?))" if ids is not None else ""
+        params = [now.isoformat(), now.isoformat()] + ([json.dumps(ids)] if ids is not None else []) + [limit]
+        with self.transaction() as cursor:
+            cursor.execute(
+                f"""UPDATE gazettes SET status = '{STATUS_FAILED}', lease_owner = NULL, lease_expires = NULL, next_attempt = NULL,
+                    last_error = ? WHERE status = '{STATUS_RUNNING}' AND lease_expires < ? AND attempts >= ?""",
+                (f"A bérlet {max_attempts} próbálkozás után is lejárt", now.isoformat(), max_attempts)
+            )
+            cursor.execute(f"""
+                UPDATE gazettes
+                SET status = '{STATUS_RUNNING}', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM gazettes
+                    WHERE ((status = '{STATUS_PENDING}' AND (next_attempt IS NULL OR next_attempt <= ?))
+                        OR (status = '{STATUS_RUNNING}' AND lease_expires < ?))
+                    {id_filter}
+                    ORDER BY id LIMIT ?
+                )
+                RETURNING *""", [owner, expires.isoformat()] + params)
+            rows = cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+
+        return sorted((dict(zip(columns, row)) for row in rows), key=lambda gazette: gazette['id'])
+
+    def renew_lease(self, gazette_id: int, owner: str, lease_seconds: Optional[int] = None) -> bool:
+        """Egy futó feladat bérletének meghosszabbítása; False, ha a bérlet már nem ezé a feldolgozóé"""
+        expires = _utc_now() + timedelta(seconds=lease_seconds or self.LEASE_SECONDS)
+        with self.transaction() as cursor:
+            cursor.execute(
+                f"UPDATE gazettes SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = '{STATUS_RUNNING}'",
+                (expires.isoformat(), gazette_id, owner)
+            )
+            return cursor.rowcount > 0
+
+    def release_gazettes(self, owner: str) -> int:
+        """
+        A feldolgozó összes futó feladatának visszaadása (pl. leállításkor), a próbálkozás nem számít bele
+
+        Returns:
+            A visszaadott feladatok száma
+        """
+        with self.transaction() as cursor:
             cursor.execute(
-                "UPDATE gazettes SET analyzed = 1, relevant = 1 WHERE id = ?",
-                (gazette_id,)
+                f"""UPDATE gazettes SET status = '{STATUS_PENDING}', lease_owner = NULL, lease_expires = NULL,
+                    attempts = MAX(attempts - 1, 0) WHERE lease_owner = ? AND status = '{STATUS_RUNNING}'""",
+                (owner,)
             )
-        else:
-            # Ha nem releváns, csak az analyzed mezőt frissítjük, a relevant-et nem érintjük
+            return cursor.rowcount
+
+    def mark_as_analyzed(self, gazette_id: int, is_relevant: bool = False, owner: Optional[str] = None) -> bool:
+        """
+        Közlöny megjelölése elemzettként (a feladat befejezése, a bérlet feloldása).
+        Ha owner meg van adva, csak az érvényes bérlet birtokosa jelölheti meg.
+
+        Returns:
+            False, ha a bérletet időközben más feldolgozó vette át
+        """
+        owner_filter = " AND lease_owner = ?" if owner is not None else ""
+        params = (gazette_id, owner) if owner is not None else (gazette_id,)
+        with self.transaction() as cursor:
+            # Ha releváns, a relevant mezőt is beállítjuk; egyébként a korábbi értékét nem érintjük
             cursor.execute(
-                "UPDATE gazettes SET analyzed = 1 WHERE id = ? AND relevant = 0",
-                (gazette_id,)
+                f"""UPDATE gazettes SET analyzed = 1, relevant = MAX(relevant, {1 if is_relevant else 0}),
+                    status = '{STATUS_DONE}', lease_owner = NULL, lease_expires = NULL, next_attempt = NULL
+                    WHERE id = ?{owner_filter}""",
+                params
             )
-        
-        conn.commit()
-        conn.close()
-    
+            return cursor.rowcount > 0
+
+    def fail_gazette(self, gazette_id: int, error: str, owner: Optional[str] = None,
+                     max_attempts: Optional[int] = None) -> Optional[str]:
+        """
+        Sikertelen elemzés rögzítése. A feladat exponenciálisan növekvő várakozás után újra
+        lefoglalható; a próbálkozások elfogyása után 'failed' állapotba kerül (elemzettnek nem számít).
+
+        Returns:
+            Az új állapot ('pending' vagy 'failed'), None ha a bérlet már nem ezé a feldolgozóé
+        """
+        max_attempts = max_attempts or self.MAX_ATTEMPTS
+        owner_filter = " AND lease_owner = ?" if owner is not None else ""
+        with self.transaction(immediate=True) as cursor:
+            cursor.execute(f"SELECT attempts FROM gazettes WHERE id = ?{owner_filter}",
+                           (gazette_id, owner) if owner is not None else (gazette_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            attempts = row[0]
+            if attempts >= max_attempts:
+                status, next_attempt = STATUS_FAILED, None
+            else:
+                status = STATUS_PENDING
+                delay = self.RETRY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+                next_attempt = (_utc_now() + timedelta(seconds=delay)).isoformat()
+            cursor.execute(
+                "UPDATE gazettes SET status = ?, next_attempt = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+                (status, next_attempt, error, gazette_id)
+            )
+        return status
+
     def save_summary(self, gazette_id: int, gdecision_title: str, relevant_score: int, keyword_matches: str, summary: str):
         """Összefoglaló mentése"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "INSERT INTO summary (gazette_id, gdecision_title, relevant_score, keyword_matches, summary) VALUES (?, ?, ?, ?, ?)",
-            (gazette_id, gdecision_title, relevant_score, keyword_matches, summary)
-        )
-        
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        self.save_summaries(gazette_id, [(gdecision_title, relevant_score, keyword_matches, summary)])
+
+    def save_summaries(self, gazette_id: int, summaries: List[Tuple[str, int, str, str]],
+                       ruleset_version: Optional[str] = None, ordinals: Optional[List[int]] = None):
+        """
+        Több összefoglaló mentése egy utasítással és egy commit-tal
+
+        Args:
+            gazette_id: A közlöny azonosítója
+            summaries: (gdecision_title, relevant_score, keyword_matches, summary) elemek listája
+            ruleset_version: A pontozáshoz használt szabálykészlet verziója
+            ordinals: Az összefoglalók határozatainak sorszáma a közlönyben (lásd save_resolutions)
+        """
+        ordinals = ordinals if ordinals is not None else [None] * len(summaries)
+        with self.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO summary (gazette_id, gdecision_title, relevant_score, keyword_matches, summary, ruleset_version, resolution_ordinal) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(gazette_id, *summary, ruleset_version, ordinal) for summary, ordinal in zip(summaries, ordinals)]
+            )
+
+    def get_unsent_summaries(self) -> List[Dict]:
+        """
+        Az összes még el nem küldött releváns közlöny összefoglalói egyetlen lekérdezéssel,
+        közlönyönként a letöltés sorrendjében (a publication_date RFC 2822 szövegként nem rendezhető),
+        azon belül pontszám szerint csökkenő sorrendben.
+        A CROSS JOIN rögzíti a sorrendet: a közlönyök a részleges indexből jönnek, így a már
+        elküldött vagy nem releváns közlönyök összefoglalói nem kerülnek beolvasásra.
+        """
+        with self.transaction() as cursor:
+            cursor.execute("""
+                SELECT g.id AS gazette_id, g.title AS gazette_title, g.publication_date, g.url,
+                       s.gdecision_title, s.relevant_score, s.keyword_matches, s.summary
+                FROM gazettes g
+                CROSS JOIN summary s ON s.gazette_id = g.id
+                WHERE g.relevant = 1 AND g.sent_email = 0
+                ORDER BY g.id, s.relevant_score DESC, s.id""")
+            rows = cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    def mark_as_sent(self, gazette_ids: List[int]) -> int:
+        """
+        A közlönyök megjelölése elküldöttként, egy tranzakcióban
+
+        Returns:
+            A megjelölt közlönyök száma
+        """
+        if not gazette_ids:
+            return 0
+        with self.transaction() as cursor:
+            cursor.execute(
+                "UPDATE gazettes SET sent_email = 1 WHERE sent_email = 0 AND id IN (SELECT value FROM json_each(?))",
+                (json.dumps(gazette_ids),)
+            )
+            return cursor.rowcount
+
+    def save_ruleset(self, version: str, name: Optional[str], definition: str):
+        """Egy szabálykészlet nyilvántartásba vétele (ha ez a verzió még nem szerepel)"""
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT OR IGNORE INTO rulesets (version, name, definition, created) VALUES (?, ?, ?, ?)",
+                (version, name, definition, datetime.now().isoformat())
+            )
+
+    def get_resolutions_to_rescore(self, ruleset_version: str, after_id: int = 0, limit: int = 500) -> List[Dict]:
+        """
+        A nem az adott szabálykészlettel pontozott határozatok (azonosító szerint lapozva), a jelenlegi
+        összefoglalójuk pontszámával és kulcsszavaival együtt (összefoglaló nélkül 0 és '')
+        """
+        with self.transaction() as cursor:
+            cursor.execute("""
+                SELECT r.id, r.gazette_id, r.ordinal, r.title, r.content,
+                       COALESCE(s.relevant_score, 0) AS relevant_score, COALESCE(s.keyword_matches, '') AS keyword_matches,
+                       s.id AS summary_id
+                FROM resolutions r
+                LEFT JOIN summary s ON s.gazette_id = r.gazette_id AND s.resolution_ordinal = r.ordinal
+                WHERE r.id > ? AND (r.ruleset_version IS NULL OR r.ruleset_version != ?)
+                ORDER BY r.id
+                LIMIT ?""", (after_id, ruleset_version, limit))
+            rows = cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    def apply_rescoring(self, ruleset_version: str, scores: List[Tuple[int, int, str]],
+                        updated: List[Tuple[int, int, str]], removed: List[int],
+                        added: List[Tuple[int, str, int, int, str, str]]):
+        """
+        Újrapontozás eredményének mentése egy tranzakcióban, majd az érintett közlönyök relevancia jelzésének frissítése
+
+        Args:
+            ruleset_version: Az új szabálykészlet verziója
+            scores: (resolution_id, score, keyword_matches) - minden újrapontozott határozat
+            updated: (summary_id, score, keyword_matches) - a meglévő összefoglalók új pontszáma
+            removed: A már nem releváns határozatok összefoglalóinak azonosítói
+            added: (gazette_id, gdecision_title, ordinal, score, keyword_matches, summary) - az új összefoglalók
+        """
+        with self.transaction() as cursor:
+            cursor.executemany(
+                "UPDATE resolutions SET ruleset_version = ?, score = ?, keyword_matches = ? WHERE id = ?",
+                [(ruleset_version, score, keyword_matches, resolution_id) for resolution_id, score, keyword_matches in scores]
+            )
+            cursor.executemany(
+                "UPDATE summary SET relevant_score = ?, keyword_matches = ?, ruleset_version = ? WHERE id = ?",
+                [(score, keyword_matches, ruleset_version, summary_id) for summary_id, score, keyword_matches in updated]
+            )
+            cursor.executemany("DELETE FROM summary WHERE id = ?", [(summary_id,) for summary_id in removed])
+            cursor.executemany(
+                "INSERT INTO summary (gazette_id, gdecision_title, resolution_ordinal, relevant_score, keyword_matches, summary, ruleset_version) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*summary, ruleset_version) for summary in added]
+            )
+            # Csak a változott határozatok közlönyeinek relevanciája változhat
+            cursor.execute("""
+                UPDATE gazettes SET relevant = EXISTS (SELECT 1 FROM summary s WHERE s.gazette_id = gazettes.id)
+                WHERE id IN (SELECT r.gazette_id FROM resolutions r WHERE r.id IN (SELECT value FROM json_each(?)))""",
+                (json.dumps([resolution_id for resolution_id, _, _ in scores]),)
+            )
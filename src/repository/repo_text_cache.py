@@ -0,0 +1,96 @@
+import sqlite3
+import zlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class TextCacheRepository:
+    """PDF-ből kinyert szövegek gyorsítótára (tartalom hash + kinyerő verzió szerint)"""
+
+    DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+    def __init__(self, db_path: Path, max_bytes: Optional[int] = None):
+        self.db_path = db_path
+        self.max_bytes = max_bytes if max_bytes else self.DEFAULT_MAX_BYTES
+        self._init_database()
+
+    def _init_database(self):
+        """Adatbázis inicializálása, ha még nem létezik"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.executescript('''
+        CREATE TABLE IF NOT EXISTS text_cache (
+            content_hash TEXT NOT NULL,
+            extractor_version TEXT NOT NULL,
+            text BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created TEXT NOT NULL,
+            last_access TEXT NOT NULL,
+            PRIMARY KEY (content_hash, extractor_version)
+        );
+        CREATE INDEX IF NOT EXISTS idx_text_cache_last_access ON text_cache(last_access);
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def get(self, content_hash: str, extractor_version: str) -> Optional[str]:
+        """Gyorsítótárazott szöveg lekérése, None ha nincs találat"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT text FROM text_cache WHERE content_hash = ? AND extractor_version = ?",
+            (content_hash, extractor_version)
+        )
+        row = cursor.fetchone()
+        if row is not None:
+            cursor.execute(
+                "UPDATE text_cache SET last_access = ? WHERE content_hash = ? AND extractor_version = ?",
+                (datetime.now().isoformat(), content_hash, extractor_version)
+            )
+            conn.commit()
+
+        conn.close()
+        return zlib.decompress(row[0]).decode('utf-8') if row is not None else None
+
+    def put(self, content_hash: str, extractor_version: str, text: str):
+        """Szöveg mentése tömörítve, szükség esetén a legrégebben használt elemek törlésével"""
+        data = zlib.compress(text.encode('utf-8'))
+        now = datetime.now().isoformat()
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "INSERT OR REPLACE INTO text_cache (content_hash, extractor_version, text, size, created, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+            (content_hash, extractor_version, data, len(data), now, now)
+        )
+        self._evict(cursor)
+
+        conn.commit()
+        conn.close()
+
+    def _evict(self, cursor: sqlite3.Cursor):
+        """A méretkorlát feletti rész törlése, a legrégebben használt elemektől kezdve"""
+        cursor.execute("SELECT COALESCE(SUM(size), 0) FROM text_cache")
+        total = cursor.fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        cursor.execute("SELECT content_hash, extractor_version, size FROM text_cache ORDER BY last_access")
+        evicted = []
+        for content_hash, extractor_version, size in cursor.fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append((content_hash, extractor_version))
+            total -= size
+        cursor.executemany(
+            "DELETE FROM text_cache WHERE content_hash = ? AND extractor_version = ?",
+            evicted
+        )
+        logger.debug(f"Szöveg gyorsítótár: {len(evicted)} elem törölve a méretkorlát miatt")
@@ -0,0 +1,213 @@
+import threading
+import time
+import pytest
+import socketserver
+from email import message_from_bytes, policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class GazetteServer:
+    """
+    Helyi HTTP szerver a Magyar Közlöny oldal helyettesítésére a letöltési tesztekhez.
+    A `files` szótár útvonal -> tartalom párokat tartalmaz, a `delay` minden válasz előtt késleltet.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.content_types = {}
+        self.etags = {}
+        self.truncate = {}
+        self.support_range = True
+        # Hibás szerver: Range kérésre a fájl elejétől küld 206-tal
+        self.ignore_range_start = False
+        self.delay = 0.0
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def add(self, path, content, content_type="application/pdf", etag=None):
+        self.files[path] = content
+        self.content_types[path] = content_type
+        if etag:
+            self.etags[path] = etag
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append((self.path, dict(self.headers)))
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    if server.delay:
+                        time.sleep(server.delay)
+                    content = server.files.get(self.path)
+                    if content is None:
+                        self.send_response(404)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    etag = server.etags.get(self.path)
+                    if etag and self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.end_headers()
+                        return
+                    # Range kérés (csak "bytes=N-" alakban); If-Range eltérésnél a teljes tartalom megy
+                    start = 0
+                    range_header = self.headers.get("Range")
+                    if_range = self.headers.get("If-Range")
+                    if range_header and server.support_range and (if_range is None or if_range == etag):
+                        start = int(range_header.split("=")[1].rstrip("-"))
+                        if start >= len(content):
+                            self.send_response(416)
+                            self.send_header("Content-Range", f"bytes */{len(content)}")
+                            self.send_header("Content-Length", "0")
+                            self.end_headers()
+                            return
+                        if server.ignore_range_start:
+                            start = 0
+                        self.send_response(206)
+                        self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+                    else:
+                        self.send_response(200)
+                    if etag:
+                        self.send_header("ETag", etag)
+                    self.send_header("Content-Type", server.content_types[self.path])
+                    self.send_header("Content-Length", str(len(content) - start))
+                    self.end_headers()
+                    # Egyszeri megszakítás: csak az első N bájt kerül elküldésre
+                    limit = server.truncate.pop(self.path, None)
+                    if limit is not None:
+                        self.wfile.write(content[start:start + limit])
+                        self.wfile.flush()
+                        self.close_connection = True
+                        return
+                    self.wfile.write(content[start:])
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+@pytest.fixture
+def gazette_server():
+    server = GazetteServer()
+    server.start()
+    yield server
+    server.stop()
+
+class DebugSmtpServer:
+    """
+    Helyi SMTP szerver az email tesztekhez: a fogadott üzeneteket a `messages` listába gyűjti
+    (feladó, címzettek, üzenet), a `connections` a megnyitott kapcsolatok száma.
+    A `refuse` halmazban szereplő címzetteket 550-es hibával elutasítja.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self.refuse = set()
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def _handler(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+            def handle(self):
+                with server._lock:
+                    server.connections += 1
+                self.reply("220 localhost debug SMTP")
+                sender, recipients = None, []
+                for raw in self.rfile:
+                    command = raw.decode("utf-8", "replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self.reply("250 localhost")
+                    elif verb == "MAIL":
+                        sender, recipients = command.split(":", 1)[1].strip().strip("<>"), []
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        recipient = command.split(":", 1)[1].strip().strip("<>")
+                        if recipient in server.refuse:
+                            self.reply("550 No such user")
+                        else:
+                            recipients.append(recipient)
+                            self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        lines = []
+                        for data in self.rfile:
+                            if data == b".\r\n":
+                                break
+                            lines.append(data[1:] if data.startswith(b"..") else data)
+                        message = message_from_bytes(b"".join(lines), policy=policy.default)
+                        with server._lock:
+                            server.messages.append((sender, recipients, message))
+                        self.reply("250 OK")
+                    elif verb in ("RSET", "NOOP"):
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+@pytest.fixture
+def smtp_server():
+    server = DebugSmtpServer()
+    server.start()
+    yield server
+    server.stop()
+
+def rss_feed(items):
+    """RSS feed összeállítása (cím, link, pubDate) hármasokból"""
+    body = "".join(
+        f"<item><title>{title}</title><link>{link}</link><pubDate>{pub_date}</pubDate></item>"
+        for title, link, pub_date in items
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>{body}</channel></rss>'.encode("utf-8")
@@ -87,4 +87,29 @@ def test_empty_resolutions():
     results = analyze_resolutions([])
     
     assert results['total_resolutions'] == 0, "Üres listát adtunk meg"
-    assert len(results['relevant_resolutions']) == 0, "Üres lista esetén nem lehet releváns határozat"
\ No newline at end of file
+    assert len(results['relevant_resolutions']) == 0, "Üres lista esetén nem lehet releváns határozat"
+
+def test_analyze_resolutions_matches_analyze_gdecision():
+    # A kötegelt elemzés határozatonként ugyanazt adja, mint az egyenkénti
+    from gdmonitor.resulation_analyzer import analyze_gdecision
+    test_resolutions = [
+        {
+            'number': str(1000 + i),
+            'year': '2024',
+            'month': 5,
+            'day': 15,
+            'date': datetime.date(2024, 5, 15),
+            'title': f'A Kormány {1000 + i}/2024. (V. 15.) Korm. határozata',
+            'content': f'Az {i}. pont szerint a helyi önkormányzat kap támogatást. Második mondat. Harmadik mondat. Negyedik mondat.'
+        }
+        for i in range(5)
+    ]
+
+    results = analyze_resolutions(test_resolutions, batch_size=2)
+
+    assert len(results['relevant_resolutions']) == 5
+    for result in results['relevant_resolutions']:
+        single = analyze_gdecision(result['resolution'])
+        assert result['relevance_score'] == single['relevance_score']
+        assert result['keyword_matches'] == single['keyword_matches']
+        assert result['summary'] == single['summary']
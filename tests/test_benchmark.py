@@ -0,0 +1,57 @@
+import copy
+import json
+import pytest
+from pathlib import Path
+from benchmark import compare_backends, compare_to_baseline, load_results, run_benchmarks, save_results
+from benchmark.suite import STAGES, synthetic_gazette
+from gdmonitor import extract_resolutions
+
+SAMPLES = Path(__file__).resolve().parent.parent / "samples"
+
+def test_run_benchmarks(tmp_path):
+    '''
+    test_run_benchmarks(): Minden szakasz mérése elkészül és JSON-ként menthető; a szintetikus
+    közlöny a minták határozatait scale-szer, egyedi számokkal tartalmazza.
+
+    test_compare_backends(): A backendek ugyanannyi oldalt dolgoznak fel, a sebességük és a gyorsulás
+    az első backendhez képest az eredményben szerepel (a gyorsulás mértékét a mérés nem ellenőrzi).
+
+    test_compare_to_baseline(): A küszöbnél nagyobb lassulás regresszió, a kisebb vagy a gyorsulás nem;
+    más beállításokkal készült alapértékkel nem hasonlít.
+    '''
+    results = run_benchmarks(samples=[SAMPLES / "MK_25_022.pdf"], backend="pdfium", scale=3)
+    assert list(results['stages']) == STAGES
+    assert results['samples']['MK_25_022']['resolutions'] == 2
+    assert results['samples']['synthetic']['resolutions'] == 6
+    assert results['stages']['text_extraction']['unit'] == 'pages'
+    assert results['stages']['repository_writes']['count'] == 8
+    assert all(stage['per_second'] > 0 and stage['peak_rss_mb'] > 0 for stage in results['stages'].values())
+
+    save_results(results, tmp_path / "results.json")
+    assert load_results(tmp_path / "results.json") == json.loads(json.dumps(results))
+
+    resolutions = extract_resolutions(synthetic_gazette(["A Kormány 1036/2025. (III. 3.) Korm. határozata szöveg"], 2))
+    assert [resolution['number'] for resolution in resolutions] == ['1036', '101036']
+
+def test_compare_backends():
+    results = compare_backends(samples=[SAMPLES / "MK_25_020.pdf"], decisions_only=True)
+    assert list(results) == ["pdfplumber", "pdfium"]
+    assert results["pdfplumber"]['count'] == results["pdfium"]['count'] > 0
+    assert results["pdfplumber"]['speedup'] == 1.0
+    assert all(measured['per_second'] > 0 for measured in results.values())
+
+def test_compare_to_baseline():
+    baseline = {'format': 1, 'config': {'backend': 'pdfium'},
+                'stages': {stage: {'per_second': 100.0} for stage in STAGES}}
+    results = copy.deepcopy(baseline)
+    results['stages']['text_extraction']['per_second'] = 70.0
+    results['stages']['keyword_scoring']['per_second'] = 85.0
+    results['stages']['summarization']['per_second'] = 150.0
+
+    comparison = {row['stage']: row for row in compare_to_baseline(results, baseline, threshold=0.2)}
+    assert [stage for stage, row in comparison.items() if row['regression']] == ['text_extraction']
+    assert comparison['summarization']['change'] == 0.5
+
+    results['config'] = {'backend': 'pdfplumber'}
+    with pytest.raises(ValueError):
+        compare_to_baseline(results, baseline)
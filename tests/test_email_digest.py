@@ -0,0 +1,68 @@
+from notifier import EmailDigest
+from repository import GazetteRepository
+
+# A feed pubDate formátuma: szövegként a hét napja szerint rendeződne
+DATES = {1: "Mon, 02 Jun 2025 22:33:44 +0200", 2: "Wed, 04 Jun 2025 22:33:44 +0200",
+         3: "Fri, 06 Jun 2025 22:33:44 +0200", 4: "Tue, 10 Jun 2025 22:33:44 +0200"}
+
+def _relevant_gazette(repository, number, summaries):
+    gazette_id = repository.save_gazette(f"Magyar Közlöny 2025. évi {number}. szám", DATES[number],
+                                         f"https://example.org/{number}", f"mk{number}.pdf")
+    with repository.transaction():
+        repository.save_summaries(gazette_id, summaries)
+        repository.mark_as_analyzed(gazette_id, is_relevant=bool(summaries))
+    return gazette_id
+
+def _digest(repository, server, recipients):
+    return EmailDigest(repository, "127.0.0.1", "gdmonitor@example.org", recipients, port=server.port)
+
+def test_email_digest_single_message_per_recipient(smtp_server, tmp_path):
+    '''
+    test_email_digest_single_message_per_recipient(): Az összes el nem küldött releváns összefoglaló
+    címzettenként egyetlen üzenetbe kerül, minden üzenet egy SMTP kapcsolaton megy ki, a közlönyök
+    elküldöttként kerülnek megjelölésre, és a következő futás semmit nem küld újra.
+
+    test_email_digest_refused_recipient(): Egy elutasított címzett mellett a többiek megkapják az
+    összesítőt és a közlönyök megjelölésre kerülnek; ha senki nem kapja meg, a jelzés nem változik.
+    '''
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    _relevant_gazette(repository, 1, [("1001/2025. Korm. határozat", 3, "önkormányzat, Budapest", "Első összefoglaló"),
+                                      ("1002/2025. Korm. határozat", 5, "önkormányzat", "Második összefoglaló")])
+    _relevant_gazette(repository, 2, [])
+    _relevant_gazette(repository, 3, [("1003/2025. Korm. határozat", 2, "település", "Harmadik összefoglaló")])
+
+    assert _digest(repository, smtp_server, ["a@example.org", "b@example.org"]).send() == 2
+
+    assert smtp_server.connections == 1
+    assert [recipients for _, recipients, _ in smtp_server.messages] == [["a@example.org"], ["b@example.org"]]
+    message = smtp_server.messages[0][2]
+    assert message["To"] == "a@example.org"
+    assert message["Subject"] == "Magyar Közlöny: 3 releváns kormányhatározat (2 közlöny)"
+    body = message.get_content()
+    # Közlönyönként, azon belül pontszám szerint csökkenő sorrendben
+    assert body.index("1002/2025.") < body.index("1001/2025.") < body.index("1003/2025.")
+    assert "Magyar Közlöny 2025. évi 2. szám" not in body
+    assert repository.get_unsent_summaries() == []
+
+    assert _digest(repository, smtp_server, ["a@example.org"]).send() == 0
+    assert len(smtp_server.messages) == 2 and smtp_server.connections == 1
+
+    # Új releváns közlöny: csak az kerül a következő összesítőbe
+    _relevant_gazette(repository, 4, [("1004/2025. Korm. határozat", 4, "önkormányzat", "Negyedik összefoglaló")])
+    assert _digest(repository, smtp_server, ["a@example.org"]).send() == 1
+    body = smtp_server.messages[-1][2].get_content()
+    assert "1004/2025." in body and "1001/2025." not in body
+    repository.close()
+
+def test_email_digest_refused_recipient(smtp_server, tmp_path):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    _relevant_gazette(repository, 1, [("1001/2025. Korm. határozat", 3, "önkormányzat", "Összefoglaló")])
+    smtp_server.refuse = {"a@example.org", "b@example.org"}
+
+    assert _digest(repository, smtp_server, ["a@example.org"]).send() == 0
+    assert len(repository.get_unsent_summaries()) == 1
+
+    assert _digest(repository, smtp_server, ["a@example.org", "b@example.org", "c@example.org"]).send() == 1
+    assert [recipients for _, recipients, _ in smtp_server.messages] == [["c@example.org"]]
+    assert repository.get_unsent_summaries() == []
+    repository.close()
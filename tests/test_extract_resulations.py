@@ -1,5 +1,11 @@
+import re
 import datetime
-from gdmonitor.resulation_extractor import extract_resolutions
+import pytest
+from pathlib import Path
+from gdmonitor import extract_text_from_pdf
+from gdmonitor.resulation_extractor import _build_resolution, extract_resolutions, iter_resolutions
+
+SAMPLES = Path(__file__).resolve().parent.parent / "samples"
 
 def test_extract_resolutions():
     ''' 
@@ -58,4 +64,63 @@ def test_no_resolutions():
     # Olyan szöveg, amiben nincs határozat
     text_without_resolutions = "Ez a szöveg nem tartalmaz kormányhatározatot."
     results = extract_resolutions(text_without_resolutions)
-    assert len(results) == 0, "Nem határozatot tartalmazó szöveg esetén nem szabad találatokat visszaadni"
\ No newline at end of file
+    assert len(results) == 0, "Nem határozatot tartalmazó szöveg esetén nem szabad találatokat visszaadni"
+
+def test_iter_resolutions_matches_extract_resolutions():
+    # A darabokra bontott szöveg inkrementális feldolgozása ugyanazt adja, mint az egyben feldolgozás
+    text = (
+        "Bevezető szöveg. A Kormány 1234/2024. (V. 15.) Korm. határozata a teszt kormányhatározat tartalmáról "
+        "1. A Kormány támogatja a tesztprojekt megvalósítását. "
+        "A Kormány 5678/2024. (VI. 20.) Korm. határozata egy másik teszt határozatról "
+        "1. A Kormány további intézkedésekről dönt."
+    )
+    expected = extract_resolutions(text)
+    for size in (1, 7, 40, len(text)):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert list(iter_resolutions(chunks)) == expected
+
+def test_iter_resolutions_is_incremental():
+    # Az első határozat már a második címsor beolvasásakor megjelenik, a folyam vége előtt
+    def chunks():
+        yield "A Kormány 1234/2024. (V. 15.) Korm. határozata az első határozatról "
+        yield "A Kormány 5678/2024. (VI. 20.) Korm. határozata a második határozatról "
+        raise AssertionError("A folyam végét nem kellett volna elérni")
+
+    first = next(iter_resolutions(chunks()))
+    assert first['number'] == '1234'
+    assert first['content'] == 'az első határozatról'
+
+# A korábbi, egyetlen lusta DOTALL mintával dolgozó megvalósítás (összehasonlításhoz)
+_LEGACY_PATTERN = r"A\s+Kormány\s+(\d+)[\/\s]+(\d{4})[\.|\s]+[\(]+((?:I|V|X|L|C|D|M)+)[\.|\s]+(\d+)[\.|\s]+[\)]+\s+Korm[\.|\s]+határozata(.*?)(?=A\s+Kormány\s+\d+[\/\s]+\d{4}|$)"
+
+def _legacy_extract(text):
+    return [_build_resolution(*match.groups()) for match in re.finditer(_LEGACY_PATTERN, text, re.DOTALL | re.IGNORECASE)]
+
+def test_extract_resolutions_matches_legacy_pattern():
+    '''
+    A címsorokat egy menetben kereső feldolgozás ugyanazt adja, mint a korábbi lusta DOTALL minta (a mintákon is):
+    a tartalom a következő "A Kormány <szám>/<év>" kezdetnél akkor is véget ér, ha az nem teljes címsor,
+    és a sorokra tördelt címsort is felismeri.
+    '''
+    text = (
+        "Bevezető. A Kormány 1234/2024. (V. 15.) Korm. határozata az első határozatról, "
+        "hivatkozva A Kormány 99/2023 döntésére, amely után a szöveg folytatódik. "
+        "A  KORMÁNY\n5678 / 2024 .\n((VI . 20 . ))\nKorm . határozata a második, tördelt címsorú határozatról\n"
+        "A Kormány 1/2024. (XIII. 1.) Korm. határozata érvénytelen hónappal "
+        "A Kormány 42/2024. (I. 2.) Korm. határozata"
+    )
+    expected = _legacy_extract(text)
+    assert len(expected) == 4
+    results = extract_resolutions(text)
+    assert results == [resolution for resolution in expected if resolution]
+    assert [resolution['number'] for resolution in results] == ['1234', '5678', '42']
+    assert results[0]['content'] == "az első határozatról, hivatkozva"
+
+
+@pytest.mark.parametrize("sample", sorted(SAMPLES.glob("MK_*.pdf")), ids=lambda sample: sample.stem)
+def test_extract_resolutions_matches_legacy_pattern_on_samples(sample):
+    # Minden mintán ugyanazok a határozatok, ugyanazzal a tartalommal
+    sample_text = extract_text_from_pdf(str(sample))
+    expected = [resolution for resolution in _legacy_extract(sample_text) if resolution]
+    assert expected
+    assert extract_resolutions(sample_text) == expected
@@ -0,0 +1,239 @@
+import time
+from conftest import rss_feed
+from fetcher import GazetteFetcher
+
+def _publish_gazettes(server, count):
+    items = []
+    for i in range(1, count + 1):
+        server.add(f"/dokumentumok/{i}/letoltes", b"%PDF-1.4\n" + bytes(i) * 2048)
+        items.append((f"Magyar Közlöny 2025. évi {i}. szám", server.url(f"/dokumentumok/{i}/letoltes"),
+                      "Mon, 02 Jun 2025 22:33:44 +0200"))
+    server.add("/feed", rss_feed(items), content_type="application/rss+xml")
+
+def _fetcher(server, base_dir, **kwargs):
+    return GazetteFetcher(feed_url=server.url("/feed"), db_file="gazettes.db", download_path="downloads",
+                          base_dir=str(base_dir), **kwargs)
+
+def test_concurrent_download(gazette_server, tmp_path):
+    '''
+    test_concurrent_download(): Párhuzamos módban minden közlöny letöltődik, a fájlok tartalma hibátlan,
+    az adatbázisba mind bekerül, és a szerver felé nyitott kérések száma nem lépi túl a korlátot.
+
+    test_concurrent_download_overlaps(): Késleltetett szerver esetén a soros letöltés egyszerre egy,
+    a párhuzamos több (de legfeljebb max_concurrent_downloads) kérést tart nyitva.
+    '''
+    _publish_gazettes(gazette_server, 30)
+    gazette_server.delay = 0.02
+    fetcher = _fetcher(gazette_server, tmp_path, max_concurrent_downloads=8, per_host_limit=3)
+
+    downloaded = fetcher.fetch_new_gazettes()
+
+    assert len(downloaded) == 30
+    for i, path in enumerate(downloaded, start=1):
+        with open(path, "rb") as f:
+            assert f.read() == gazette_server.files[f"/dokumentumok/{i}/letoltes"]
+    assert fetcher.repository.filter_new_urls([gazette_server.url(f"/dokumentumok/{i}/letoltes") for i in range(1, 31)]) == []
+    # A feed lekérésén felül legfeljebb per_host_limit egyidejű letöltés
+    assert gazette_server.max_active <= 3
+
+    # Második futásnál nincs mit letölteni
+    assert fetcher.fetch_new_gazettes() == []
+
+def test_concurrent_download_overlaps(gazette_server, tmp_path):
+    _publish_gazettes(gazette_server, 30)
+    gazette_server.delay = 0.04
+
+    serial = _fetcher(gazette_server, tmp_path / "serial").fetch_new_gazettes()
+    assert gazette_server.max_active == 1
+
+    gazette_server.max_active = 0
+    concurrent = _fetcher(gazette_server, tmp_path / "concurrent", max_concurrent_downloads=8, per_host_limit=8).fetch_new_gazettes()
+    assert len(serial) == len(concurrent) == 30
+    assert 1 < gazette_server.max_active <= 8
+
+def test_conditional_feed_request(gazette_server, tmp_path):
+    '''
+    Változatlan feed esetén a szerver 304-et ad és semmi nem kerül feldolgozásra;
+    változáskor csak az új bejegyzések kerülnek a listába.
+    '''
+    gazette_server.add("/dokumentumok/1/letoltes", b"%PDF-1.4 1")
+    gazette_server.add("/dokumentumok/2/letoltes", b"%PDF-1.4 2")
+    old_item = ("Magyar Közlöny 2025. évi 1. szám", gazette_server.url("/dokumentumok/1/letoltes"), "Mon, 02 Jun 2025 22:33:44 +0200")
+    new_item = ("Magyar Közlöny 2025. évi 2. szám", gazette_server.url("/dokumentumok/2/letoltes"), "Tue, 03 Jun 2025 22:33:44 +0200")
+    gazette_server.add("/feed", rss_feed([old_item]), content_type="application/rss+xml", etag='"v1"')
+    fetcher = _fetcher(gazette_server, tmp_path)
+
+    assert len(fetcher.fetch_new_gazettes()) == 1
+
+    # Változatlan feed: feltételes kérés, 304
+    assert fetcher.fetch_feed() == []
+    path, headers = gazette_server.requests[-1]
+    assert path == "/feed" and headers.get("If-None-Match") == '"v1"'
+
+    # Új bejegyzés a feed elején: csak az kerül feldolgozásra
+    gazette_server.add("/feed", rss_feed([new_item, old_item]), content_type="application/rss+xml", etag='"v2"')
+    entries = fetcher.fetch_feed()
+    assert [entry['title'] for entry in entries] == ["Magyar Közlöny 2025. évi 2. szám"]
+
+def test_resume_interrupted_download(gazette_server, tmp_path):
+    '''
+    test_resume_interrupted_download(): Megszakadt letöltés után nem marad félkész PDF a végleges helyén,
+    a következő futás Range és If-Range kéréssel folytatja, és a tartalom SHA-256 hash-e az adatbázisba kerül.
+
+    test_resume_restarts_on_mismatch(): Ha a fájl azóta megváltozott (más ETag), vagy a szerver nem a kért
+    bájttól folytatja, a letöltés elölről indul, és a mentett tartalom a jelenlegi fájllal egyezik.
+    '''
+    import hashlib
+    content = b"%PDF-1.4\n" + bytes(range(256)) * 800
+    _publish_gazettes(gazette_server, 0)
+    gazette_server.add("/dokumentumok/1/letoltes", content, etag='"v1"')
+    gazette_server.add("/feed", rss_feed([("Magyar Közlöny 2025. évi 1. szám", gazette_server.url("/dokumentumok/1/letoltes"),
+                                           "Mon, 02 Jun 2025 22:33:44 +0200")]), content_type="application/rss+xml")
+    gazette_server.truncate["/dokumentumok/1/letoltes"] = 150000
+    fetcher = _fetcher(gazette_server, tmp_path)
+
+    assert fetcher.fetch_new_gazettes() == []
+    assert list(fetcher.download_path.glob("*.pdf")) == []
+    parts = list(fetcher.download_path.glob(".*.part"))
+    assert len(parts) == 1
+    part_size = parts[0].stat().st_size
+    assert 0 < part_size < len(content)
+
+    downloaded = fetcher.fetch_new_gazettes()
+    assert len(downloaded) == 1
+    with open(downloaded[0], "rb") as f:
+        assert f.read() == content
+    path, headers = gazette_server.requests[-1]
+    assert headers.get("Range") == f"bytes={part_size}-" and headers.get("If-Range") == '"v1"'
+    assert list(fetcher.download_path.glob(".*")) == []
+
+    gazette = fetcher.repository.get_unanalyzed_gazettes()[0]
+    assert gazette['sha256'] == hashlib.sha256(content).hexdigest()
+
+def _interrupted_download(server, tmp_path, content):
+    server.add("/dokumentumok/1/letoltes", content, etag='"v1"')
+    server.add("/feed", rss_feed([("Magyar Közlöny 2025. évi 1. szám", server.url("/dokumentumok/1/letoltes"),
+                                   "Mon, 02 Jun 2025 22:33:44 +0200")]), content_type="application/rss+xml")
+    server.truncate["/dokumentumok/1/letoltes"] = 150000
+    fetcher = _fetcher(server, tmp_path)
+    assert fetcher.fetch_new_gazettes() == []
+    return fetcher
+
+def test_resume_restarts_on_mismatch(gazette_server, tmp_path):
+    old = b"%PDF-1.4\n" + bytes(range(256)) * 800
+    new = b"%PDF-1.4\n" + bytes(reversed(range(256))) * 900
+
+    # A fájl megváltozott: az If-Range nem egyezik, a szerver a teljes új tartalmat küldi
+    fetcher = _interrupted_download(gazette_server, tmp_path / "changed", old)
+    gazette_server.add("/dokumentumok/1/letoltes", new, etag='"v2"')
+    downloaded = fetcher.fetch_new_gazettes()
+    with open(downloaded[0], "rb") as f:
+        assert f.read() == new
+    assert gazette_server.requests[-1][1].get("If-Range") == '"v1"'
+
+    # A szerver a kért Range helyett a fájl elejétől küld: új kérés, Range nélkül
+    fetcher = _interrupted_download(gazette_server, tmp_path / "wrong_range", old)
+    gazette_server.ignore_range_start = True
+    downloaded = fetcher.fetch_new_gazettes()
+    with open(downloaded[0], "rb") as f:
+        assert f.read() == old
+    assert "Range" not in gazette_server.requests[-1][1]
+
+def test_duplicate_content_is_stored_once(gazette_server, tmp_path):
+    '''
+    Ugyanaz a közlöny két különböző URL-ről (megtekintes / letoltes) egyszer kerül a lemezre,
+    a másodpéldány elemzettként kerül az adatbázisba, így nem elemződik újra.
+    '''
+    content = b"%PDF-1.4\n" + b"ugyanaz a tartalom" * 100
+    gazette_server.add("/dokumentumok/abc/letoltes", content)
+    gazette_server.add("/dokumentumok/abc/pdf", content)
+    gazette_server.add("/feed", rss_feed([
+        ("Magyar Közlöny 2025. évi 1. szám", gazette_server.url("/dokumentumok/abc/letoltes"), "Mon, 02 Jun 2025 22:33:44 +0200"),
+        ("Magyar Közlöny 2025. évi 1. szám (javított)", gazette_server.url("/dokumentumok/abc/pdf"), "Mon, 02 Jun 2025 22:30:00 +0200"),
+    ]), content_type="application/rss+xml")
+    fetcher = _fetcher(gazette_server, tmp_path)
+
+    downloaded = fetcher.fetch_new_gazettes()
+
+    assert len(downloaded) == 2 and downloaded[0] == downloaded[1]
+    assert len(list(fetcher.download_path.rglob("*.pdf"))) == 1
+    unanalyzed = fetcher.repository.get_unanalyzed_gazettes()
+    assert [gazette['title'] for gazette in unanalyzed] == ["Magyar Közlöny 2025. évi 1. szám"]
+
+def _publish_issues(server, numbers, year=25):
+    for number in numbers:
+        server.add(f"/dokumentumok/MK_{year}_{number:03d}/letoltes", b"%PDF-1.4\n" + bytes([number]) * 4096)
+
+def _backfill(server, fetcher, **kwargs):
+    from fetcher import GazetteBackfill
+    return GazetteBackfill(fetcher, url_template=server.url("/dokumentumok/MK_{yy}_{number:03d}/letoltes"), **kwargs)
+
+def test_backfill_downloads_until_missing(gazette_server, tmp_path):
+    '''
+    test_backfill_downloads_until_missing(): A visszamenőleges letöltés lapszám sorrendben letölti az év
+    közlönyeit, max_missing egymást követő hiányzó lapszám után leáll, és a párhuzamos kérések
+    száma nem lépi túl a korlátot. A PDF helyett adott HTML hibaoldal hiányzó lapszámnak számít.
+
+    test_backfill_rate_limit(): A kéréskorlát mellett a kérések legalább 1/rate időközzel indulnak.
+
+    test_backfill_resumes_from_checkpoint(): Hiba után az ellenőrzőpont a hibás lapszám előtt marad,
+    így a következő futás onnan folytatja, a már letöltött lapszámokat nem kéri le újra.
+    '''
+    _publish_issues(gazette_server, range(1, 13))
+    # A webhely a nem létező lapszámokra 200-as HTML oldalt ad
+    for number in range(13, 30):
+        gazette_server.add(f"/dokumentumok/MK_25_{number:03d}/letoltes", b"<html>Nincs ilyen dokumentum</html>",
+                           content_type="text/html")
+    gazette_server.delay = 0.02
+    fetcher = _fetcher(gazette_server, tmp_path)
+    backfill = _backfill(gazette_server, fetcher, concurrency=3, max_missing=3)
+
+    downloaded = backfill.run(2025)
+
+    assert len(downloaded) == 12
+    assert len(list(fetcher.download_path.rglob("*.pdf"))) == 12
+    for number, path in enumerate(downloaded, start=1):
+        with open(path, "rb") as f:
+            assert f.read() == gazette_server.files[f"/dokumentumok/MK_25_{number:03d}/letoltes"]
+    assert gazette_server.max_active <= 3
+    titles = sorted(gazette['title'] for gazette in fetcher.repository.get_unanalyzed_gazettes())
+    assert titles == sorted(f"Magyar Közlöny 2025. évi {number}. szám" for number in range(1, 13))
+    # A hiányzó lapszámok nem kerülnek az ellenőrzőpontba: később megjelenhetnek
+    assert fetcher.repository.get_backfill_checkpoint(2025) == 12
+
+    _publish_issues(gazette_server, [13])
+    assert len(backfill.run(2025)) == 1
+    assert fetcher.repository.get_backfill_checkpoint(2025) == 13
+
+def test_backfill_rate_limit(gazette_server, tmp_path):
+    _publish_issues(gazette_server, range(1, 7))
+    fetcher = _fetcher(gazette_server, tmp_path)
+    backfill = _backfill(gazette_server, fetcher, concurrency=4, rate=20)
+
+    start = time.perf_counter()
+    assert len(backfill.run(2025, last=6)) == 6
+    elapsed = time.perf_counter() - start
+
+    # 6 kérés 20/s mellett: az utolsó legkorábban 5 * 0,05 s után indul
+    assert elapsed >= 0.25
+
+def test_backfill_resumes_from_checkpoint(gazette_server, tmp_path):
+    _publish_issues(gazette_server, range(1, 7))
+    gazette_server.support_range = False
+    gazette_server.truncate["/dokumentumok/MK_25_003/letoltes"] = 100
+    fetcher = _fetcher(gazette_server, tmp_path)
+    backfill = _backfill(gazette_server, fetcher, concurrency=2)
+
+    first = backfill.run(2025, last=6)
+
+    assert len(first) == 5
+    assert fetcher.repository.get_backfill_checkpoint(2025) == 2
+
+    gazette_server.requests.clear()
+    second = backfill.run(2025, last=6)
+
+    assert len(second) == 1
+    assert [path for path, _ in gazette_server.requests] == ["/dokumentumok/MK_25_003/letoltes"]
+    assert fetcher.repository.get_backfill_checkpoint(2025) == 6
+    # A teljes tartomány feldolgozva: nincs újabb kérés
+    assert backfill.run(2025, last=6) == []
@@ -0,0 +1,68 @@
+import re
+import json
+import pytest
+from gdmonitor import KeywordRuleset, load_ruleset
+from gdmonitor.keyword_matcher import KeywordMatcher
+from gdmonitor.resulation_analyzer import DEFAULT_RULESET, KEYWORDS
+
+def test_keyword_matcher_matches_findall():
+    '''
+    A kulcsszavankénti darabszám megegyezik a kulcsszavanként futtatott re.findall eredményével,
+    átfedő kulcsszavak (pl. "ix. helyi önkormányzatok" és "helyi önkormányzat") esetén is.
+    '''
+    text = (
+        "a ix. helyi önkormányzatok fejezet szerint a helyi önkormányzatoknak és a települési "
+        "önkormányzatok adósságot keletkeztető ügyleteinek, valamint a helyi önkormányzat "
+        "iparűzési adóbevételének vizsgálata. önkormányzati hitelfelvétel, önkormányzati adósság."
+    )
+    matcher = KeywordMatcher(KEYWORDS)
+    expected = [len(re.findall(r'\b' + keyword + r'\w*\b', text)) for keyword in KEYWORDS]
+    assert matcher.count(text) == expected
+    assert matcher.count(text)[KEYWORDS.index("helyi önkormányzat")] == 3
+
+def test_keyword_matcher_prefix_keywords():
+    # Egymás előtagjai kulcsszavak ugyanarról a pozícióról is külön számolódnak
+    matcher = KeywordMatcher(["adó", "adósság", "helyi adó"])
+    assert matcher.count("a helyi adó és az adósság, adóság") == [3, 1, 1]
+
+def test_keyword_matcher_empty():
+    assert KeywordMatcher([]).count("bármi") == []
+    assert KeywordMatcher(KEYWORDS).count("") == [0] * len(KEYWORDS)
+
+def test_ruleset_version_and_loading(tmp_path):
+    '''
+    test_ruleset_version_and_loading(): A szabálykészlet verziója csak a kulcsszavaktól és a súlyoktól függ;
+    a konfigurációs fájlból betöltött alapértelmezett kulcsszavak ugyanazt a verziót kapják.
+    '''
+    config = tmp_path / "keywords.json"
+    config.write_text(json.dumps({"name": "teszt", "keywords": [keyword.upper() for keyword in KEYWORDS]}), encoding="utf-8")
+
+    ruleset = load_ruleset(config)
+    assert ruleset.keywords == KEYWORDS
+    assert ruleset.version == DEFAULT_RULESET.version
+    assert KeywordRuleset(KEYWORDS, title_weight=3).version != DEFAULT_RULESET.version
+    assert KeywordRuleset(KEYWORDS + ["fővárosi"]).version != DEFAULT_RULESET.version
+
+    resolution = {'title': "A helyi önkormányzat támogatásáról", 'content': "A helyi önkormányzat és az iparűzési adó."}
+    assert ruleset.score(resolution) == (4, ["helyi önkormányzat", "iparűzési adó"])
+
+    config.write_text(json.dumps({"name": "üres", "keywords": []}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_ruleset(config)
+
+def test_shipped_keywords_file(tmp_path, monkeypatch):
+    '''
+    A mellékelt .env KEYWORDS_FILE beállítása a projekt gyökeréből (a konténer munkakönyvtárából)
+    indítva betölthető szabálykészletre mutat.
+    '''
+    from pathlib import Path
+    from dotenv import dotenv_values
+    from repository import GazetteRepository
+    import main
+    root = Path(__file__).resolve().parent.parent
+    monkeypatch.chdir(root)
+    monkeypatch.setenv('KEYWORDS_FILE', dotenv_values(root / "src" / ".env")['KEYWORDS_FILE'])
+
+    with GazetteRepository(tmp_path / "gazettes.db") as repository:
+        ruleset = main.setup_ruleset(repository)
+    assert ruleset.keywords == KEYWORDS
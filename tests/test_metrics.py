@@ -0,0 +1,90 @@
+import json
+import time
+import pytest
+from pathlib import Path
+from conftest import rss_feed
+from fetcher import GazetteFetcher
+from metrics import MetricsRegistry, metrics
+from pipeline import GazettePipeline
+from repository import TextCacheRepository
+from gdmonitor import iter_text_cached, iter_resolutions
+
+SAMPLES = Path(__file__).resolve().parent.parent / "samples"
+
+@pytest.fixture
+def enabled_metrics(tmp_path):
+    metrics.configure(textfile=str(tmp_path / "gdmonitor.prom"), report=str(tmp_path / "report.json"))
+    metrics.reset()
+    yield metrics
+    metrics.configure()
+    metrics.reset()
+
+def _values(report, name):
+    return {tuple(sorted(row['labels'].items())): row.get('value', row.get('count')) for row in report['counters'] + report['timings']
+            if row['name'] == name}
+
+def test_disabled_metrics_record_nothing():
+    '''
+    test_disabled_metrics_record_nothing(): Kikapcsolt gyűjtő semmit nem rögzít, és a hívások költsége elhanyagolható.
+
+    test_pipeline_metrics_export(): Egy futás letöltési, PDF, gyorsítótár, határozat és adatbázis mérései
+    megjelennek a Prometheus textfile-ban és a JSON riportban.
+    '''
+    registry = MetricsRegistry()
+    timed = registry.timed('noop_seconds')(lambda: None)
+    start = time.perf_counter()
+    for _ in range(100000):
+        registry.inc('pages_total')
+        with registry.timer('stage_seconds'):
+            pass
+        timed()
+    elapsed = time.perf_counter() - start
+    assert registry.snapshot()['counters'] == [] and registry.snapshot()['timings'] == []
+    # 3 x 100 000 hívás: hívásonként jóval 1 µs alatt kell maradnia
+    assert elapsed < 0.5
+
+    registry.enabled = True
+    registry.inc('pages_total', 3, backend='pdfium')
+    registry.observe('stage_seconds', 0.5)
+    other = MetricsRegistry()
+    other.enabled = True
+    other.inc('pages_total', 2, backend='pdfium')
+    other.observe('stage_seconds', 1.5)
+    registry.merge(other.collect())
+    assert other.snapshot()['counters'] == []
+    report = registry.snapshot()
+    assert _values(report, 'pages_total') == {(('backend', 'pdfium'),): 5}
+    assert report['timings'] == [{'name': 'stage_seconds', 'labels': {}, 'count': 2, 'sum': 2.0, 'max': 1.5}]
+
+def test_pipeline_metrics_export(gazette_server, tmp_path, enabled_metrics):
+    content = (SAMPLES / "MK_25_022.pdf").read_bytes()
+    gazette_server.add("/dokumentumok/MK_25_022/letoltes", content)
+    gazette_server.add("/feed", rss_feed([("Magyar Közlöny 2025. évi 22. szám", gazette_server.url("/dokumentumok/MK_25_022/letoltes"),
+                                           "Mon, 03 Mar 2025 22:33:44 +0100")]), content_type="application/rss+xml")
+    fetcher = GazetteFetcher(feed_url=gazette_server.url("/feed"), db_file="gazettes.db", download_path="downloads",
+                             base_dir=str(tmp_path))
+    text_cache = TextCacheRepository(tmp_path / "cache.db")
+    assert GazettePipeline(fetcher, text_cache, pdf_backend="pdfium").run() == 1
+    # Másodszor a gyorsítótárból
+    gazette = fetcher.repository._conn.execute("SELECT filename, sha256 FROM gazettes").fetchone()
+    assert len(list(iter_resolutions(iter_text_cached(fetcher.download_path / gazette[0], text_cache, content_hash=gazette[1],
+                                                      backend="pdfium")))) == 2
+
+    report = metrics.snapshot()
+    assert _values(report, 'download_bytes_total') == {(): len(content)}
+    assert _values(report, 'downloads_total') == {(('duplicate', 'false'),): 1}
+    assert _values(report, 'feed_requests_total') == {(('result', 'ok'),): 1}
+    assert _values(report, 'pdf_pages_total') == {(('backend', 'pdfium'),): 10}
+    assert _values(report, 'resolutions_extracted_total') == {(): 4}
+    assert _values(report, 'resolutions_scored_total') == {(): 2}
+    assert _values(report, 'gazettes_analyzed_total') == {(('relevant', 'false'),): 1}
+    assert report['text_cache_hit_rate'] == 0.5
+    assert _values(report, 'db_transaction_seconds')[()] >= 2
+
+    metrics.flush()
+    prometheus = (tmp_path / "gdmonitor.prom").read_text()
+    assert "# TYPE gdmonitor_download_bytes_total counter" in prometheus
+    assert f"gdmonitor_download_bytes_total {len(content)}" in prometheus
+    assert 'gdmonitor_pdf_extract_seconds_count{backend="pdfium",mode="serial"} 1' in prometheus
+    assert 'gdmonitor_text_cache_requests_total{result="hit"} 1' in prometheus
+    assert json.loads((tmp_path / "report.json").read_text())['counters'] == report['counters']
@@ -1,4 +1,13 @@
-from gdmonitor.pdf_processor import extract_text_from_pdf
+import re
+import pdfplumber
+from pathlib import Path
+from gdmonitor import extract_resolutions, iter_resolutions
+from gdmonitor.pdf_processor import (PdfiumBackend, extract_text_from_pdf, extractor_version, iter_text_from_pdf,
+                                     locate_decision_pages, normalize_pages)
+from gdmonitor.resulation_analyzer import DEFAULT_RULESET
+from gdmonitor.pdf_sections import _decision_range, _toc_entries, find_decision_pages
+
+SAMPLES = Path(__file__).resolve().parent.parent / "samples"
 
 def test_extract_text_from_pdf(tmp_path):
     # Készítsünk egy egyszerű PDF-et teszteléshez
@@ -12,4 +21,120 @@ def test_extract_text_from_pdf(tmp_path):
 
     # Teszteljük a függvényt
     text = extract_text_from_pdf(str(test_pdf_path))
-    assert "Korm. határozat" in text
\ No newline at end of file
+    assert "Korm. határozat" in text
+
+def test_extract_text_from_pdf_parallel(tmp_path):
+    # Több oldalas PDF: a párhuzamos módnak pontosan a soros eredményt kell adnia
+    test_pdf_path = tmp_path / "test_multi.pdf"
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_font("Arial", size=12)
+    for i in range(5):
+        pdf.add_page()
+        pdf.cell(200, 10, txt=f"A Kormany {i}. oldal tartalma.", ln=True)
+    pdf.output(str(test_pdf_path))
+
+    serial = extract_text_from_pdf(str(test_pdf_path))
+    parallel = extract_text_from_pdf(str(test_pdf_path), mode="parallel", workers=2)
+    assert parallel == serial
+    assert serial.index("0. oldal") < serial.index("4. oldal")
+
+
+def test_normalize_pages():
+    # Oldalankénti tisztítás összefűzve = a teljes szöveg egyben tisztítva
+    pages = ["Első  oldal\n", "\n  második oldal \n", "", "\tharmadik\n"]
+    assert ''.join(normalize_pages(pages)) == re.sub(r'\s+', ' ', ''.join(pages))
+
+def _gazette_pdf(path, toc_entries, pages):
+    # Címlap tartalomjegyzékkel, utána fejléces belső oldalak (könyvjelzők nélkül)
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_font("Arial", size=10)
+    pdf.add_page()
+    for line in ["MAGYAR KÖZLÖNY", "20. szám", "Tartalomjegyzék"] + toc_entries:
+        pdf.cell(200, 8, txt=line, ln=True)
+    for number, lines in enumerate(pages, start=2):
+        pdf.add_page()
+        for line in [f"{number} MAGYAR KÖZLÖNY 2025. évi 20. szám"] + lines:
+            pdf.cell(200, 8, txt=line, ln=True)
+    pdf.output(str(path))
+
+def test_find_decision_pages():
+    '''
+    test_find_decision_pages(): A kormányhatározatok oldaltartománya a könyvjelzőkből és a tartalomjegyzékből
+    is ugyanaz; az utolsó határozat utáni első más bejegyzés oldala is a tartományba tartozik.
+
+    test_decisions_only_extraction(): Csak a határozatok oldalainak kinyerése ugyanazokat a határozatokat adja,
+    határozat nélküli közlönynél üres szöveget, felismerhetetlen szerkezetnél a teljes szöveget.
+    '''
+    expected = {"MK_24_019": range(29, 50), "MK_24_051": range(81, 97), "MK_25_020": range(10, 14),
+                "MK_25_022": range(3, 10), "MK_25_026": range(30, 65)}
+    for name, pages in expected.items():
+        with pdfplumber.open(SAMPLES / f"{name}.pdf") as pdf:
+            assert find_decision_pages(pdf) == pages, name
+            assert _decision_range(_toc_entries(pdf), len(pdf.pages)) == pages, name
+
+def test_decisions_only_extraction(tmp_path):
+    sample = str(SAMPLES / "MK_25_022.pdf")
+    full = extract_resolutions(extract_text_from_pdf(sample))
+    targeted = extract_resolutions(''.join(iter_text_from_pdf(sample, decisions_only=True)))
+    assert len(full) == 2
+    assert targeted == full
+
+    with_decision = tmp_path / "with_decision.pdf"
+    _gazette_pdf(with_decision, ["4/2025. (II. 28.) EM rendelet Egy miniszteri rendeletrol 2",
+                                 "1035/2025. (II. 28.) Korm. határozat A kormánybiztos kinevezésérol 3"],
+                 [["Az energiaügyi miniszter 4/2025. (II. 28.) EM rendelete"],
+                  ["A Kormány 1035/2025. (II. 28.) Korm. határozata a kormánybiztos kinevezésérol"]])
+    assert locate_decision_pages(str(with_decision)) == range(2, 3)
+    text = ''.join(iter_text_from_pdf(str(with_decision), decisions_only=True))
+    assert "EM rendelete" not in text
+    assert [resolution['number'] for resolution in extract_resolutions(text)] == ['1035']
+
+    without_decision = tmp_path / "without_decision.pdf"
+    _gazette_pdf(without_decision, ["4/2025. (II. 28.) EM rendelet Egy miniszteri rendeletrol 2"],
+                 [["Az energiaügyi miniszter 4/2025. (II. 28.) EM rendelete"]])
+    assert locate_decision_pages(str(without_decision)) == range(0)
+    assert extract_text_from_pdf(str(without_decision), mode="parallel", workers=2) != ''
+    assert ''.join(iter_text_from_pdf(str(without_decision), mode="parallel", workers=2, decisions_only=True)) == ''
+
+    # Tartalomjegyzék és könyvjelzők nélkül a teljes szöveg
+    unknown = tmp_path / "unknown.pdf"
+    _gazette_pdf(unknown, [], [["A Kormány 1035/2025. (II. 28.) Korm. határozata"]])
+    assert locate_decision_pages(str(unknown)) is None
+    assert ''.join(iter_text_from_pdf(str(unknown), decisions_only=True)) == extract_text_from_pdf(str(unknown))
+
+# A pdfium veszteséges: ezekben a határozatokban táblázat van, amelynek celláit más sorrendben adja
+PDFIUM_TABLE_RESOLUTIONS = {
+    'MK_24_019.pdf': ['1028', '1031', '1032', '1036', '1037'],
+    'MK_24_051.pdf': ['1122', '1127'],
+    'MK_25_022.pdf': ['1036', '1037'],
+    'MK_25_026.pdf': ['1060', '1061', '1071', '1072'],
+}
+
+def test_pdf_backends_equivalent():
+    '''
+    A pdfium backend a teljes közlönyből minden mintán ugyanazokat a határozatokat (szám, dátum, cím) és
+    ugyanazt a pontozást adja, mint a pdfplumber, és a tartalom is karakterre azonos, kivéve az ismert
+    táblázatos határozatokat (ezért a pdfplumber az alapértelmezett). Párhuzamos módban is ugyanazt adja,
+    és a két backend külön gyorsítótár kulcsot kap. A sebességük összehasonlítása a mérőkészletben van
+    (main.py benchmark --compare-backends).
+    '''
+    assert PdfiumBackend.clean("M A G Y A R K Ö Z L Ö N Y • 2025. előirányzat\x02átcsoportosítás") == \
+        "MAGYAR KÖZLÖNY • 2025. előirányzat-\nátcsoportosítás"
+    for sample in sorted(SAMPLES.glob("MK_*.pdf")):
+        results = {backend: list(iter_resolutions(iter_text_from_pdf(str(sample), backend=backend)))
+                   for backend in ("pdfplumber", "pdfium")}
+        assert results["pdfplumber"], sample.name
+        assert [{key: value for key, value in resolution.items() if key != 'content'} for resolution in results["pdfium"]] == \
+            [{key: value for key, value in resolution.items() if key != 'content'} for resolution in results["pdfplumber"]], sample.name
+        assert [DEFAULT_RULESET.score(resolution) for resolution in results["pdfium"]] == \
+            [DEFAULT_RULESET.score(resolution) for resolution in results["pdfplumber"]], sample.name
+        different = [plumber['number'] for plumber, pdfium in zip(results["pdfplumber"], results["pdfium"])
+                     if plumber['content'] != pdfium['content']]
+        assert different == PDFIUM_TABLE_RESOLUTIONS.get(sample.name, []), sample.name
+
+    sample = str(SAMPLES / "MK_25_022.pdf")
+    assert extract_text_from_pdf(sample, mode="parallel", workers=2, backend="pdfium") == \
+        extract_text_from_pdf(sample, backend="pdfium")
+    assert extractor_version(backend="pdfium") != extractor_version()
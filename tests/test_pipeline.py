@@ -0,0 +1,322 @@
+import os
+import signal
+import pytest
+import sqlite3
+import threading
+from pathlib import Path
+from conftest import rss_feed
+from fetcher import GazetteFetcher
+from repository import GazetteRepository, TextCacheRepository
+from pipeline import (GazettePipeline, GazetteWatcher, analyze_in_processes, extract_gdecisions, rescore_resolutions,
+                      store_analysis)
+from gdmonitor import KeywordRuleset, analyze_resolutions
+
+SAMPLES = Path(__file__).resolve().parent.parent / "samples"
+
+def _publish_samples(server, names):
+    items = []
+    for i, name in enumerate(names, start=1):
+        server.add(f"/dokumentumok/{name}/letoltes", (SAMPLES / f"{name}.pdf").read_bytes())
+        items.append((f"Magyar Közlöny 2025. évi {i}. szám", server.url(f"/dokumentumok/{name}/letoltes"),
+                      f"Mon, 0{i} Jun 2025 22:33:44 +0200"))
+    server.add("/feed", rss_feed(items), content_type="application/rss+xml")
+
+def _fetcher(server, base_dir):
+    return GazetteFetcher(feed_url=server.url("/feed"), db_file="gazettes.db", download_path="downloads",
+                          base_dir=str(base_dir))
+
+def _summaries(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('''
+        SELECT g.url, s.gdecision_title, s.relevant_score, s.keyword_matches, s.summary
+        FROM summary s JOIN gazettes g ON g.id = s.gazette_id ORDER BY g.url, s.gdecision_title''').fetchall()
+    flags = conn.execute("SELECT url, analyzed, relevant FROM gazettes ORDER BY url").fetchall()
+    conn.close()
+    return rows, flags
+
+def test_pipeline_matches_serial_analysis(gazette_server, tmp_path):
+    '''
+    test_pipeline_matches_serial_analysis(): Az átlapolt lánc ugyanazokat az összefoglalókat és
+    jelzéseket írja az adatbázisba, mint a letöltés utáni soros elemzés.
+
+    test_pipeline_stop(): Leállítás után a lánc szálai kilépnek, a fel nem dolgozott közlönyök elemzetlenek maradnak.
+    '''
+    _publish_samples(gazette_server, ["MK_25_022", "MK_24_019"])
+    # A soros futás a lánc által kinyert szöveget használja újra, a PDF-eket csak egyszer kell feldolgozni
+    text_cache = TextCacheRepository(tmp_path / "cache.db")
+
+    pipelined = _fetcher(gazette_server, tmp_path / "pipeline")
+    pipeline = GazettePipeline(pipelined, text_cache, queue_size=1)
+    assert pipeline.run() == 2
+
+    serial = _fetcher(gazette_server, tmp_path / "serial")
+    serial.fetch_new_gazettes()
+    for gazette in serial.repository.get_unanalyzed_gazettes():
+        gdecisions = extract_gdecisions(gazette, serial.download_path, text_cache)
+        store_analysis(serial.repository, gazette, gdecisions, analyze_resolutions(gdecisions) if gdecisions else None)
+
+    pipeline_rows, pipeline_flags = _summaries(pipelined.db_path)
+    serial_rows, serial_flags = _summaries(serial.db_path)
+    assert len(pipeline_rows) == 1
+    assert pipeline_rows == serial_rows
+    assert pipeline_flags == serial_flags
+    assert all(analyzed == 1 for _, analyzed, _ in pipeline_flags)
+
+def _statuses(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT status, lease_owner FROM gazettes ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+def test_pipeline_stop(gazette_server, tmp_path):
+    _publish_samples(gazette_server, ["MK_25_020", "MK_25_022"])
+    fetcher = _fetcher(gazette_server, tmp_path)
+    pipeline = GazettePipeline(fetcher, TextCacheRepository(tmp_path / "cache.db"))
+    pipeline.stop()
+
+    assert pipeline.run() == 0
+    # Leállítás után a feed sem kerül lekérésre, és nem marad lefoglalt közlöny
+    assert gazette_server.requests == []
+    assert all(status in ('done', 'pending') and owner is None for status, owner in _statuses(fetcher.db_path))
+
+    # Korábban letöltött, elemzetlen közlöny sem kerül lefoglalásra
+    fetcher.fetch_new_gazettes()
+    assert pipeline.run() == 0
+    assert _statuses(fetcher.db_path) == [('pending', None), ('pending', None)]
+
+def test_pipeline_stop_drains_claimed(gazette_server, tmp_path, monkeypatch):
+    '''
+    test_pipeline_stop_drains_claimed(): Futás közbeni leállításkor a már lefoglalt közlönyök elemzése
+    befejeződik, újabb letöltés és lefoglalás nem indul. Ha az író szakasz hibával leáll, a láncban
+    maradt közlönyök visszakerülnek a várakozók közé; lefoglalt közlöny egyik esetben sem marad.
+    '''
+    _publish_samples(gazette_server, ["MK_25_022", "MK_25_020", "MK_24_019"])
+    fetcher = _fetcher(gazette_server, tmp_path)
+
+    def fetch_and_stop(on_downloaded, stop_event):
+        # Az első letöltött közlöny a láncba kerül, utána érkezik a leállítás
+        def downloaded(gazette):
+            on_downloaded(gazette)
+            pipeline.stop()
+        return fetcher.fetch_new_gazettes(on_downloaded=downloaded, stop_event=stop_event)
+
+    pipeline = GazettePipeline(fetcher, TextCacheRepository(tmp_path / "cache.db"), decisions_only=True,
+                               pdf_backend='pdfium', fetch=fetch_and_stop)
+    assert pipeline.run() == 1
+    assert _statuses(fetcher.db_path) == [('done', None)]
+
+    # Az író hibája: a lefoglalt közlönyök elemzetlenül, de nem elveszve kerülnek vissza
+    import pipeline.gazette_pipeline as gazette_pipeline
+    def failing_store(*args):
+        raise RuntimeError("írási hiba")
+    monkeypatch.setattr(gazette_pipeline, 'store_analysis', failing_store)
+    pipeline = GazettePipeline(fetcher, TextCacheRepository(tmp_path / "cache.db"), decisions_only=True, pdf_backend='pdfium')
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+    assert _statuses(fetcher.db_path) == [('done', None), ('pending', None), ('pending', None)]
+
+def _register_samples(repository, download_path, names):
+    for i, name in enumerate(names, start=1):
+        (download_path / f"{name}.pdf").write_bytes((SAMPLES / f"{name}.pdf").read_bytes())
+        repository.save_gazette(f"Magyar Közlöny 2025. évi {i}. szám", f"2025-06-0{i}", f"https://example.org/{name}", f"{name}.pdf")
+
+def test_analyze_in_processes_matches_serial(tmp_path):
+    '''
+    test_analyze_in_processes_matches_serial(): A több folyamatos elemzés ugyanazt írja az adatbázisba, mint a soros.
+    '''
+    names = ["MK_25_020", "MK_25_022", "MK_24_019"]
+    text_cache = TextCacheRepository(tmp_path / "cache.db")
+    repositories = {}
+    for mode in ("serial", "processes"):
+        (tmp_path / mode).mkdir()
+        repositories[mode] = GazetteRepository(tmp_path / mode / "gazettes.db")
+        _register_samples(repositories[mode], tmp_path / mode, names)
+
+    serial = repositories["serial"]
+    for gazette in serial.get_unanalyzed_gazettes():
+        gdecisions = extract_gdecisions(gazette, tmp_path / "serial", text_cache)
+        store_analysis(serial, gazette, gdecisions, analyze_resolutions(gdecisions) if gdecisions else None)
+
+    processes = repositories["processes"]
+    assert analyze_in_processes(processes, tmp_path / "processes", text_cache, workers=2) == 3
+
+    assert _summaries(processes.db_path) == _summaries(serial.db_path)
+    assert processes.get_unanalyzed_gazettes() == []
+
+def test_rescore_resolutions_incremental(tmp_path, monkeypatch):
+    '''
+    test_rescore_resolutions_incremental(): Új szabálykészletnél csak az újonnan relevánssá vált határozatokhoz
+    készül összefoglaló, a többi összefoglaló pontszáma frissül vagy törlődik; ugyanazzal a szabálykészlettel
+    újra futtatva semmi sem változik.
+
+    test_rescore_same_titles(): Egy közlönyön belül azonos című határozatok összefoglalója a határozat
+    sorszámához kapcsolódik, így az újrapontozás nem keveri össze őket.
+    '''
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    gazette_id = repository.save_gazette("Magyar Közlöny 2025. évi 1. szám", "2025-01-06", "https://example.org/1", "mk1.pdf")
+    gdecisions = [
+        {'number': '1', 'year': '2025', 'date': None, 'title': "A Kormány 1/2025. (I. 6.) Korm. határozata",
+         'content': "A helyi önkormányzat adósságot keletkeztető ügyletek engedélyezéséről."},
+        {'number': '2', 'year': '2025', 'date': None, 'title': "A Kormány 2/2025. (I. 6.) Korm. határozata",
+         'content': "Az iparűzési adó kiesés kompenzációjáról."},
+        {'number': '3', 'year': '2025', 'date': None, 'title': "A Kormány 3/2025. (I. 6.) Korm. határozata",
+         'content': "A fővárosi közlekedés fejlesztéséről."},
+    ]
+    old = KeywordRuleset(["helyi önkormányzat", "iparűzési adó"])
+    scored = [(gdecision, *old.score(gdecision)) for gdecision in gdecisions]
+    results = {'relevant_resolutions': [{'resolution': g, 'relevance_score': score, 'keyword_matches': ', '.join(keywords),
+                                         'summary': f"Összefoglaló: {g['content']}"}
+                                        for g, score, keywords in scored if score > 0],
+               'ruleset_version': old.version}
+    store_analysis(repository, repository.get_unanalyzed_gazettes()[0], gdecisions, results)
+
+    summarized = []
+    monkeypatch.setattr("pipeline.rescoring.summarize_contents",
+                        lambda contents: summarized.extend(contents) or [f"Összefoglaló: {c}" for c in contents])
+    new = KeywordRuleset(["helyi önkormányzat", "adósságot keletkeztető", "fővárosi"])
+    stats = rescore_resolutions(repository, new)
+
+    assert stats == {'rescored': 3, 'changed': 3, 'summarized': 1, 'removed': 1}
+    assert summarized == [gdecisions[2]['content']]
+    rows = repository._conn.execute(
+        "SELECT gdecision_title, relevant_score, keyword_matches, ruleset_version FROM summary ORDER BY gdecision_title").fetchall()
+    assert rows == [
+        ("A Kormány 1/2025. (I. 6.) Korm. határozata", 2, "helyi önkormányzat, adósságot keletkeztető", new.version),
+        ("A Kormány 3/2025. (I. 6.) Korm. határozata", 1, "fővárosi", new.version),
+    ]
+    assert repository._conn.execute("SELECT relevant FROM gazettes WHERE id = ?", (gazette_id,)).fetchone() == (1,)
+
+    assert rescore_resolutions(repository, new)['rescored'] == 0
+    stats = rescore_resolutions(repository, KeywordRuleset(["nem szereplő kulcsszó"]))
+    assert stats['removed'] == 2
+    assert repository._conn.execute("SELECT relevant FROM gazettes WHERE id = ?", (gazette_id,)).fetchone() == (0,)
+    repository.close()
+
+def test_rescore_same_titles(tmp_path, monkeypatch):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    gazette_id = repository.save_gazette("Magyar Közlöny 2025. évi 1. szám", "2025-01-06", "https://example.org/1", "mk1.pdf")
+    title = "A Kormány 1/2025. (I. 6.) Korm. határozata"
+    gdecisions = [
+        {'number': '1', 'year': '2025', 'date': None, 'title': title, 'content': "Az iparűzési adó kiesés kompenzációjáról."},
+        {'number': '1', 'year': '2025', 'date': None, 'title': title, 'content': "A fővárosi közlekedés fejlesztéséről."},
+    ]
+    old = KeywordRuleset(["iparűzési adó"])
+    results = {'relevant_resolutions': [{'resolution': gdecisions[0], 'relevance_score': 1, 'keyword_matches': "iparűzési adó",
+                                         'summary': "Összefoglaló: iparűzési adó"}],
+               'ruleset_version': old.version}
+    store_analysis(repository, repository.get_unanalyzed_gazettes()[0], gdecisions, results)
+
+    monkeypatch.setattr("pipeline.rescoring.summarize_contents", lambda contents: [f"Összefoglaló: {c}" for c in contents])
+    stats = rescore_resolutions(repository, KeywordRuleset(["fővárosi"]))
+
+    assert stats == {'rescored': 2, 'changed': 2, 'summarized': 1, 'removed': 1}
+    rows = repository._conn.execute("SELECT resolution_ordinal, relevant_score, summary FROM summary WHERE gazette_id = ?",
+                                    (gazette_id,)).fetchall()
+    assert rows == [(1, 1, "Összefoglaló: A fővárosi közlekedés fejlesztéséről.")]
+    repository.close()
+
+def test_watcher_analyzes_new_gazettes(gazette_server, tmp_path):
+    '''
+    test_watcher_analyzes_new_gazettes(): A figyelő minden körben ugyanazzal az adatbázis kapcsolattal
+    elemzi az azóta megjelent közlönyöket.
+
+    test_watcher_backoff(): Sikertelen lekérdezések után a várakozás duplázódik (felső korláttal),
+    sikeres kör után visszaáll az alap időközre.
+
+    test_watcher_fetch_crash(): A letöltés kivétele (a fetcher hibája nélkül) is sikertelen körnek számít.
+
+    test_watcher_sigterm(): SIGTERM hatására a várakozó figyelő azonnal, szabályosan leáll.
+    '''
+    _publish_samples(gazette_server, ["MK_25_022"])
+    fetcher = _fetcher(gazette_server, tmp_path)
+    connection = fetcher.repository._conn
+    watcher = GazetteWatcher(fetcher, TextCacheRepository(tmp_path / "cache.db"), interval=0, decisions_only=True)
+    assert watcher.run(max_cycles=2) == 1
+
+    # Új szám jelenik meg a feed elején
+    gazette_server.add("/dokumentumok/MK_25_020/letoltes", (SAMPLES / "MK_25_020.pdf").read_bytes())
+    gazette_server.add("/feed", rss_feed([
+        ("Magyar Közlöny 2025. évi 2. szám", gazette_server.url("/dokumentumok/MK_25_020/letoltes"), "Tue, 02 Jun 2025 22:33:44 +0200"),
+        ("Magyar Közlöny 2025. évi 1. szám", gazette_server.url("/dokumentumok/MK_25_022/letoltes"), "Mon, 01 Jun 2025 22:33:44 +0200"),
+    ]), content_type="application/rss+xml")
+    assert watcher.run_once() == 1
+    assert watcher.failures == 0
+    assert fetcher.repository._conn is connection
+    assert fetcher.repository.get_unanalyzed_gazettes() == []
+
+def test_watcher_backoff(gazette_server, tmp_path):
+    fetcher = _fetcher(gazette_server, tmp_path)
+    watcher = GazetteWatcher(fetcher, TextCacheRepository(tmp_path / "cache.db"), interval=900, jitter=0,
+                             retry_delay=60, max_backoff=200)
+    delays = []
+    for _ in range(4):
+        # A feed nem érhető el (404)
+        assert watcher.run_once() == 0
+        delays.append(watcher.next_delay(watcher.failures))
+    assert delays == [60, 120, 200, 200]
+
+    _publish_samples(gazette_server, [])
+    watcher.run_once()
+    assert watcher.failures == 0
+    assert watcher.next_delay(watcher.failures) == 900
+
+    jittered = GazetteWatcher(fetcher, None, interval=100, jitter=0.2)
+    assert all(80 <= jittered.next_delay(0) <= 120 for _ in range(50))
+
+def test_watcher_fetch_crash(gazette_server, tmp_path, monkeypatch):
+    _publish_samples(gazette_server, [])
+    fetcher = _fetcher(gazette_server, tmp_path)
+    watcher = GazetteWatcher(fetcher, TextCacheRepository(tmp_path / "cache.db"), interval=900, jitter=0,
+                             retry_delay=60, max_backoff=200)
+
+    def crash(on_downloaded=None, stop_event=None):
+        fetcher.last_error = None
+        raise RuntimeError("váratlan hiba")
+    monkeypatch.setattr(fetcher, "fetch_new_gazettes", crash)
+    delays = []
+    for _ in range(2):
+        assert watcher.run_once() == 0
+        delays.append(watcher.next_delay(watcher.failures))
+    assert delays == [60, 120]
+
+    monkeypatch.undo()
+    watcher.run_once()
+    assert watcher.failures == 0
+
+def test_watcher_sigterm(gazette_server, tmp_path):
+    _publish_samples(gazette_server, [])
+    watcher = GazetteWatcher(_fetcher(gazette_server, tmp_path), TextCacheRepository(tmp_path / "cache.db"), interval=60)
+    handlers = signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT)
+    watcher.install_signal_handlers()
+    timer = threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGTERM))
+    try:
+        timer.start()
+        assert watcher.run() == 0
+    finally:
+        timer.cancel()
+        signal.signal(signal.SIGTERM, handlers[0])
+        signal.signal(signal.SIGINT, handlers[1])
+
+def test_pipeline_with_backfill(gazette_server, tmp_path):
+    '''
+    A feed helyett a visszamenőleges letöltés is táplálhatja a láncot: a lapszám szerint
+    letöltött közlönyök a letöltéssel átlapolva elemzésre kerülnek.
+    '''
+    from fetcher import GazetteBackfill
+    for number, name in [(20, "MK_25_020"), (22, "MK_25_022")]:
+        gazette_server.add(f"/dokumentumok/MK_25_{number:03d}/letoltes", (SAMPLES / f"{name}.pdf").read_bytes())
+    fetcher = _fetcher(gazette_server, tmp_path)
+    backfill = GazetteBackfill(fetcher, url_template=gazette_server.url("/dokumentumok/MK_{yy}_{number:03d}/letoltes"))
+    pipeline = GazettePipeline(fetcher, TextCacheRepository(tmp_path / "cache.db"), decisions_only=True,
+                               pdf_backend='pdfium',
+                               fetch=lambda on_downloaded, stop_event: backfill.run(2025, 20, 22, on_downloaded=on_downloaded,
+                                                                                    stop_event=stop_event))
+
+    assert pipeline.run() == 2
+    assert fetcher.repository.get_unanalyzed_gazettes() == []
+    assert fetcher.repository.get_backfill_checkpoint(2025) == 22
+    # A megjelenés dátuma a címlapról, a feed pubDate formátumában
+    conn = sqlite3.connect(fetcher.db_path)
+    dates = conn.execute("SELECT publication_date FROM gazettes ORDER BY id").fetchall()
+    conn.close()
+    assert dates == [("Fri, 28 Feb 2025 00:00:00 -0000",), ("Mon, 03 Mar 2025 00:00:00 -0000",)]
@@ -0,0 +1,261 @@
+import datetime
+import sqlite3
+import threading
+import pytest
+from repository import GazetteRepository
+
+def _count(db_path, table):
+    conn = sqlite3.connect(db_path)
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.close()
+    return count
+
+def test_repository_uses_wal(tmp_path):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    mode = repository._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode.lower() == "wal"
+    repository.close()
+
+def test_transaction_commits_once(tmp_path):
+    '''
+    test_transaction_commits_once(): Egy közlöny összefoglalói és az elemzett jelzés egy tranzakcióban
+    kerülnek mentésre; a tranzakció vége előtt más kapcsolat nem látja őket.
+
+    test_transaction_rollback(): Hiba esetén a tranzakció egyik írása sem marad meg.
+    '''
+    db_path = tmp_path / "gazettes.db"
+    repository = GazetteRepository(db_path)
+    gazette_id = repository.save_gazette("Magyar Közlöny 2025. évi 1. szám", "Mon, 06 Jan 2025 20:00:00 +0100", "https://example.org/1", "mk1.pdf")
+
+    with repository.transaction():
+        repository.save_summaries(gazette_id, [
+            ("A Kormány 1/2025. (I. 6.) Korm. határozata", 3, "helyi önkormányzat", "Összefoglaló 1"),
+            ("A Kormány 2/2025. (I. 6.) Korm. határozata", 1, "iparűzési adó", "Összefoglaló 2"),
+        ])
+        repository.mark_as_analyzed(gazette_id, is_relevant=True)
+        assert _count(db_path, "summary") == 0
+
+    assert _count(db_path, "summary") == 2
+    assert repository.get_unanalyzed_gazettes() == []
+    repository.close()
+
+def test_transaction_rollback(tmp_path):
+    db_path = tmp_path / "gazettes.db"
+    repository = GazetteRepository(db_path)
+    gazette_id = repository.save_gazette("Magyar Közlöny 2025. évi 1. szám", "Mon, 06 Jan 2025 20:00:00 +0100", "https://example.org/1", "mk1.pdf")
+
+    with pytest.raises(RuntimeError):
+        with repository.transaction():
+            repository.save_summary(gazette_id, "A Kormány 1/2025. (I. 6.) Korm. határozata", 3, "helyi önkormányzat", "Összefoglaló")
+            repository.mark_as_analyzed(gazette_id, is_relevant=True)
+            raise RuntimeError("hiba")
+
+    assert _count(db_path, "summary") == 0
+    assert len(repository.get_unanalyzed_gazettes()) == 1
+    repository.close()
+
+def test_filter_new_urls(tmp_path):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    repository.save_gazette("Magyar Közlöny 2025. évi 1. szám", "Mon, 06 Jan 2025 20:00:00 +0100", "https://example.org/1", "mk1.pdf")
+    repository.save_gazette("Magyar Közlöny 2025. évi 3. szám", "Wed, 08 Jan 2025 20:00:00 +0100", "https://example.org/3", "mk3.pdf")
+
+    urls = [f"https://example.org/{i}" for i in range(1, 6)]
+    assert repository.filter_new_urls(urls) == ["https://example.org/2", "https://example.org/4", "https://example.org/5"]
+    assert repository.filter_new_urls([]) == []
+    repository.close()
+
+def test_migrations_on_existing_database(tmp_path):
+    # Régi sémájú, indexek nélküli adatbázis frissítése
+    db_path = tmp_path / "gazettes.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+    CREATE TABLE gazettes (id INTEGER PRIMARY KEY, title TEXT NOT NULL, publication_date TEXT NOT NULL,
+        url TEXT NOT NULL UNIQUE, filename TEXT NOT NULL, download_date TEXT NOT NULL,
+        analyzed INTEGER DEFAULT 0, relevant INTEGER DEFAULT 0, sent_email INTEGER DEFAULT 0);
+    CREATE TABLE summary (id INTEGER PRIMARY KEY, gazette_id INTEGER NOT NULL, gdecision_title TEXT,
+        relevant_score INTEGER DEFAULT 0, keyword_matches TEXT, summary TEXT NOT NULL);
+    ''')
+    conn.close()
+
+    repository = GazetteRepository(db_path)
+    indexes = {row[0] for row in repository._conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_gazettes_unanalyzed", "idx_summary_gazette_id"} <= indexes
+    version = repository._conn.execute("PRAGMA user_version").fetchone()[0]
+    repository.close()
+
+    # Újranyitáskor nem fut le újra
+    repository = GazetteRepository(db_path)
+    assert repository._conn.execute("PRAGMA user_version").fetchone()[0] == version
+    repository.close()
+
+def _save_gazettes(repository, count):
+    return [repository.save_gazette(f"Magyar Közlöny 2025. évi {i}. szám", "Mon, 06 Jan 2025 20:00:00 +0100",
+                                    f"https://example.org/{i}", f"mk{i}.pdf") for i in range(1, count + 1)]
+
+def test_claim_gazettes_is_exclusive(tmp_path):
+    '''
+    test_claim_gazettes_is_exclusive(): Két, ugyanazt az adatbázist használó feldolgozó párhuzamosan
+    foglal; minden közlönyt pontosan egy kap meg.
+
+    test_expired_lease_is_reclaimed(): A lejárt bérletű közlönyt más feldolgozó átveheti, az eredeti
+    feldolgozó eredménye ezután elvetésre kerül.
+
+    test_expired_lease_counts_as_attempt(): Az újra és újra lejáró bérletű (a feldolgozót mindig
+    leállító) közlöny a próbálkozások elfogyása után 'failed' állapotba kerül, nem foglalható le újra.
+
+    test_failed_gazette_retried_with_backoff(): A sikertelen elemzés késleltetve újra lefoglalható,
+    a próbálkozások elfogyása után 'failed' állapotba kerül és nem számít elemzettnek.
+    '''
+    db_path = tmp_path / "gazettes.db"
+    repository = GazetteRepository(db_path)
+    ids = _save_gazettes(repository, 40)
+
+    claimed = {}
+    def work(owner):
+        other = GazetteRepository(db_path)
+        claimed[owner] = []
+        while True:
+            batch = other.claim_gazettes(owner, limit=3)
+            if not batch:
+                break
+            claimed[owner].extend(gazette['id'] for gazette in batch)
+            for gazette in batch:
+                assert other.mark_as_analyzed(gazette['id'], owner=owner)
+        other.close()
+
+    threads = [threading.Thread(target=work, args=(f"node-{i}",)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_claimed = claimed["node-0"] + claimed["node-1"]
+    assert sorted(all_claimed) == ids
+    assert repository.get_unanalyzed_gazettes() == []
+    repository.close()
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    gazette_id, = _save_gazettes(repository, 1)
+
+    first = repository.claim_gazettes("node-a", lease_seconds=60)
+    assert [gazette['id'] for gazette in first] == [gazette_id]
+    assert first[0]['lease_owner'] == "node-a"
+    # Érvényes bérlet mellett más nem kapja meg
+    assert repository.claim_gazettes("node-b") == []
+
+    repository._conn.execute("UPDATE gazettes SET lease_expires = '2000-01-01T00:00:00+00:00'")
+    second = repository.claim_gazettes("node-b")
+    assert second[0]['id'] == gazette_id and second[0]['attempts'] == 2
+
+    assert not repository.mark_as_analyzed(gazette_id, is_relevant=True, owner="node-a")
+    assert repository.mark_as_analyzed(gazette_id, is_relevant=True, owner="node-b")
+    row = repository._conn.execute("SELECT status, analyzed, relevant, lease_owner FROM gazettes").fetchone()
+    assert row == ("done", 1, 1, None)
+    repository.close()
+
+def test_expired_lease_counts_as_attempt(tmp_path):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    gazette_id, = _save_gazettes(repository, 1)
+
+    for attempt in range(1, 3):
+        claimed = repository.claim_gazettes(f"node-{attempt}", max_attempts=2)
+        assert [(gazette['id'], gazette['attempts']) for gazette in claimed] == [(gazette_id, attempt)]
+        # A feldolgozó eredmény nélkül leáll, a bérlet lejár
+        repository._conn.execute("UPDATE gazettes SET lease_expires = '2000-01-01T00:00:00+00:00'")
+
+    assert repository.claim_gazettes("node-3", max_attempts=2) == []
+    row = repository._conn.execute("SELECT status, analyzed, attempts, lease_owner FROM gazettes").fetchone()
+    assert row == ("failed", 0, 2, None)
+    assert repository.get_unanalyzed_gazettes() == []
+    repository.close()
+
+def test_failed_gazette_retried_with_backoff(tmp_path):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    gazette_id, = _save_gazettes(repository, 1)
+
+    repository.claim_gazettes("node-a")
+    assert repository.fail_gazette(gazette_id, "hibás PDF", owner="node-a", max_attempts=2) == "pending"
+    # A várakozási idő alatt nem foglalható le
+    assert repository.claim_gazettes("node-a") == []
+
+    repository._conn.execute("UPDATE gazettes SET next_attempt = '2000-01-01T00:00:00+00:00'")
+    assert len(repository.claim_gazettes("node-a")) == 1
+    assert repository.fail_gazette(gazette_id, "hibás PDF", owner="node-a", max_attempts=2) == "failed"
+
+    row = repository._conn.execute("SELECT status, analyzed, attempts, last_error FROM gazettes").fetchone()
+    assert row == ("failed", 0, 2, "hibás PDF")
+    assert repository.get_unanalyzed_gazettes() == []
+    assert repository.claim_gazettes("node-a") == []
+    repository.close()
+
+def test_release_gazettes(tmp_path):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    _save_gazettes(repository, 2)
+
+    assert len(repository.claim_gazettes("node-a", limit=2)) == 2
+    assert repository.release_gazettes("node-a") == 2
+    claimed = repository.claim_gazettes("node-b", limit=2)
+    assert [gazette['attempts'] for gazette in claimed] == [1, 1]
+    repository.close()
+
+def _resolution(number, title_day, content):
+    return {'number': str(number), 'year': '2025', 'month': 1, 'day': title_day, 'date': datetime.date(2025, 1, title_day),
+            'title': f"A Kormány {number}/2025. (I. {title_day}.) Korm. határozata", 'content': content}
+
+def test_search_resolutions(tmp_path):
+    '''
+    test_search_resolutions(): A mentett határozatok teljes szövegében lehet keresni; a keresőszavak
+    előtagként és ékezetek nélkül is illeszkednek, a találatok relevancia szerint rendezettek.
+
+    test_search_index_follows_updates(): Egy közlöny határozatainak újramentése után a keresés a régi szöveget nem találja.
+
+    test_resolutions_link_old_summaries(): A sorszám nélkül mentett (régi) összefoglalók a határozatok mentésekor
+    cím szerint, azonos címnél sorrendben kapcsolódnak a határozatokhoz.
+    '''
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    gazette_id, = _save_gazettes(repository, 1)
+    repository.save_resolutions(gazette_id, [
+        _resolution(1, 6, "Budapest Főváros Önkormányzata hitelfelvételéhez szükséges kormányzati hozzájárulásról. Budapest"),
+        _resolution(2, 6, "A Kormány egyetért a Debrecen Megyei Jogú Város hitelfelvételével."),
+        _resolution(3, 7, "A Kormány felhívja a belügyminisztert a Budapest közlekedési fejlesztéseire."),
+    ])
+
+    results = repository.search_resolutions("Budapest hitelfelvétel")
+    assert [result['title'] for result in results] == ["A Kormány 1/2025. (I. 6.) Korm. határozata"]
+    assert "[hitelfelvételéhez]" in results[0]['snippet']
+    assert results[0]['gazette_title'] == "Magyar Közlöny 2025. évi 1. szám"
+
+    assert len(repository.search_resolutions("hitelfelvetel")) == 2
+    assert len(repository.search_resolutions("Budapest")) == 2
+    # A címben szereplő találat előrébb kerül
+    assert repository.search_resolutions("3/2025")[0]['title'].startswith("A Kormány 3/2025.")
+    # FTS5 lekérdezés változtatás nélkül
+    assert len(repository.search_resolutions("Debrecen OR belügyminisztert")) == 2
+    repository.close()
+
+def test_search_index_follows_updates(tmp_path):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    gazette_id, = _save_gazettes(repository, 1)
+    repository.save_resolutions(gazette_id, [_resolution(1, 6, "Szeged vízügyi beruházásáról")])
+    repository.save_resolutions(gazette_id, [_resolution(1, 6, "Pécs vízügyi beruházásáról")])
+
+    assert repository.search_resolutions("Szeged") == []
+    assert len(repository.search_resolutions("Pécs")) == 1
+    assert _count(tmp_path / "gazettes.db", "resolutions") == 1
+    assert repository.get_gazettes_without_resolutions() == []
+    repository.close()
+
+def test_resolutions_link_old_summaries(tmp_path):
+    repository = GazetteRepository(tmp_path / "gazettes.db")
+    gazette_id, = _save_gazettes(repository, 1)
+    title = _resolution(1, 6, "")['title']
+    repository.save_summaries(gazette_id, [(title, 1, "a", "első"), (title, 2, "b", "második"),
+                                           ("A Kormány 2/2025. (I. 6.) Korm. határozata", 3, "c", "harmadik")])
+    repository.save_resolutions(gazette_id, [_resolution(1, 6, "első"), _resolution(2, 6, "harmadik"), _resolution(1, 6, "második")])
+
+    rows = repository._conn.execute("""
+        SELECT s.summary, r.content FROM summary s
+        JOIN resolutions r ON r.gazette_id = s.gazette_id AND r.ordinal = s.resolution_ordinal ORDER BY s.id""").fetchall()
+    assert rows == [("első", "első"), ("második", "második"), ("harmadik", "harmadik")]
+    repository.close()
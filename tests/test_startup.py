@@ -0,0 +1,47 @@
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+def test_fetch_only_startup_is_light():
+    '''
+    A main modul betöltése (csak letöltés, --analyze nélkül) nem tölti be a nyelvi modellt
+    (spacy, huspacy), sem a PDF feldolgozót (pdfplumber, pypdfium2).
+    '''
+    heavy = ['spacy', 'huspacy', 'pdfplumber', 'pypdfium2']
+    code = f"import sys; import main; print([name for name in {heavy!r} if name in sys.modules])"
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    output = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout.strip()
+    assert output == "[]", "A letöltéshez nem kell a nyelvi modell és a PDF feldolgozó"
+
+def test_nlp_model_is_loaded_lazily():
+    # A gdmonitor csomag importálása még nem tölti be a modellt
+    code = "import gdmonitor.resulation_analyzer as a; print(a._nlp is None)"
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    output = subprocess.run([sys.executable, "-c", code], env=env,
+                            capture_output=True, text=True, check=True).stdout.strip()
+    assert output == "True"
+
+def test_gdmonitor_does_not_import_app_packages():
+    # A könyvtár az alkalmazás metrics csomagja nélkül is betölthető; a gyűjtőt a pipeline köti be
+    code = "import sys; sys.modules['metrics'] = None; import gdmonitor; print(gdmonitor.resulation_extractor.metrics.enabled)"
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    output = subprocess.run([sys.executable, "-c", code], env=env,
+                            capture_output=True, text=True, check=True).stdout.strip()
+    assert output == "False"
+
+def test_backfill_does_not_load_nlp(tmp_path):
+    # A visszamenőleges letöltés a címlap dátumát a nyelvi modell és a pdfplumber betöltése nélkül olvassa
+    heavy = ['gdmonitor', 'spacy', 'huspacy', 'pdfplumber']
+    sample = SRC_DIR.parent / "samples" / "MK_25_022.pdf"
+    code = (f"import sys; import main; from fetcher import GazetteBackfill; "
+            f"fetcher = main.GazetteFetcher(feed_url='http://127.0.0.1/feed', db_file='gazettes.db', download_path='downloads', "
+            f"base_dir={str(tmp_path)!r}); backfill = GazetteBackfill(fetcher); "
+            f"print(backfill._read_publication_date({str(sample)!r}), [name for name in {heavy!r} if name in sys.modules])")
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    output = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout.strip()
+    assert output == "2025-03-03 []"
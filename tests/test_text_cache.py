@@ -0,0 +1,42 @@
+import os
+from repository import TextCacheRepository
+from gdmonitor.pdf_processor import iter_text_cached, file_sha256, EXTRACTOR_VERSION
+
+def test_text_cache_roundtrip(tmp_path):
+    cache = TextCacheRepository(tmp_path / "cache.db")
+    assert cache.get("abc", EXTRACTOR_VERSION) is None
+
+    cache.put("abc", EXTRACTOR_VERSION, "A Kormány 1234/2024. (V. 15.) Korm. határozata")
+    assert cache.get("abc", EXTRACTOR_VERSION) == "A Kormány 1234/2024. (V. 15.) Korm. határozata"
+    # Más kinyerő verzióval nincs találat
+    assert cache.get("abc", "0-regi") is None
+
+def test_text_cache_eviction(tmp_path):
+    # A méretkorlát túllépésekor a legrégebben használt elem törlődik
+    cache = TextCacheRepository(tmp_path / "cache.db", max_bytes=1200)
+    cache.put("a", EXTRACTOR_VERSION, os.urandom(500).hex())
+    cache.put("b", EXTRACTOR_VERSION, os.urandom(500).hex())
+    cache.get("a", EXTRACTOR_VERSION)
+    cache.put("c", EXTRACTOR_VERSION, os.urandom(500).hex())
+
+    assert cache.get("a", EXTRACTOR_VERSION) is not None
+    assert cache.get("b", EXTRACTOR_VERSION) is None
+    assert cache.get("c", EXTRACTOR_VERSION) is not None
+
+def test_iter_text_cached_skips_pdf_on_hit(tmp_path):
+    test_pdf_path = tmp_path / "test.pdf"
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt="Ez egy Korm. határozat minta.", ln=True)
+    pdf.output(str(test_pdf_path))
+
+    cache = TextCacheRepository(tmp_path / "cache.db")
+    first = ''.join(iter_text_cached(str(test_pdf_path), cache))
+    assert "Korm. határozat" in first
+
+    # Második futásnál a PDF-et már nem kell megnyitni
+    content_hash = file_sha256(str(test_pdf_path))
+    second = ''.join(iter_text_cached("nem-letezo.pdf", cache, content_hash=content_hash))
+    assert second == first